@@ -0,0 +1,163 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from json import loads, dumps
+
+# Project of a route url
+PROJECT_PATTERN = re.compile(r'/projects/([^/?]+)')
+
+
+class DiskCache(object):
+    """
+    Cache of responses stored in a SQLite database, shared by all the processes (and threads) using the same file.
+
+    Only the GET urls matching one of the 'rules' are cached, a rule being a (regex, ttl) pair: entries of a rule
+    without ttl are immutable (results of finished works, such as xray variables and confusion matrices) and
+    never sent again, the others are fresh for 'ttl' seconds and then revalidated with a conditional request
+    (ETag / Last-Modified) when the server gave validators. A POST under a project drops the entries of the
+    project which are not immutable. Entries are keyed by user, url, query params and json body, and their
+    content is checked against its sha256 when read, a corrupted entry being dropped.
+    At most 'max_entries' entries are kept, the least recently used ones being dropped first.
+    """
+
+    DEFAULT_RULES = (
+        (r'/simplelifts/[^/]+/variable/[^/?]+$', None),
+        (r'/models/[^/]+/confusionMatrix$', None),
+        (r'/datasets/[^/]+/variables$', 300),
+    )
+    # Entries are pruned every this number of stored responses
+    PRUNE_EVERY = 100
+
+    def __init__(self, path=None, rules=None, max_entries=10000):
+        """
+        :param path (str): The SQLite database file, ~/.hypercube_api/responses.sqlite by default
+        :param rules (list): The (regex, ttl) pairs of the cached urls, DEFAULT_RULES by default
+        :param max_entries (int): The maximum number of entries kept
+        """
+        self.path = path or os.path.join(os.path.expanduser('~'), '.hypercube_api', 'responses.sqlite')
+        self.rules = [(re.compile(_pattern), _ttl) for _pattern, _ttl in (self.DEFAULT_RULES if rules is None
+                                                                          else rules)]
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.__local = threading.local()
+        self.__stored = 0
+        _folder = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(_folder, exist_ok=True)
+        self.__connection().execute(
+            'CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, project TEXT, ttl REAL, stored_at REAL, '
+            'used_at REAL, etag TEXT, last_modified TEXT, digest TEXT, content BLOB)')
+
+    def __repr__(self):
+        return "<{}>({}) - {} | hits:{} | misses:{}".format(self.__class__.__name__, id(self), self.path, self.hits,
+                                                            self.misses)
+
+    def __len__(self):
+        return self.__connection().execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+
+    def __connection(self):
+        # SQLite connections can be used by neither other threads nor forked processes
+        _connection = getattr(self.__local, 'connection', None)
+        if _connection is None or self.__local.pid != os.getpid():
+            _connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            # Readers are not blocked by a writing process
+            _connection.execute('PRAGMA journal_mode=WAL')
+            self.__local.connection = _connection
+            self.__local.pid = os.getpid()
+        return _connection
+
+    def rule_of(self, url):
+        """Return (True, ttl) when the responses of 'url' are cached, (False, None) otherwise."""
+        for _pattern, _ttl in self.rules:
+            if _pattern.search(url):
+                return True, _ttl
+        return False, None
+
+    @staticmethod
+    def key(user_id, url, params=None, json=None):
+        _call = dumps([user_id, url, params or {}, json or {}], sort_keys=True, default=str)
+        return hashlib.sha256(_call.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        """
+        Return the entry of 'key' as a dict (with its 'content', 'fresh' flag and conditional request 'headers'),
+        None when missing or corrupted.
+        """
+        _row = self.__connection().execute(
+            'SELECT ttl, stored_at, etag, last_modified, digest, content FROM responses WHERE key = ?',
+            (key,)).fetchone()
+        if _row is None:
+            self.misses += 1
+            return None
+        _ttl, _stored_at, _etag, _last_modified, _digest, _content = _row
+        if hashlib.sha256(_content).hexdigest() != _digest:
+            self.discard(key)
+            self.misses += 1
+            return None
+
+        _headers = {}
+        if _etag:
+            _headers['If-None-Match'] = _etag
+        if _last_modified:
+            _headers['If-Modified-Since'] = _last_modified
+        _fresh = _ttl is None or time.time() < _stored_at + _ttl
+        if _fresh:
+            self.hits += 1
+            self.touch(key, renew=False)
+        return {'content': bytes(_content), 'fresh': _fresh, 'headers': _headers}
+
+    def set(self, key, url, content, headers=None):
+        """Store the content of a response of 'url', along with its validators taken from its 'headers'."""
+        _cached, _ttl = self.rule_of(url)
+        if not _cached:
+            return
+        headers = headers or {}
+        _project = PROJECT_PATTERN.search(url)
+        _now = time.time()
+        self.__connection().execute(
+            'INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (key, _project.group(1) if _project else None, _ttl, _now, _now, headers.get('ETag'),
+             headers.get('Last-Modified'), hashlib.sha256(content).hexdigest(), sqlite3.Binary(content)))
+        self.__stored += 1
+        if self.__stored % self.PRUNE_EVERY == 0:
+            self.prune()
+
+    def touch(self, key, renew=True):
+        """Mark an entry as used, its freshness starting over when 'renew' (the server has just validated it)."""
+        _now = time.time()
+        if renew:
+            self.hits += 1
+            self.__connection().execute('UPDATE responses SET stored_at = ?, used_at = ? WHERE key = ?',
+                                        (_now, _now, key))
+        else:
+            self.__connection().execute('UPDATE responses SET used_at = ? WHERE key = ?', (_now, key))
+
+    def discard(self, key):
+        self.__connection().execute('DELETE FROM responses WHERE key = ?', (key,))
+
+    def invalidate(self, url):
+        """Drop the entries (immutable ones excepted) of the project of 'url'."""
+        _project = PROJECT_PATTERN.search(url)
+        if _project is not None:
+            self.__connection().execute('DELETE FROM responses WHERE project = ? AND ttl IS NOT NULL',
+                                        (_project.group(1),))
+
+    def prune(self):
+        """Keep the 'max_entries' most recently used entries."""
+        self.__connection().execute(
+            'DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY used_at DESC LIMIT -1 OFFSET ?)',
+            (self.max_entries,))
+
+    def clear(self):
+        self.__connection().execute('DELETE FROM responses')
+
+    @staticmethod
+    def decode(content):
+        """Decode a stored content as Session.request does: json when possible, raw bytes otherwise."""
+        try:
+            return loads(content.decode('utf-8'))
+        except Exception:
+            return content
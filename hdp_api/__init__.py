@@ -1 +1,14 @@
 from hypercube_api.hdp_api._router import Router
+from hypercube_api.hdp_api._pollingStrategy import PollingStrategy, FixedPolling, BackoffPolling
+from hypercube_api.hdp_api._workTracker import WorkTracker
+from hypercube_api.hdp_api._workFuture import WorkFuture
+from hypercube_api.hdp_api._asyncRouter import AsyncRouter
+from hypercube_api.hdp_api._chunkedUpload import ChunkedUpload
+from hypercube_api.hdp_api.routes import Resilience, CircuitBreaker, CircuitOpenException
+from hypercube_api.hdp_api._responseCache import ResponseCache
+from hypercube_api.hdp_api._singleFlight import SingleFlight
+from hypercube_api.hdp_api._metrics import Metrics, CallBudget, CallBudgetException
+from hypercube_api.sessionClass import AsyncSession
+from hypercube_api.diskCache import DiskCache
+from hypercube_api.tracing import Tracer, Span, JsonExporter, MemoryExporter
+from hypercube_api.transport import Cassette, CassetteMissException
@@ -0,0 +1,133 @@
+from hypercube_api.sessionClass import AsyncSession
+from hypercube_api.hdp_api._router import Router, LazyResources
+from hypercube_api.hdp_api._timeoutSettings import TimeOutSettings
+from hypercube_api.hdp_api.routes import Resilience
+from hypercube_api.hdp_api._responseCache import ResponseCache
+from hypercube_api.hdp_api._singleFlight import SingleFlight
+from hypercube_api.hdp_api._metrics import Metrics
+from hypercube_api.tracing import start_span
+
+# Tells the transient failures of the probes apart, for the routers without a resilience policy
+_DEFAULT_RESILIENCE = Resilience()
+
+
+class AsyncRouter(LazyResources):
+    """asyncio flavour of the Router: exposes the same resources, whose routes have to be awaited."""
+    _resources = Router._resources
+
+    def __init__(self, username=None, password=None, url=None, token=None, watcher=None, session=None,
+                 resilience=None, cache=None, coalesce=True, disk_cache=None, metrics=True):
+        # Initiate session with HyperCube server
+        self.session = AsyncSession(username=username, password=password, token=token, url=url, session=session,
+                                    disk_cache=disk_cache)
+
+        # Retries and circuit breaking of the calls, default policy unless disabled with False
+        self.resilience = Resilience() if resilience is None else (resilience or None)
+        # Responses of the GET routes, opt-in
+        self.cache = ResponseCache() if cache is True else (None if cache is False else cache)
+        # Identical GET calls in flight share a single request
+        self.single_flight = SingleFlight() if coalesce else None
+        # Route call metrics, enabled by default
+        self.metrics = Metrics() if metrics is True else (None if metrics is False else metrics)
+        self._init_resources(watcher=watcher, asynchronous=True, resilience=self.resilience, cache=self.cache,
+                             single_flight=self.single_flight, metrics=self.metrics)
+        self._default_timeout_settings = TimeOutSettings()
+
+    def refresh_session(self, username=None, password=None, token=None):
+        self.session.refresh(username, password, token)
+
+    def call_budget(self):
+        """
+        Account the route calls made within a 'with' block (see CallBudget), to enforce call budgets:
+            with router.call_budget() as budget:
+                ...
+            budget.assert_within(calls=3, routes={'Datasets.getadataset': 1})
+        :return: a CallBudget
+        """
+        if self.metrics is None:
+            raise ValueError('Call budgets are computed from the metrics, which are disabled on this router')
+        return self.metrics.call_budget()
+
+    async def close(self):
+        await self.session.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    # Work Management Specific Code ---------------------------------------------------------------------
+
+    async def handle_work_states(self, project_id, work_type=None, work_id=None, query=None, timeout_settings=None):
+        with start_span('AsyncRouter.handle_work_states', attributes={'hypercube.project_id': project_id,
+                                                                      'hypercube.work_type': work_type,
+                                                                      'hypercube.work_id': work_id}) as _span:
+            _work = await self.__wait_work(project_id, work_type, work_id, query, timeout_settings)
+            if _span is not None:
+                _span.set_attribute('hypercube.work_type', _work.get('type'))
+                _span.set_attribute('hypercube.work_id', _work.get('_id'))
+            return _work
+
+    async def __wait_work(self, project_id, work_type, work_id, query, timeout_settings):
+        if timeout_settings is None:
+            timeout_settings = self._default_timeout_settings
+
+        def _getStatus(work):
+            if work is None:
+                return None
+            return work.get('_status', {}).get('kind', None)
+
+        work_data = {'projectId': project_id}
+        if work_type is not None and query is not None:
+            work_data['type'] = work_type
+            work_data.update(query)
+        elif work_id is not None:
+            work_data['_id'] = work_id
+        else:
+            raise ValueError('Missing conditions for works')
+
+        # A down server or an open circuit only delays the work, until the timeout of its state
+        _recoverable = (self.resilience or _DEFAULT_RESILIENCE).is_recoverable
+
+        _works = await self.Task.task.wait_until(project_ID=project_id, json=work_data, condition=lambda x: len(x) > 0,
+                                                 polling=timeout_settings.get_polling(work_type), tolerate=_recoverable)
+        if not _works:
+            # List empty, the work has not been created
+            if work_id:
+                raise ValueError('The work <{}> could not be found'.format(work_id))
+            raise ValueError('The corresponding work could not be found')
+
+        _work = next(iter(_works))
+        polling = timeout_settings.get_polling(work_type or _work.get('type'))
+
+        while _getStatus(_work) != 'done':
+            _status = _getStatus(_work)
+            if _status is None:
+                raise ValueError('Missing Status on work <{}>'.format(work_id))
+
+            if _status == 'error':
+                raise ValueError('Work "{}" <{}> has failed'.format(_work.get("type", "Unknown type"), work_id))
+
+            if _status == 'starting':
+                timeout = timeout_settings.get_starting_timeout()
+            elif _status in ('creating', 'pending'):
+                timeout = timeout_settings.get_pending_timeout()
+            else:
+                timeout = timeout_settings.get_progress_timeout()
+
+            # 'creating' works go through 'pending' before starting
+            _left = ('creating', 'pending') if _status == 'creating' else (_status,)
+            _works = await self.Task.task.wait_until(condition=lambda x: _getStatus(x[-1]) not in _left,
+                                                     timeout=timeout, polling=polling, tolerate=_recoverable,
+                                                     project_ID=project_id, json=work_data)
+
+            if _works is None:
+                if work_type:
+                    msg = 'Timeout reached on work "{}" <{}>'.format(work_type, work_id)
+                else:
+                    msg = 'Timeout reached on work <{}>'.format(work_id)
+                raise ValueError(msg)
+
+            _work = next(iter(_works))
+        return _work
@@ -0,0 +1,153 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from requests.exceptions import HTTPError, ConnectionError as RequestsConnectionError, Timeout as RequestsTimeout
+from hypercube_api.hdp_api._pollingStrategy import BackoffPolling
+
+
+class ChunkedUpload(object):
+    """
+    Upload of a dataset file by parts: the parts are sent concurrently, each one being retried on failure.
+    The progress is recorded in a local manifest, so that an interrupted upload resumes with the missing
+    parts only (as long as the file is left unchanged), instead of sending the whole file again.
+    """
+
+    # Suffix of the manifest written next to the uploaded file
+    MANIFEST_SUFFIX = '.upload.json'
+
+    def __init__(self, router, project_id, file_path, part_size=8 * 1024 * 1024, parallel=4, retries=5,
+                 manifest_path=None, retry_polling=None):
+        """
+        :param router (Router): The router to the HyperCube server
+        :param project_id (str): The project of the dataset
+        :param file_path (str): The file to upload
+        :param part_size (int): The size in bytes of the parts
+        :param parallel (int): The number of parts uploaded concurrently
+        :param retries (int): The number of attempts left to a part after its first failure, on connection errors,
+            timeouts and server errors (5xx) only
+        :param manifest_path (str): The local manifest recording the upload progress, next to the file by default
+        :param retry_polling (PollingStrategy): The delays between the attempts of a part
+        """
+        if part_size < 1:
+            raise ValueError('part_size should be a positive number of bytes')
+        if parallel < 1:
+            raise ValueError('parallel should be a positive number of uploads')
+        self.__router = router
+        self.project_id = project_id
+        self.file_path = file_path
+        self.part_size = part_size
+        self.parallel = parallel
+        self.retries = retries
+        self.manifest_path = manifest_path or file_path + self.MANIFEST_SUFFIX
+        self.retry_polling = retry_polling or BackoffPolling(initial=1, maximum=30, immediate=False)
+        self.__lock = threading.Lock()
+        self.__manifest = None
+
+    def __repr__(self):
+        return "<{}>({}) - {} <{}>".format(self.__class__.__name__, id(self), self.file_path, self.upload_id)
+
+    @property
+    def upload_id(self):
+        return self.__manifest.get('uploadId') if self.__manifest else None
+
+    @property
+    def parts(self):
+        """The number of parts of the file"""
+        return max(1, -(-os.path.getsize(self.file_path) // self.part_size))
+
+    def run(self, data):
+        """
+        Upload the missing parts of the file, then create the dataset
+        :param data (dict): The dataset creation fields, as sent to Datasets.uploaddatasets (without the file)
+        :return: the dataset creation json (dict)
+        """
+        self.__start(data)
+        _missing = [_part for _part in range(self.parts) if _part not in self.__manifest['parts']]
+        if _missing:
+            with ThreadPoolExecutor(max_workers=self.parallel, thread_name_prefix='ChunkedUpload') as executor:
+                # Leaving the executor waits for the other parts, the manifest then holds all the uploaded ones
+                for _future in [executor.submit(self.__upload_part, _part) for _part in _missing]:
+                    _future.result()
+
+        creation_json = self.__router.Datasets.completeupload(project_ID=self.project_id, upload_ID=self.upload_id,
+                                                              json=data)
+        os.remove(self.manifest_path)
+        return creation_json
+
+    def __start(self, data):
+        _stat = os.stat(self.file_path)
+        _file = {'path': os.path.abspath(self.file_path), 'size': _stat.st_size, 'mtime': _stat.st_mtime,
+                 'partSize': self.part_size, 'projectId': self.project_id}
+
+        _manifest = self.__load_manifest()
+        if _manifest is not None and _manifest.get('file') == _file:
+            try:
+                _upload = self.__router.Datasets.getupload(project_ID=self.project_id,
+                                                           upload_ID=_manifest['uploadId'])
+                # The server is the reference for the parts it has received
+                _manifest['parts'] = sorted(set(_upload.get('parts', [])))
+                self.__manifest = _manifest
+                self.__save_manifest()
+                return
+            except HTTPError:
+                # Expired or unknown upload, start over
+                pass
+
+        _upload = self.__router.Datasets.startupload(project_ID=self.project_id,
+                                                     json={'fileName': os.path.basename(self.file_path),
+                                                           'size': _stat.st_size, 'partSize': self.part_size,
+                                                           'parts': self.parts, 'name': data.get('name')})
+        self.__manifest = {'uploadId': _upload.get('_id'), 'file': _file, 'parts': []}
+        self.__save_manifest()
+
+    def __load_manifest(self):
+        if not os.path.exists(self.manifest_path):
+            return None
+        try:
+            with open(self.manifest_path, 'r') as FILE_IN:
+                return json.load(FILE_IN)
+        except ValueError:
+            return None
+
+    def __save_manifest(self):
+        # Written aside then renamed, an interruption never leaves a truncated manifest
+        _path = '{}.tmp'.format(self.manifest_path)
+        with open(_path, 'w') as FILE_OUT:
+            json.dump(self.__manifest, FILE_OUT)
+        os.replace(_path, self.manifest_path)
+
+    @staticmethod
+    def __is_retryable(error):
+        # A part rejected by the server (4xx) would be rejected again, unlike a lost connection or a server error
+        if isinstance(error, HTTPError):
+            return isinstance(error.response, int) and error.response >= 500
+        return isinstance(error, (RequestsConnectionError, RequestsTimeout, ConnectionError, TimeoutError))
+
+    def __upload_part(self, part):
+        with open(self.file_path, 'rb') as FILE_IN:
+            FILE_IN.seek(part * self.part_size)
+            _content = FILE_IN.read(self.part_size)
+
+        data = {
+            'checksum': hashlib.md5(_content).hexdigest(),
+            'size': str(len(_content)),
+            'part': ('{}.part{}'.format(os.path.basename(self.file_path), part), _content,
+                     'application/octet-stream'),
+        }
+        _delays = self.retry_polling.delays()
+        for _attempt in range(self.retries + 1):
+            try:
+                self.__router.Datasets.uploadpart(project_ID=self.project_id, upload_ID=self.upload_id,
+                                                  part_number=part, data=data, streaming=True, progress=False)
+                break
+            except Exception as E:
+                if _attempt == self.retries or not self.__is_retryable(E):
+                    raise
+                time.sleep(next(_delays))
+
+        with self.__lock:
+            self.__manifest['parts'] = sorted(self.__manifest['parts'] + [part])
+            self.__save_manifest()
@@ -0,0 +1,320 @@
+import inspect
+import threading
+import time
+from bisect import bisect_left
+from requests.exceptions import HTTPError
+from hypercube_api.sessionClass import TRANSFER
+
+
+class Metrics(object):
+    """
+    Registry of the route metrics: per route and status, the calls count, their latency histogram (seconds,
+    retries included) and the bytes sent and received; per route, the retries, timeouts and polling iterations.
+    Routes are named after their key ('Datasets.getadataset'), statuses are the http status of the response
+    (or the class name of the error, such as 'ConnectionError').
+    Read with 'snapshot', export with 'prometheus'.
+    """
+
+    DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1., 2.5, 5., 10., 30., 60.)
+    # Counters by route
+    RETRIES = 'retries'
+    TIMEOUTS = 'timeouts'
+    POLLS = 'polls'
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.__lock = threading.Lock()
+        self.__calls = {}
+        self.__counters = {}
+
+    def __repr__(self):
+        with self.__lock:
+            _calls = sum(_c['count'] for _c in self.__calls.values())
+        return "<{}>({}) - {} routes | {} calls".format(self.__class__.__name__, id(self), len(self.routes), _calls)
+
+    @staticmethod
+    def route_name(route):
+        return route.key or str(route)
+
+    @property
+    def routes(self):
+        with self.__lock:
+            return sorted(set(_k[0] for _k in self.__calls) | set(_k[0] for _k in self.__counters))
+
+    def observe(self, route, status, seconds, sent=0, received=0):
+        """Record a route call (of 'route', a Route or a route name)."""
+        _key = (route if isinstance(route, str) else self.route_name(route), str(status))
+        _bucket = bisect_left(self.buckets, seconds)
+        with self.__lock:
+            _calls = self.__calls.get(_key)
+            if _calls is None:
+                _calls = {'count': 0, 'seconds': 0., 'sent': 0, 'received': 0, 'buckets': [0] * len(self.buckets)}
+                self.__calls[_key] = _calls
+            _calls['count'] += 1
+            _calls['seconds'] += seconds
+            _calls['sent'] += sent
+            _calls['received'] += received
+            if _bucket < len(self.buckets):
+                _calls['buckets'][_bucket] += 1
+
+    def increment(self, route, counter, value=1):
+        """Increment a counter (RETRIES, TIMEOUTS or POLLS) of a route."""
+        _key = (route if isinstance(route, str) else self.route_name(route), counter)
+        with self.__lock:
+            self.__counters[_key] = self.__counters.get(_key, 0) + value
+
+    def measure(self, route, send):
+        """
+        Call 'send' (a call of 'route' without arguments) and record it. A streamed response (an iterator of
+        chunks) is recorded once exhausted or closed, with the bytes actually received.
+        """
+        _transfer = {'sent': 0, 'received': 0}
+        _token = TRANSFER.set(_transfer)
+        _start = time.perf_counter()
+        try:
+            _result = send()
+        except Exception as E:
+            self.observe(route, self.__status(E), time.perf_counter() - _start, _transfer['sent'], _transfer['received'])
+            raise
+        finally:
+            TRANSFER.reset(_token)
+        _seconds = time.perf_counter() - _start
+        if inspect.isgenerator(_result):
+            return self.__stream(route, _result, _seconds, _transfer)
+        self.observe(route, 200, _seconds, _transfer['sent'], _transfer['received'])
+        return _result
+
+    async def ameasure(self, route, send):
+        """Asynchronous flavour of 'measure', 'send' being a coroutine function."""
+        _transfer = {'sent': 0, 'received': 0}
+        _token = TRANSFER.set(_transfer)
+        _start = time.perf_counter()
+        try:
+            _result = await send()
+        except Exception as E:
+            self.observe(route, self.__status(E), time.perf_counter() - _start, _transfer['sent'], _transfer['received'])
+            raise
+        finally:
+            TRANSFER.reset(_token)
+        _seconds = time.perf_counter() - _start
+        if inspect.isasyncgen(_result):
+            return self.__astream(route, _result, _seconds, _transfer)
+        self.observe(route, 200, _seconds, _transfer['sent'], _transfer['received'])
+        return _result
+
+    def __stream(self, route, chunks, seconds, transfer):
+        # The latency is the one of the response, the bytes are counted by the session as the chunks are read
+        try:
+            yield from chunks
+        finally:
+            chunks.close()
+            self.observe(route, 200, seconds, transfer['sent'], transfer['received'])
+
+    async def __astream(self, route, chunks, seconds, transfer):
+        try:
+            async for _chunk in chunks:
+                yield _chunk
+        finally:
+            await chunks.aclose()
+            self.observe(route, 200, seconds, transfer['sent'], transfer['received'])
+
+    @staticmethod
+    def __status(error):
+        if isinstance(error, HTTPError) and error.response is not None:
+            return error.response
+        return error.__class__.__name__
+
+    def snapshot(self):
+        """
+        Return the metrics as a dict: {route: {'calls': {status: {'count', 'seconds', 'sent', 'received',
+        'buckets': {upper bound: cumulative count}}}, 'retries', 'timeouts', 'polls'}}
+        """
+        with self.__lock:
+            _calls = dict((_k, dict(_v, buckets=list(_v['buckets']))) for _k, _v in self.__calls.items())
+            _counters = dict(self.__counters)
+
+        _snapshot = {}
+        for _route in set(_k[0] for _k in _calls) | set(_k[0] for _k in _counters):
+            _snapshot[_route] = {'calls': {}, self.RETRIES: 0, self.TIMEOUTS: 0, self.POLLS: 0}
+        for (_route, _status), _values in _calls.items():
+            _cumulative, _buckets = 0, {}
+            for _bound, _count in zip(self.buckets, _values['buckets']):
+                _cumulative += _count
+                _buckets[_bound] = _cumulative
+            _buckets[float('inf')] = _values['count']
+            _snapshot[_route]['calls'][_status] = dict(_values, buckets=_buckets)
+        for (_route, _counter), _value in _counters.items():
+            _snapshot[_route][_counter] = _value
+        return _snapshot
+
+    def prometheus(self, prefix='hypercube'):
+        """Return the metrics in the Prometheus text exposition format."""
+        _snapshot = self.snapshot()
+        _lines = []
+
+        def _family(name, kind, help):
+            _lines.append('# HELP {}_{} {}'.format(prefix, name, help))
+            _lines.append('# TYPE {}_{} {}'.format(prefix, name, kind))
+
+        def _labels(**labels):
+            return ','.join('{}="{}"'.format(_k, str(_v).replace('\\', '\\\\').replace('"', '\\"'))
+                            for _k, _v in labels.items())
+
+        _family('route_duration_seconds', 'histogram', 'Duration of the route calls, retries included')
+        for _route in sorted(_snapshot):
+            for _status, _values in sorted(_snapshot[_route]['calls'].items()):
+                for _bound, _count in _values['buckets'].items():
+                    _le = '+Inf' if _bound == float('inf') else repr(float(_bound))
+                    _lines.append('{}_route_duration_seconds_bucket{{{}}} {}'.format(
+                        prefix, _labels(route=_route, status=_status, le=_le), _count))
+                _lines.append('{}_route_duration_seconds_sum{{{}}} {!r}'.format(
+                    prefix, _labels(route=_route, status=_status), _values['seconds']))
+                _lines.append('{}_route_duration_seconds_count{{{}}} {}'.format(
+                    prefix, _labels(route=_route, status=_status), _values['count']))
+
+        for _name, _field, _help in (('route_request_bytes_total', 'sent', 'Bytes of the request bodies'),
+                                     ('route_response_bytes_total', 'received', 'Bytes of the response bodies')):
+            _family(_name, 'counter', _help)
+            for _route in sorted(_snapshot):
+                for _status, _values in sorted(_snapshot[_route]['calls'].items()):
+                    _lines.append('{}_{}{{{}}} {}'.format(prefix, _name, _labels(route=_route, status=_status),
+                                                          _values[_field]))
+
+        for _counter, _help in ((self.RETRIES, 'Retries of the route calls'),
+                                (self.TIMEOUTS, 'Route pollings given up on timeout'),
+                                (self.POLLS, 'Polling iterations of the routes')):
+            _family('route_{}_total'.format(_counter), 'counter', _help)
+            for _route in sorted(_snapshot):
+                _lines.append('{}_route_{}_total{{{}}} {}'.format(prefix, _counter, _labels(route=_route),
+                                                                  _snapshot[_route][_counter]))
+        return '\n'.join(_lines) + '\n'
+
+    def reset(self):
+        with self.__lock:
+            self.__calls.clear()
+            self.__counters.clear()
+
+    def call_budget(self):
+        """A CallBudget accounting the calls recorded by this registry during a 'with' block."""
+        return CallBudget(self)
+
+
+class CallBudgetException(AssertionError):
+    def __init__(self, overruns):
+        self.overruns = overruns
+
+    def __str__(self):
+        return 'Call budget exceeded : {}'.format(', '.join(self.overruns))
+
+
+class CallBudget(object):
+    """
+    Accounting of the route calls recorded by a Metrics registry during a 'with' block: per route, the calls,
+    their errors, retries and polling iterations, the bytes sent and received and the seconds spent in the calls.
+    The calls of all the threads sharing the registry are counted, the pollings of the work tracker included.
+    Enforce budgets with 'assert_within', print the accounting with 'report'.
+    """
+
+    FIELDS = ('calls', 'errors', Metrics.RETRIES, Metrics.POLLS, 'sent', 'received', 'seconds')
+
+    def __init__(self, metrics):
+        self.__metrics = metrics
+        self.__before = None
+        self.__after = None
+        self.__start = None
+        self.wall_time = None
+
+    def __repr__(self):
+        return "<{}>({}) - {} calls | {} bytes | {}".format(
+            self.__class__.__name__, id(self), self.calls, self.sent + self.received,
+            'in progress' if self.wall_time is None else '{:.3f}s'.format(self.wall_time))
+
+    def __enter__(self):
+        self.__before = self.__metrics.snapshot()
+        self.__after = None
+        self.wall_time = None
+        self.__start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.__after = self.__metrics.snapshot()
+        self.wall_time = time.perf_counter() - self.__start
+
+    @classmethod
+    def __totals(cls, route):
+        _totals = dict.fromkeys(cls.FIELDS, 0)
+        for _status, _values in route['calls'].items():
+            _totals['calls'] += _values['count']
+            if _status != '200':
+                _totals['errors'] += _values['count']
+            for _field in ('sent', 'received', 'seconds'):
+                _totals[_field] += _values[_field]
+        _totals[Metrics.RETRIES] = route[Metrics.RETRIES]
+        _totals[Metrics.POLLS] = route[Metrics.POLLS]
+        return _totals
+
+    @property
+    def routes(self):
+        """The accounting of the routes called during the block (so far, while in progress): {route: {field: value}}"""
+        if self.__before is None:
+            return {}
+        _after = self.__after if self.__after is not None else self.__metrics.snapshot()
+        _routes = {}
+        for _route, _values in _after.items():
+            _totals = self.__totals(_values)
+            if _route in self.__before:
+                _previous = self.__totals(self.__before[_route])
+                _totals = dict((_field, _totals[_field] - _previous[_field]) for _field in self.FIELDS)
+            if any(_totals.values()):
+                _routes[_route] = _totals
+        return _routes
+
+    def total(self, field):
+        return sum(_values[field] for _values in self.routes.values())
+
+    @property
+    def calls(self):
+        return self.total('calls')
+
+    @property
+    def sent(self):
+        return self.total('sent')
+
+    @property
+    def received(self):
+        return self.total('received')
+
+    def assert_within(self, calls=None, routes=None, sent=None, received=None, wall_time=None):
+        """
+        Raise a CallBudgetException listing the budgets exceeded
+        :param calls (int): The maximum number of route calls
+        :param routes (dict): The maximum number of calls by route ('Datasets.getadataset'), a route missing
+            from it being unlimited
+        :param sent (int): The maximum number of bytes sent
+        :param received (int): The maximum number of bytes received
+        :param wall_time (float): The maximum duration of the block in seconds
+        """
+        _routes = self.routes
+        _overruns = []
+        for _name, _value, _budget in (('calls', self.calls, calls), ('bytes sent', self.sent, sent),
+                                       ('bytes received', self.received, received)):
+            if _budget is not None and _value > _budget:
+                _overruns.append('{} {} > {}'.format(_value, _name, _budget))
+        for _route, _budget in sorted((routes or {}).items()):
+            _value = _routes.get(_route, {}).get('calls', 0)
+            if _value > _budget:
+                _overruns.append('{} calls of {} > {}'.format(_value, _route, _budget))
+        if wall_time is not None and self.wall_time is not None and self.wall_time > wall_time:
+            _overruns.append('{:.3f}s > {:.3f}s'.format(self.wall_time, wall_time))
+        if _overruns:
+            raise CallBudgetException(_overruns)
+
+    def report(self):
+        """Return the accounting as a text table, the routes taking the most time first."""
+        _lines = ['{:<40} {:>6} {:>6} {:>7} {:>6} {:>12} {:>12} {:>9}'.format('route', *self.FIELDS)]
+        for _route, _values in sorted(self.routes.items(), key=lambda _item: -_item[1]['seconds']):
+            _lines.append('{:<40} {:>6} {:>6} {:>7} {:>6} {:>12} {:>12} {:>9.3f}'.format(
+                _route, *(_values[_field] for _field in self.FIELDS)))
+        if self.wall_time is not None:
+            _lines.append('{} calls in {:.3f}s'.format(self.calls, self.wall_time))
+        return '\n'.join(_lines)
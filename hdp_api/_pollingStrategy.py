@@ -0,0 +1,69 @@
+import random
+
+
+class PollingStrategy(object):
+    """Base polling strategy: yields the delays (in seconds) to wait before each probe of a route."""
+
+    def delays(self):
+        """
+        Generate the successive delays to wait before each probe
+        :return: an iterator of delays in seconds (int/float)
+        """
+        raise NotImplementedError
+
+    def __repr__(self):
+        return "<{}>({})".format(self.__class__.__name__, id(self))
+
+
+class FixedPolling(PollingStrategy):
+    """Probes the route every 'step' seconds, the first probe being immediate unless 'immediate' is False."""
+
+    def __init__(self, step=1, immediate=True):
+        self._step = step
+        self._immediate = immediate
+
+    def __repr__(self):
+        return "<{}>({}) - step:{} | immediate:{}".format(self.__class__.__name__, id(self), self._step, self._immediate)
+
+    def delays(self):
+        if self._immediate:
+            yield 0
+        while True:
+            yield self._step
+
+
+class BackoffPolling(PollingStrategy):
+    """Probes the route immediately, then waits 'initial' seconds and multiplies the delay by 'factor'
+    after each probe, up to 'maximum' seconds. Each delay is randomized by +/- 'jitter' (ratio)."""
+
+    def __init__(self, initial=0.5, factor=1.5, maximum=30, jitter=0.1, immediate=True):
+        if initial <= 0 or maximum <= 0:
+            raise ValueError('Polling delays must be strictly positive')
+        if factor < 1:
+            raise ValueError('Polling backoff factor must be greater or equal to 1')
+        if not 0 <= jitter < 1:
+            raise ValueError('Polling jitter must be greater or equal to 0 and lower than 1')
+        self._initial = initial
+        self._factor = factor
+        self._maximum = maximum
+        self._jitter = jitter
+        self._immediate = immediate
+
+    def __repr__(self):
+        return "<{}>({}) - initial:{} | factor:{} | maximum:{} | jitter:{}".format(self.__class__.__name__,
+                                                                                  id(self),
+                                                                                  self._initial,
+                                                                                  self._factor,
+                                                                                  self._maximum,
+                                                                                  self._jitter)
+
+    def delays(self):
+        if self._immediate:
+            yield 0
+        _delay = min(self._initial, self._maximum)
+        while True:
+            if self._jitter:
+                yield _delay * random.uniform(1 - self._jitter, 1 + self._jitter)
+            else:
+                yield _delay
+            _delay = min(_delay * self._factor, self._maximum)
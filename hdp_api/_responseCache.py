@@ -0,0 +1,121 @@
+import threading
+import time
+from collections import OrderedDict
+from copy import deepcopy
+
+
+class ResponseCache(object):
+    """
+    LRU cache of the responses of the GET routes, each entry living 'ttl' seconds (or the ttl given in 'ttls'
+    for a route key such as 'Datasets.datasets', 0 disabling the cache of a route), at most 'max_entries' being kept.
+    Entries are keyed by route path (path params included), query params and json body. A call of a route writing
+    under a project (any non idempotent route) invalidates the entries of this project and those outside any project.
+    """
+
+    def __init__(self, ttl=30, max_entries=1024, ttls=None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.ttls = dict(ttls or {})
+        self.hits = 0
+        self.misses = 0
+        self.__lock = threading.Lock()
+        self.__entries = OrderedDict()
+        self.__generations = {}
+
+    def __repr__(self):
+        return "<{}>({}) - {} entries | hits:{} | misses:{}".format(self.__class__.__name__, id(self),
+                                                                    len(self.__entries), self.hits, self.misses)
+
+    def __len__(self):
+        return len(self.__entries)
+
+    def ttl_of(self, route):
+        return self.ttls.get(route.key, self.ttl)
+
+    def get(self, key):
+        """Return (True, response) for a fresh entry, (False, None) otherwise."""
+        with self.__lock:
+            _entry = self.__entries.get(key)
+            if _entry is None or _entry[0] < time.monotonic():
+                if _entry is not None:
+                    del self.__entries[key]
+                self.misses += 1
+                return False, None
+            self.__entries.move_to_end(key)
+            self.hits += 1
+            return True, deepcopy(_entry[2])
+
+    def generation(self, project_id):
+        with self.__lock:
+            return self.__generations.get(project_id, 0)
+
+    def set(self, key, project_id, response, ttl, generation=None):
+        """Store a response, unless its project has been written since 'generation' was read."""
+        with self.__lock:
+            if generation is not None and self.__generations.get(project_id, 0) != generation:
+                return
+            self.__entries[key] = (time.monotonic() + ttl, project_id, deepcopy(response))
+            self.__entries.move_to_end(key)
+            while len(self.__entries) > self.max_entries:
+                self.__entries.popitem(last=False)
+
+    def invalidate(self, project_id=None):
+        """Drop the entries of a project, and those outside any project."""
+        with self.__lock:
+            for _project_id in set([project_id, None]):
+                self.__generations[_project_id] = self.__generations.get(_project_id, 0) + 1
+            for _key in [_k for _k, _e in self.__entries.items() if _e[1] in (project_id, None)]:
+                del self.__entries[_key]
+
+    def clear(self):
+        with self.__lock:
+            for _project_id in self.__generations:
+                self.__generations[_project_id] += 1
+            self.__entries.clear()
+
+    def __lookup(self, route, path, kwargs):
+        # The cache key of a call, None when its response is not to be cached
+        _ttl = self.ttl_of(route)
+        if not _ttl:
+            return None, None
+        return route._call_key(path, kwargs), _ttl
+
+    def call(self, route, path, project_id, kwargs, send):
+        """Answer a route call from the cache, or with 'send' (storing its response)."""
+        if not route.idempotent:
+            try:
+                return send(path, kwargs)
+            finally:
+                self.invalidate(project_id)
+
+        _key, _ttl = self.__lookup(route, path, kwargs)
+        if _key is None:
+            return send(path, kwargs)
+        _hit, _response = self.get(_key)
+        if _hit:
+            return _response
+        _generation = self.generation(project_id)
+        _response = send(path, kwargs)
+        if isinstance(_response, (dict, list)):
+            self.set(_key, project_id, _response, _ttl, generation=_generation)
+        return _response
+
+    async def acall(self, route, path, project_id, kwargs, send):
+        """Asynchronous flavour of 'call', 'send' being a coroutine function."""
+        if not route.idempotent:
+            try:
+                return await send(path, kwargs)
+            finally:
+                self.invalidate(project_id)
+
+        _key, _ttl = self.__lookup(route, path, kwargs)
+        if _key is None:
+            return await send(path, kwargs)
+        _hit, _response = self.get(_key)
+        if _hit:
+            return _response
+        _generation = self.generation(project_id)
+        _response = await send(path, kwargs)
+        if isinstance(_response, (dict, list)):
+            self.set(_key, project_id, _response, _ttl, generation=_generation)
+        return _response
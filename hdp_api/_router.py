@@ -1,3 +1,4 @@
+import threading
 from hypercube_api.sessionClass import Session
 
 from hypercube_api.hdp_api.routes.alerts import Alerts
@@ -43,9 +44,61 @@ from hypercube_api.hdp_api.routes.settings import Settings
 from hypercube_api.hdp_api.routes.monitoring import Monitoring
 from hypercube_api.hdp_api.routes.authentication import Authentication
 from hypercube_api.hdp_api._timeoutSettings import TimeOutSettings
+from hypercube_api.hdp_api._workTracker import WorkTracker
+from hypercube_api.hdp_api._chunkedUpload import ChunkedUpload
+from hypercube_api.hdp_api.routes import Resilience
+from hypercube_api.hdp_api._responseCache import ResponseCache
+from hypercube_api.hdp_api._singleFlight import SingleFlight
+from hypercube_api.hdp_api._metrics import Metrics
+from hypercube_api.tracing import CURRENT_SPAN, get_tracer, start_span
+from hypercube_api.transport import Cassette
 
 
-class Router(object):
+class LazyResources(object):
+    """Base of the routers: each resource of '_resources' is created on its first access, rather than all upfront."""
+    _resources = []
+
+    def _init_resources(self, **resource_kwargs):
+        # Arguments of the resources, besides the session
+        self.__resource_kwargs = resource_kwargs
+        self.__resource_lock = threading.Lock()
+
+    def __getattr__(self, name):
+        # Only called for the attributes not set yet
+        _resource_class = next((_r for _r in self._resources if _r.__name__ == name), None)
+        if _resource_class is None:
+            raise AttributeError("'{}' object has no attribute '{}'".format(self.__class__.__name__, name))
+        with self.__resource_lock:
+            _resource = self.__dict__.get(name)
+            if _resource is None:
+                _resource = _resource_class(self.session, **self.__resource_kwargs)
+                self.__setattr__(name, _resource)
+        return _resource
+
+    def __iter__(self):
+        for resourceCls in self._resources:
+            yield getattr(self, resourceCls.__name__)
+
+
+class Router(LazyResources):
+    """Entry point to all the HyperCube API resources.
+
+    A Router is thread-safe: routes hold no per-call state, works are followed by a shared WorkTracker and the
+    session can be sized for concurrent use ('pool_size' connections, see Session for 'pool_block' and
+    'thread_local'). Run at most 'pool_size' concurrent calls per Router to keep all connections alive.
+
+    Resilience is enabled by default, which changes how errors surface: transient failures (connection errors,
+    timeouts, 502/503/504) of the idempotent routes are retried, up to 3 times with backoff, and after 5 consecutive
+    transient failures the calls to the host raise CircuitOpenException for 30 seconds without being sent. Tune it
+    with a Resilience of your own, or pass resilience=False for single attempts whose errors are raised as is.
+    With 'cache' (True or a ResponseCache), the responses of the GET routes are cached.
+    With 'disk_cache' (True or a DiskCache), the responses of some GET routes are kept on disk for all the processes.
+    The latencies, sizes, retries and pollings of the route calls are recorded in 'metrics' (see Metrics) unless False.
+    'transport' replaces the http transport of the session (see Cassette to record or replay the calls), the works
+    being polled without delay when replayed.
+    Identical GET calls in flight at the same time share a single request unless 'coalesce' is False.
+    Release the connections with 'close', or use the router as a context manager.
+    """
     _resources = [
         Alerts,
         Analytics,
@@ -91,83 +144,123 @@ class Router(object):
         Authentication
     ]
 
-    def __init__(self, username=None, password=None, url=None, token=None, watcher=None):
+    def __init__(self, username=None, password=None, url=None, token=None, watcher=None, pool_size=10, pool_block=False,
+                 thread_local=False, compression=None, resilience=None, cache=None, coalesce=True, disk_cache=None,
+                 metrics=True, transport=None):
         # Initiate session with HyperCube server
-        self.session = Session(username=username, password=password, token=token, url=url)
+        self.session = Session(username=username, password=password, token=token, url=url, pool_size=pool_size,
+                               pool_block=pool_block, thread_local=thread_local, compression=compression,
+                               disk_cache=disk_cache, transport=transport)
 
-        for resourceCls in self._resources:
-            self.__setattr__(resourceCls.__name__, resourceCls(self.session, watcher=watcher))
+        # Retries and circuit breaking of the calls, default policy unless disabled with False
+        self.resilience = Resilience() if resilience is None else (resilience or None)
+        # Responses of the GET routes, opt-in
+        self.cache = ResponseCache() if cache is True else (None if cache is False else cache)
+        # Identical GET calls in flight share a single request
+        self.single_flight = SingleFlight() if coalesce else None
+        # Route call metrics, enabled by default
+        self.metrics = Metrics() if metrics is True else (None if metrics is False else metrics)
+        self._init_resources(watcher=watcher, resilience=self.resilience, cache=self.cache,
+                             single_flight=self.single_flight, metrics=self.metrics)
         self._default_timeout_settings = TimeOutSettings()
+        if isinstance(transport, Cassette) and transport.mode == Cassette.REPLAY:
+            # Replayed works reach their recorded states as fast as they are served
+            self._default_timeout_settings.set_immediate_polling()
+        self.work_tracker = WorkTracker(self)
+        # Identity maps of the hyper_api objects, by (collection, scope)
+        self.identity_maps = {}
+        # Seconds during which their listings are trusted, IDENTITY_TTL if None
+        self.identity_ttl = None
 
     def refresh_session(self, username=None, password=None, token=None):
         self.session.refresh(username, password, token)
 
-    def __iter__(self):
-        for resourceCls in self._resources:
-            yield self.__getattribute__(resourceCls.__name__)
+    def close(self):
+        """Release the connections of the session."""
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def call_budget(self):
+        """
+        Account the route calls made within a 'with' block (see CallBudget), to enforce call budgets:
+            with router.call_budget() as budget:
+                ...
+            budget.assert_within(calls=3, routes={'Datasets.getadataset': 1})
+        :return: a CallBudget
+        """
+        if self.metrics is None:
+            raise ValueError('Call budgets are computed from the metrics, which are disabled on this router')
+        return self.metrics.call_budget()
 
     # Work Management Specific Code ---------------------------------------------------------------------
 
     def handle_work_states(self, project_id, work_type=None, work_id=None, query=None, timeout_settings=None):
-        if timeout_settings is None:
-            timeout_settings = self._default_timeout_settings
-
-        def _getStatus(work):
-            if work is None:
-                return None
-            return work.get('_status', {}).get('kind', None)
+        with start_span('Router.handle_work_states', attributes={'hypercube.project_id': project_id,
+                                                                 'hypercube.work_type': work_type,
+                                                                 'hypercube.work_id': work_id}) as _span:
+            _work = self.submit_work(project_id, work_type=work_type, work_id=work_id, query=query,
+                                     timeout_settings=timeout_settings).result()
+            if _span is not None:
+                _span.set_attribute('hypercube.work_type', _work.get('type'))
+                _span.set_attribute('hypercube.work_id', _work.get('_id'))
+            return _work
 
-        work_data = {'projectId': project_id}
+    def submit_work(self, project_id, work_type=None, work_id=None, query=None, timeout_settings=None, callback=None):
+        """
+        Watch a work without blocking
+        :param callback (callable): Called with the work json on each status change, on the tracker thread: it must
+            not wait for a work (handle_work_states, result), which would hang the tracking of all the works
+        :return: a future resolved with the work json once done (WorkFuture)
+        """
         if work_type is not None and query is not None:
-            work_data['type'] = work_type
-            work_data.update(query)
+            work_query = {'type': work_type}
+            work_query.update(query)
+            work_id = None
         elif work_id is not None:
-            work_data['_id'] = work_id
+            work_query = None
         else:
             raise ValueError('Missing conditions for works')
 
-        _works = self.Task.task.wait_until(project_ID=project_id, json=work_data, condition=lambda x: len(x) > 0)
-        if not _works:
-            # List empty, the work has not been created
-            if work_id:
-                raise ValueError('The work <{}> could not be found'.format(work_id))
-            raise ValueError('The corresponding work could not be found')
-
-        _work = next(iter(_works))
-
-        while _getStatus(_work) != 'done':
-            if _getStatus(_work) is None:
-                raise ValueError('Missing Status on work <{}>'.format(work_id))
-
-            if _getStatus(_work) == 'error':
-                raise ValueError('Work "{}" <{}> has failed'.format(_work.get("type", "Unknown type"), work_id))
-
-            if _getStatus(_work) == 'starting':
-                _works = self.Task.task.wait_until(condition=lambda x: _getStatus(x[-1]) != 'starting',
-                                                   timeout=timeout_settings.get_starting_timeout(),
-                                                   project_ID=project_id, json=work_data)
-
-            elif _getStatus(_work) == 'creating':
-                _works = self.Task.task.wait_until(condition=lambda x: _getStatus(x[-1]) != 'creating' and _getStatus(x[-1]) != 'pending',
-                                                   timeout=timeout_settings.get_pending_timeout(),
-                                                   project_ID=project_id, json=work_data)
-
-            elif _getStatus(_work) == 'pending':
-                _works = self.Task.task.wait_until(condition=lambda x: _getStatus(x[-1]) != 'pending',
-                                                   timeout=timeout_settings.get_pending_timeout(),
-                                                   project_ID=project_id, json=work_data)
-
-            elif _getStatus(_work) == 'inprogress':
-                _works = self.Task.task.wait_until(condition=lambda x: _getStatus(x[-1]) != 'inprogress',
-                                                   timeout=timeout_settings.get_progress_timeout(),
-                                                   project_ID=project_id, json=work_data)
-
-            if _works is None:
-                if work_type:
-                    msg = 'Timeout reached on work "{}" <{}>'.format(work_type, work_id)
-                else:
-                    msg = 'Timeout reached on work <{}>'.format(work_id)
-                raise ValueError(msg)
-
-            _work = next(iter(_works))
-        return _work
+        # Works are followed by the tracker, which polls all the pending works of a project at once
+        _tracer = get_tracer()
+        if _tracer is None:
+            return self.work_tracker.track(project_id, work_id, timeout_settings=timeout_settings, callback=callback,
+                                           query=work_query)
+
+        # Spans the wait of the work, parent of the probes and callbacks run for it by the tracker
+        _span = _tracer.open_span('Router.submit_work', attributes={'hypercube.project_id': project_id,
+                                                                    'hypercube.work_type': work_type,
+                                                                    'hypercube.work_id': work_id})
+        _token = CURRENT_SPAN.set(_span)
+        try:
+            _future = self.work_tracker.track(project_id, work_id, timeout_settings=timeout_settings,
+                                              callback=callback, query=work_query)
+        except BaseException as E:
+            _tracer.close_span(_span, E)
+            raise
+        finally:
+            CURRENT_SPAN.reset(_token)
+
+        def _close(future):
+            if not future.cancelled() and future.exception() is None:
+                _span.set_attribute('hypercube.work_id', future.result().get('_id'))
+            _tracer.close_span(_span, None if future.cancelled() else future.exception())
+
+        _future.add_done_callback(_close)
+        return _future
+
+    # Upload Specific Code ------------------------------------------------------------------------------
+
+    def upload_by_parts(self, project_id, file_path, data, part_size=8 * 1024 * 1024, parallel=4, retries=5,
+                        manifest_path=None):
+        """
+        Upload a dataset file by parts, resuming a previously interrupted upload of the same file (see ChunkedUpload)
+        :return: the dataset creation json (dict)
+        """
+        return ChunkedUpload(self, project_id, file_path, part_size=part_size, parallel=parallel, retries=retries,
+                             manifest_path=manifest_path).run(data)
@@ -0,0 +1,73 @@
+import threading
+from concurrent.futures import Future
+from copy import deepcopy
+
+
+class SingleFlight(object):
+    """
+    Coalesces identical concurrent calls: while a call is in flight, the identical ones wait for its
+    response instead of being sent, and get a copy of it (or its error).
+    """
+
+    def __init__(self):
+        self.coalesced = 0
+        self.__lock = threading.Lock()
+        self.__calls = {}
+
+    def __repr__(self):
+        return "<{}>({}) - {} in flight | coalesced:{}".format(self.__class__.__name__, id(self), len(self.__calls),
+                                                               self.coalesced)
+
+    def __join(self, key, future_class):
+        with self.__lock:
+            _future = self.__calls.get(key)
+            if _future is not None:
+                self.coalesced += 1
+                return _future, False
+            _future = future_class()
+            self.__calls[key] = _future
+            return _future, True
+
+    def __leave(self, key):
+        # Calls arriving from now on are sent again, rather than given a response they could miss an update of
+        with self.__lock:
+            del self.__calls[key]
+
+    def call(self, key, send):
+        """Return the response of 'send', or of the identical call ('key') in flight."""
+        _future, _leader = self.__join(key, Future)
+        if not _leader:
+            return deepcopy(_future.result())
+        try:
+            _response = send()
+        except BaseException as E:
+            self.__leave(key)
+            _future.set_exception(E)
+            raise
+        self.__leave(key)
+        _future.set_result(_response)
+        return _response
+
+    async def acall(self, key, send):
+        """Asynchronous flavour of 'call', 'send' being a coroutine function."""
+        # asyncio is only loaded by the asynchronous routers
+        import asyncio
+        _loop = asyncio.get_running_loop()
+        _future, _leader = self.__join((id(_loop), key), _loop.create_future)
+        if not _leader:
+            return deepcopy(await asyncio.shield(_future))
+        try:
+            _response = await send()
+        except asyncio.CancelledError:
+            self.__leave((id(_loop), key))
+            _future.cancel()
+            raise
+        except BaseException as E:
+            self.__leave((id(_loop), key))
+            _future.set_exception(E)
+            # Marked as retrieved, whether calls are waiting for it or not
+            _future.exception()
+            raise
+        self.__leave((id(_loop), key))
+        _future.set_result(_response)
+        return _response
@@ -1,13 +1,27 @@
+from hypercube_api.hdp_api._pollingStrategy import BackoffPolling, FixedPolling
+
+
 class TimeOutSettings(object):
     """Manages timeout settings for different work states:
         - pending : work has not yet started and is waiting for resources
         - starting : resources have been allocated and the work is being launched
-        - progress : work is active and computing"""
+        - progress : work is active and computing
+    and the polling strategy used to watch works, optionally specialized per work type"""
+
+    # Long running works do not need to be watched as closely as short ones
+    _DEFAULT_POLLING_PROFILES = {
+        'learning': BackoffPolling(initial=1, maximum=30),
+        'minimization': BackoffPolling(initial=1, maximum=30),
+        'hypercubePrediction': BackoffPolling(initial=1, maximum=30),
+        'predictionRuleset': BackoffPolling(initial=1, maximum=30),
+    }
 
-    def __init__(self, pending=3600, starting=300, progress=3600):
+    def __init__(self, pending=3600, starting=300, progress=3600, polling=None):
         self._pending = pending
         self._starting = starting
         self._progress = progress
+        self._polling = polling or BackoffPolling(initial=0.2, maximum=10)
+        self._polling_profiles = dict(self._DEFAULT_POLLING_PROFILES)
 
     def __repr__(self):
         return "<{}>({}) - pending:{} | starting:{} | in progress:{}".format(self.__class__.__name__,
@@ -22,6 +36,9 @@ class TimeOutSettings(object):
         _msg += '\n\t- Pending     : {}s'.format(self._pending)
         _msg += '\n\t- Starting    : {}s'.format(self._starting)
         _msg += '\n\t- In Progress : {}s'.format(self._progress)
+        _msg += '\n\t- Polling     : {}'.format(self._polling)
+        for _work_type, _polling in self._polling_profiles.items():
+            _msg += '\n\t\t- {} : {}'.format(_work_type, _polling)
         return _msg
 
     def get_pending_timeout(self):
@@ -66,3 +83,33 @@ class TimeOutSettings(object):
         :param value (str/int/float): The timeout new value
         """
         self._progress = float(value)
+
+    def get_polling(self, work_type=None):
+        """
+        Get the polling strategy used to watch a work
+        :param work_type (str): The work type, default polling strategy if None or without specific profile
+        :return: polling strategy (PollingStrategy)
+        """
+        return self._polling_profiles.get(work_type, self._polling)
+
+    def set_polling(self, polling, work_type=None):
+        """
+        Set the polling strategy used to watch works
+        :param polling (PollingStrategy): The new polling strategy, removes the work type profile if None
+        :param work_type (str): The work type the strategy applies to, default polling strategy if None
+        """
+        if work_type is None:
+            if polling is None:
+                raise ValueError('The default polling strategy cannot be removed')
+            self._polling = polling
+        elif polling is None:
+            self._polling_profiles.pop(work_type, None)
+        else:
+            self._polling_profiles[work_type] = polling
+
+    def set_immediate_polling(self):
+        """
+        Probe the works of all types without delay, for instance when their states are replayed (see Cassette)
+        """
+        self._polling = FixedPolling(step=0)
+        self._polling_profiles = {}
@@ -0,0 +1,88 @@
+import contextvars
+from concurrent.futures import Future, InvalidStateError
+
+
+class WorkFuture(Future):
+    """A concurrent.futures compatible future, resolved with the result of a server work.
+    Continuations chained with 'then' run in the executor of the work tracker, never in the caller thread, but
+    in the context of the caller (its current span in particular).
+
+    Work futures are resolved by the tracker thread, which thus runs the callbacks added with 'add_done_callback'
+    (and the work status callbacks, see Router.submit_work). Such a callback must never wait for a work
+    ('handle_work_states', 'result'): the tracker would deadlock, leaving every pending work unresolved. A
+    continuation waiting for a work holds a worker of the executor, chain the futures it returns instead."""
+
+    def __init__(self, executor, source=None):
+        super().__init__()
+        self.__executor = executor
+        self.__source = source
+
+    def cancel(self):
+        """Cancel this future and the future it has been chained from."""
+        if not super().cancel():
+            return False
+        if self.__source is not None:
+            self.__source.cancel()
+        return True
+
+    def then(self, on_result, on_error=None):
+        """
+        Chain a continuation to this future
+        :param on_result (callable): Called with the result of this future, in the executor of the work tracker.
+            It may return a value or another future (rather than waiting for it)
+        :param on_error (callable): Called with the exception of this future. It may return a recovery value or raise
+        :return: a future resolved with the result of the continuation (WorkFuture)
+        """
+        _next = WorkFuture(self.__executor, source=self)
+        _context = contextvars.copy_context()
+
+        def _on_done(future):
+            if future.cancelled():
+                _next.cancel()
+                return
+            _exception = future.exception()
+            if _exception is None:
+                self.__executor.submit(_context.run, _next._run, on_result, future.result())
+            elif on_error is not None:
+                self.__executor.submit(_context.run, _next._run, on_error, _exception)
+            else:
+                _next._fail(_exception)
+
+        self.add_done_callback(_on_done)
+        return _next
+
+    def _run(self, fn, value):
+        if not self.set_running_or_notify_cancel():
+            return
+        try:
+            _result = fn(value)
+        except BaseException as E:
+            self._fail(E)
+            return
+
+        if isinstance(_result, Future):
+            _result.add_done_callback(self._copy)
+        else:
+            self._resolve(_result)
+
+    def _copy(self, future):
+        if future.cancelled():
+            self._fail(ValueError('A chained work has been cancelled'))
+        elif future.exception() is not None:
+            self._fail(future.exception())
+        else:
+            self._resolve(future.result())
+
+    def _resolve(self, result):
+        try:
+            self.set_result(result)
+        except InvalidStateError:
+            # The future has been cancelled meanwhile
+            pass
+
+    def _fail(self, exception):
+        try:
+            self.set_exception(exception)
+        except InvalidStateError:
+            # The future has been cancelled meanwhile
+            pass
@@ -0,0 +1,275 @@
+import contextvars
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from hypercube_api.hdp_api._workFuture import WorkFuture
+from hypercube_api.hdp_api.routes import Resilience, CircuitOpenException
+
+_LOGGER = logging.getLogger(__name__)
+# Tells the transient failures of the probes apart, for the routers without a resilience policy
+_DEFAULT_RESILIENCE = Resilience()
+
+
+def _getStatus(work):
+    if work is None:
+        return None
+    return work.get('_status', {}).get('kind', None)
+
+
+class _WorkWatch(object):
+    """A registration of a work in the tracker, resolved through its future."""
+
+    # Time given to a freshly created work to appear in the tasks list
+    _LOOKUP_TIMEOUT = 60
+
+    def __init__(self, future, project_id, work_id, timeout_settings, callback=None, work=None, query=None):
+        self.project_id = project_id
+        self.work_id = work_id
+        self.query = query
+        self.future = future
+        # The context of the caller, where the probes of this work alone and its callback run
+        self.context = contextvars.copy_context()
+        self._timeout_settings = timeout_settings
+        self._callback = callback
+        self._delays = None
+        self._status = None
+        self._since = time.monotonic()
+        self.due = self._since
+        self.work = None
+        if work is not None:
+            self.update(work, self._since)
+            self.schedule(self._since)
+
+    def _get_timeout(self):
+        if self._status is None:
+            return self._LOOKUP_TIMEOUT
+        if self._status == 'starting':
+            return self._timeout_settings.get_starting_timeout()
+        if self._status in ('creating', 'pending'):
+            return self._timeout_settings.get_pending_timeout()
+        return self._timeout_settings.get_progress_timeout()
+
+    def schedule(self, now):
+        """Compute the next time this work has to be probed, according to its polling strategy."""
+        if self._delays is None:
+            _work_type = self.work.get('type') if self.work else None
+            self._delays = self._timeout_settings.get_polling(_work_type).delays()
+            _delay = next(self._delays)
+            if _delay == 0:
+                # The work has just been probed (or its state is known), no need for an immediate probe
+                _delay = next(self._delays)
+        else:
+            _delay = next(self._delays)
+        self.due = now + _delay
+
+    def update(self, work, now):
+        """Update the watch with the last known state of its work."""
+        if work is None:
+            if now - self._since > self._LOOKUP_TIMEOUT:
+                if self.work_id:
+                    self.fail(ValueError('The work <{}> could not be found'.format(self.work_id)))
+                else:
+                    self.fail(ValueError('The corresponding work could not be found'))
+            return
+
+        _status = _getStatus(work)
+        _changed = self.work is None or _status != self._status
+        if self.work is None:
+            # Now that the work type is known, follow its own polling profile
+            self._delays = None
+            self.work_id = work.get('_id')
+        self.work = work
+
+        if _status is None:
+            self.fail(ValueError('Missing Status on work <{}>'.format(self.work_id)))
+            return
+
+        if _changed:
+            self._status = _status
+            self._since = now
+            if self._callback:
+                try:
+                    self.context.run(self._callback, work)
+                except Exception:
+                    _LOGGER.exception('Error during a work callback <%s>', self.work_id)
+
+        if _status == 'done':
+            self.resolve(work)
+        elif _status == 'error':
+            self.fail(ValueError('Work "{}" <{}> has failed'.format(work.get("type", "Unknown type"), self.work_id)))
+        elif now - self._since > self._get_timeout():
+            self.fail(ValueError('Timeout reached on work "{}" <{}>'.format(work.get("type", "Unknown type"), self.work_id)))
+
+    def miss(self, error, now):
+        """A probe of the work has failed on a transient error: probe it again later, unless its state timed out."""
+        if now - self._since > self._get_timeout():
+            self.fail(error)
+            return
+        self.schedule(now)
+        if isinstance(error, CircuitOpenException):
+            # No probe can go through before the circuit lets a trial call
+            self.due = max(self.due, now + error.remaining)
+
+    def resolve(self, work):
+        self.future._resolve(work)
+
+    def fail(self, exception):
+        self.future._fail(exception)
+
+
+class WorkTracker(object):
+    """Watches many works at once: every tick, the works of a same project are all refreshed with a
+    single tasks query, and their status updates are dispatched to the registered waiters."""
+
+    def __init__(self, router):
+        self.__router = router
+        self._condition = threading.Condition()
+        self._watches = []
+        self._thread = None
+        self._executor = None
+
+    def __repr__(self):
+        return "<{}>({}) - {} tracked works".format(self.__class__.__name__, id(self), len(self._watches))
+
+    @property
+    def executor(self):
+        """The executor running the continuations of the work futures."""
+        with self._condition:
+            if self._executor is None:
+                # Continuations call the server (fetching the created objects), as many at once as the connections
+                self._executor = ThreadPoolExecutor(max_workers=self.__router.session.pool_size,
+                                                    thread_name_prefix='WorkFuture')
+            return self._executor
+
+    def track(self, project_id, work_id=None, timeout_settings=None, callback=None, work=None, query=None):
+        """
+        Register a work to be tracked
+        :param project_id (str): The project of the work
+        :param work_id (str): The work to track
+        :param timeout_settings (TimeOutSettings): The timeouts and polling strategy, router defaults if None
+        :param callback (callable): Called with the work json each time its status changes
+        :param work (dict): The last known state of the work, if any
+        :param query (dict): The tasks query locating the work, if its ID is not known yet
+        :return: a future resolved with the work json once done (WorkFuture)
+        """
+        if work_id is None and query is None and work is None:
+            raise ValueError('Missing conditions for works')
+        timeout_settings = timeout_settings or self.__router._default_timeout_settings
+        _watch = _WorkWatch(WorkFuture(self.executor), project_id, work_id, timeout_settings,
+                            callback=callback, work=work, query=query)
+        if _watch.future.done():
+            return _watch.future
+
+        with self._condition:
+            self._watches.append(_watch)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self.__run, name='WorkTracker', daemon=True)
+                self._thread.start()
+            self._condition.notify_all()
+        return _watch.future
+
+    def wait(self, project_id, work_id=None, timeout_settings=None, callback=None, work=None, query=None):
+        """
+        Register a work to be tracked and block until it is done
+        :return: the work json (dict)
+        """
+        return self.track(project_id, work_id, timeout_settings=timeout_settings, callback=callback,
+                          work=work, query=query).result()
+
+    def __run(self):
+        try:
+            while True:
+                with self._condition:
+                    self._watches = [_w for _w in self._watches if not _w.future.done()]
+                    if not self._watches:
+                        self._thread = None
+                        return
+
+                    _now = time.monotonic()
+                    _wait = min(_w.due for _w in self._watches) - _now
+                    if _wait > 0:
+                        self._condition.wait(_wait)
+                        continue
+
+                    # Only the works due are probed, the others keep the delays of their polling strategy
+                    _projects = {}
+                    for _watch in self._watches:
+                        if _watch.due <= _now:
+                            _projects.setdefault(_watch.project_id, []).append(_watch)
+
+                for _project_id, _watches in _projects.items():
+                    try:
+                        self.__tick(_project_id, _watches)
+                    except Exception as E:
+                        # An unexpected answer (a malformed tasks list...) fails the works probed, not the tracker
+                        _LOGGER.exception('Error while tracking the works of the project <%s>', _project_id)
+                        for _watch in _watches:
+                            _watch.fail(E)
+        finally:
+            with self._condition:
+                if self._thread is threading.current_thread():
+                    # Interrupted, the works left fail and the next tracked work starts a new thread
+                    self._thread = None
+                    _watches, self._watches = self._watches, []
+                    for _watch in _watches:
+                        _watch.fail(RuntimeError('The work tracker has stopped'))
+
+    def __tick(self, project_id, watches):
+        # Works whose ID is still unknown have to be located with their own query first
+        _located = [_w for _w in watches if _w.work_id is None]
+        for _watch in _located:
+            work_data = {'projectId': project_id}
+            work_data.update(_watch.query)
+            try:
+                _works = _watch.context.run(self.__poll, project_id, work_data)
+            except Exception as E:
+                if self.__is_transient(E):
+                    _watch.miss(E, time.monotonic())
+                else:
+                    _watch.fail(E)
+                continue
+            _now = time.monotonic()
+            _watch.update(next(iter(_works), None) if _works else None, _now)
+            if _watch.due <= _now:
+                _watch.schedule(_now)
+
+        watches = [_w for _w in watches if _w not in _located]
+        if not watches:
+            return
+
+        _ids = sorted(set(_w.work_id for _w in watches))
+        work_data = {'projectId': project_id, '_id': {'$in': _ids}}
+        try:
+            if len(watches) == 1:
+                _works = watches[0].context.run(self.__poll, project_id, work_data)
+            else:
+                # Shared by several works, the query is traced apart from their callers
+                _works = self.__poll(project_id, work_data)
+        except Exception as E:
+            _now = time.monotonic()
+            for _watch in watches:
+                if self.__is_transient(E):
+                    _watch.miss(E, _now)
+                else:
+                    _watch.fail(E)
+            return
+
+        _works = dict((_w.get('_id'), _w) for _w in _works or [])
+        _now = time.monotonic()
+        for _watch in watches:
+            if _watch.future.done():
+                continue
+            _watch.update(_works.get(_watch.work_id), _now)
+            if _watch.due <= _now:
+                _watch.schedule(_now)
+
+    def __is_transient(self, error):
+        # A down server or an open circuit only delays the works, until the timeouts of their states
+        return (self.__router.resilience or _DEFAULT_RESILIENCE).is_recoverable(error)
+
+    def __poll(self, project_id, work_data):
+        _route = self.__router.Task.task
+        if _route._metrics is not None:
+            _route._metrics.increment(_route, _route._metrics.POLLS)
+        return _route(project_ID=project_id, json=work_data)
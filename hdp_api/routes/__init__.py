@@ -2,8 +2,16 @@ from abc import ABCMeta, abstractproperty, abstractmethod
 import inspect
 import random
 import re
+import sys
+import threading
 import time
-from requests.exceptions import HTTPError
+from datetime import datetime, timezone
+from json import dumps
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+from requests.exceptions import HTTPError, ConnectionError as RequestsConnectionError, Timeout as RequestsTimeout
+from hypercube_api.hdp_api._pollingStrategy import FixedPolling, BackoffPolling
+from hypercube_api.tracing import Span, get_tracer, start_span
 
 class RoutePathInvalidException(Exception):
     def __init__(self, name, value, path, validator):
@@ -15,11 +23,20 @@ class RoutePathInvalidException(Exception):
     def __str__(self):
         return 'Route path invalid : {}={} ({})\n\t{}'.format(self.name, self.value, self.validator.__class__.__name__, self.path)
 
+class CircuitOpenException(Exception):
+    def __init__(self, host, remaining):
+        self.host = host
+        self.remaining = remaining
+
+    def __str__(self):
+        return 'Circuit open for {} : the server is considered down, next trial in {:.1f}s'.format(self.host, self.remaining)
+
 class ValidatorObjectID(object):
     """(str) A 24 hex digit MongoDB ObjectID."""
+    _PATTERN = re.compile('[0-9a-z]{24}')
     @staticmethod
     def __call__(value):
-        return re.match('[0-9a-z]{24}','{}'.format(value)) is not None
+        return ValidatorObjectID._PATTERN.match(value if isinstance(value,str) else '{}'.format(value)) is not None
     @staticmethod
     def getRandom():
         return ''.join(random.choices('0123456789abcdef', k=24))
@@ -46,11 +63,210 @@ class ValidatorInt(object):
     def getRandom():
         return random.randint(0,100)
 
+class CircuitBreaker(object):
+    """
+    Fails fast when a host is down: after 'threshold' consecutive transient failures the circuit opens
+    and the calls raise a CircuitOpenException for 'reset_timeout' seconds. A single trial call is then
+    let through, whose success closes the circuit (and failure opens it again).
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, host, threshold=5, reset_timeout=30):
+        self.host = host
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.__lock = threading.Lock()
+        self.__failures = 0
+        self.__opened_at = None
+        self.__trial = False
+
+    def __repr__(self):
+        return '<{}>({}) - {} | {}'.format(self.__class__.__name__, id(self), self.host, self.state)
+
+    @property
+    def state(self):
+        with self.__lock:
+            if self.__opened_at is None:
+                return self.CLOSED
+            if time.monotonic() - self.__opened_at < self.reset_timeout:
+                return self.OPEN
+            return self.HALF_OPEN
+
+    def before_call(self):
+        with self.__lock:
+            if self.__opened_at is None:
+                return
+            _remaining = self.__opened_at + self.reset_timeout - time.monotonic()
+            if _remaining > 0 or self.__trial:
+                raise CircuitOpenException(self.host, max(_remaining, 0))
+            self.__trial = True
+
+    def success(self):
+        with self.__lock:
+            self.__failures = 0
+            self.__opened_at = None
+            self.__trial = False
+
+    def failure(self):
+        with self.__lock:
+            self.__failures += 1
+            if self.__trial or self.__failures >= self.threshold:
+                self.__opened_at = time.monotonic()
+            self.__trial = False
+
+class Resilience(object):
+    """
+    Retries and circuit breaking of the route calls.
+    Calls failing with a transient error (connection error, timeout or one of the 'statuses') are retried
+    up to 'retries' times, waiting for the delays of 'polling' or for the 'Retry-After' of the response
+    (at most 'max_retry_after' seconds). Only idempotent routes are retried (GET routes and the routes
+    flagged as such), unless 'retry_post' is set.
+    Transient failures are also counted by host: see CircuitBreaker ('breaker_threshold' to None to disable it).
+    """
+
+    def __init__(self, retries=3, polling=None, statuses=(502, 503, 504), retry_post=False, max_retry_after=120,
+                 breaker_threshold=5, breaker_timeout=30):
+        self.retries = retries
+        self.polling = polling or BackoffPolling(initial=0.5, factor=2, maximum=30, immediate=False)
+        self.statuses = statuses
+        self.retry_post = retry_post
+        self.max_retry_after = max_retry_after
+        self.breaker_threshold = breaker_threshold
+        self.breaker_timeout = breaker_timeout
+        self.__lock = threading.Lock()
+        self.__breakers = {}
+        # Breakers by session url, saving the parsing of the url on each call
+        self.__url_breakers = {}
+
+    def __repr__(self):
+        return '<{}>({}) - retries:{} | statuses:{} | breaker:{}'.format(self.__class__.__name__, id(self), self.retries,
+                                                                        self.statuses, self.breaker_threshold)
+
+    def breaker(self, url):
+        """The circuit breaker of the host of an url (None if disabled)."""
+        if self.breaker_threshold is None:
+            return None
+        _breaker = self.__url_breakers.get(url)
+        if _breaker is not None:
+            return _breaker
+        _host = urlparse(url).netloc or url
+        with self.__lock:
+            _breaker = self.__breakers.get(_host)
+            if _breaker is None:
+                _breaker = CircuitBreaker(_host, self.breaker_threshold, self.breaker_timeout)
+                self.__breakers[_host] = _breaker
+            self.__url_breakers[url] = _breaker
+            return _breaker
+
+    def is_transient(self, error):
+        if isinstance(error, HTTPError):
+            return error.response in self.statuses
+        _errors = (RequestsConnectionError, RequestsTimeout, ConnectionError, TimeoutError)
+        _aiohttp = sys.modules.get('aiohttp')
+        if _aiohttp is not None:
+            _errors += (_aiohttp.ClientConnectionError, _aiohttp.ServerTimeoutError)
+        return isinstance(error, _errors)
+
+    def call(self, route, request):
+        """Run 'request' (a call of 'route' without arguments), retrying it on transient errors."""
+        _breaker = self.breaker(route.session.url)
+        _delays = self.polling.delays()
+        for _attempt in range(self.retries + 1):
+            if _breaker:
+                _breaker.before_call()
+            try:
+                _result = request()
+            except Exception as E:
+                _delay = self.__retry_delay(route, _breaker, E, _attempt, _delays)
+                if _delay is None:
+                    raise
+            except BaseException:
+                # Interrupted (KeyboardInterrupt, cancellation), a failure: a trial call must not hold the circuit open
+                if _breaker:
+                    _breaker.failure()
+                raise
+            else:
+                if _breaker:
+                    _breaker.success()
+                return _result
+            time.sleep(_delay)
+
+    async def acall(self, route, request):
+        """Await 'request' (a coroutine function calling 'route'), retrying it on transient errors."""
+        import asyncio
+        _breaker = self.breaker(route.session.url)
+        _delays = self.polling.delays()
+        for _attempt in range(self.retries + 1):
+            if _breaker:
+                _breaker.before_call()
+            try:
+                _result = await request()
+            except Exception as E:
+                _delay = self.__retry_delay(route, _breaker, E, _attempt, _delays)
+                if _delay is None:
+                    raise
+            except BaseException:
+                # Interrupted (KeyboardInterrupt, cancellation), a failure: a trial call must not hold the circuit open
+                if _breaker:
+                    _breaker.failure()
+                raise
+            else:
+                if _breaker:
+                    _breaker.success()
+                return _result
+            await asyncio.sleep(_delay)
+
+    def is_recoverable(self, error):
+        """Whether waiting on the server can go on after this error: a transient one or an open circuit."""
+        return isinstance(error, CircuitOpenException) or self.is_transient(error)
+
+    def __retry_delay(self, route, breaker, error, attempt, delays):
+        # Returns the delay before the next attempt, None if the error has to be raised
+        if not self.is_transient(error):
+            if breaker:
+                # The server did answer
+                breaker.success()
+            return None
+        if breaker:
+            breaker.failure()
+        if attempt >= self.retries or not (route.idempotent or self.retry_post):
+            return None
+
+        if route._watcher:
+            route._watcher(str(route), 'retry')
+        if route._metrics is not None:
+            route._metrics.increment(route, route._metrics.RETRIES)
+        _delay = next(delays)
+        _retry_after = self.__retry_after(error)
+        if _retry_after is not None:
+            _delay = max(_delay, min(_retry_after, self.max_retry_after))
+        return _delay
+
+    @staticmethod
+    def __retry_after(error):
+        _value = (getattr(error, 'headers', None) or {}).get('Retry-After')
+        if _value is None:
+            return None
+        try:
+            return max(0., float(_value))
+        except ValueError:
+            pass
+        try:
+            return max(0., (parsedate_to_datetime(_value) - datetime.now(timezone.utc)).total_seconds())
+        except (TypeError, ValueError):
+            return None
+
 class Route(object):
     __metaclass__ = ABCMeta
     GET = "GET"
     POST = "POST"
     _path_keys = {}
+    # Whether calling the route twice is harmless (and can thus be retried), GET routes are by default
+    _idempotent = None
+    # '<Resource>.<route>' as reachable from a Router, set by the resource
+    key = None
 
     VALIDATOR_OBJECTID = ValidatorObjectID()
     VALIDATOR_ANY = ValidatorAny()
@@ -71,70 +287,149 @@ class Route(object):
         """The Route path as defined in the API schema"""
         return "Route Path"
 
-    def __init__(self,session, watcher=None):
+    def __init__(self,session, watcher=None, resilience=None, cache=None, single_flight=None, metrics=None):
         self.session = session
+        self._path_format, self._path_validators = self.compiled_path()
         self._watcher = watcher
+        self._resilience = resilience
+        self._cache = cache
+        self._single_flight = single_flight
+        self._metrics = metrics
 
-    def __call__(self,**kwargs):
-        formatter = dict.fromkeys(self._path_keys)
-        for _path_key, _validator in self._path_keys.items():
+    @property
+    def idempotent(self):
+        if self._idempotent is not None:
+            return self._idempotent
+        return self.httpMethod == Route.GET
+
+    @classmethod
+    def compiled_path(cls):
+        """The path template (without leading slash) and the (path key, validator) pairs, compiled once per class."""
+        _compiled = cls.__dict__.get('_compiled_path')
+        if _compiled is None:
+            _path = cls.path if cls.path[0] != '/' else cls.path[1:]
+            _compiled = (_path, tuple(cls._path_keys.items()))
+            cls._compiled_path = _compiled
+        return _compiled
+
+    def _format_path(self, kwargs):
+        """Pop the path keys from the call arguments, validate them and return the formatted path."""
+        if not self._path_validators:
+            return self._path_format
+        formatter = {}
+        for _path_key, _validator in self._path_validators:
             _value = kwargs.pop(_path_key,None)
             if not _validator(_value) :
                 raise RoutePathInvalidException(_path_key, _value, self.path, _validator)
             formatter[_path_key] = _value
-        _path = self.path if self.path[0] != '/' else self.path[1:]
-        _path = _path.format(**formatter)
+        return self._path_format.format_map(formatter)
+
+    def _call_key(self, path, kwargs):
+        """The key of a GET call response (path, query and body), None for the other calls and the streamed ones."""
+        if self.httpMethod != Route.GET or kwargs.get('stream') or kwargs.get('output') is not None:
+            return None
+        if not kwargs:
+            return path, '{}'
+        return path, dumps(dict((_k, _v) for _k, _v in kwargs.items() if _k != 'info'), sort_keys=True, default=str)
 
+    def __call__(self,**kwargs):
+        if get_tracer() is not None:
+            with self._span(kwargs) as _span:
+                try:
+                    return self._call(kwargs)
+                except HTTPError as HE:
+                    _span.set_attribute('http.status_code', HE.response)
+                    raise
+        return self._call(kwargs)
+
+    def _call(self, kwargs):
+        _project_id = kwargs.get('project_ID')
+        _path = self._format_path(kwargs)
+
+        if self._cache is not None:
+            return self._cache.call(self, _path, _project_id, kwargs, self._coalesced_send)
+        return self._coalesced_send(_path, kwargs)
+
+    def _span(self, kwargs):
+        return start_span(self.key or str(self), kind=Span.CLIENT,
+                          attributes={'http.method': self.httpMethod, 'hypercube.route': self.path,
+                                      'hypercube.project_id': kwargs.get('project_ID')})
+
+    def _coalesced_send(self, path, kwargs):
+        # Identical GET calls in flight share a single request
+        _key = self._call_key(path, kwargs) if self._single_flight is not None else None
+        if _key is None:
+            return self._send(path, kwargs)
+        return self._single_flight.call(_key, lambda: self._send(path, kwargs))
+
+    def _send(self, path, kwargs):
+        if self._metrics is not None:
+            return self._metrics.measure(self, lambda: self._watched_request(path, kwargs))
+        return self._watched_request(path, kwargs)
+
+    def _watched_request(self, path, kwargs):
         if self._watcher:
             self._watcher(str(self),kwargs.pop('info','call'))
             try:
-                _result = self.session.request(self.httpMethod, _path, **kwargs)
+                _result = self._request(path, kwargs)
                 self._watcher(str(self),'200')
                 return _result
             except HTTPError as HE:
                 self._watcher(str(self), str(HE.response))
                 raise
 
-        return self.session.request(self.httpMethod, _path, **kwargs)
+        return self._request(path, kwargs)
 
-    def call_when(self, condition=lambda x:True, call=lambda x: None, step=1, timeout=500, **kwargs):
-        _remaining = timeout
+    def _request(self, path, kwargs):
+        if self._resilience is None:
+            return self.session.request(self.httpMethod, path, idempotent=self.idempotent, **kwargs)
+        return self._resilience.call(self, lambda: self.session.request(self.httpMethod, path,
+                                                                        idempotent=self.idempotent, **kwargs))
 
-        if self._watcher:
-            kwargs['info'] = 'call'
+    def call_when(self, condition=lambda x:True, call=lambda x: None, step=1, timeout=500, polling=None, tolerate=None,
+                  **kwargs):
+        _found, _res = self.__poll(condition, step, timeout, polling, tolerate, kwargs)
+        if not _found:
+            return None
+        return call(_res)
 
-        while _remaining > 0:
-            _remaining = _remaining - step
-            time.sleep(step)
-            _res = self.__call__(**kwargs)
-            if condition(_res) :
-                return call(_res)
-            elif kwargs.get('info', None) == 'call':
-                kwargs['info'] = 'retry'
+    def wait_until(self, condition=lambda x:True, step=1, timeout=60, polling=None, tolerate=None, **kwargs):
+        return self.__poll(condition, step, timeout, polling, tolerate, kwargs)[1]
 
-
-        if self._watcher:
-            self._watcher(str(self),'timeout')
-        return None
-
-    def wait_until(self, condition=lambda x:True, step=1, timeout=60, **kwargs):
-        _remaining = timeout
+    def __poll(self, condition, step, timeout, polling, tolerate, kwargs):
+        # The first probe is immediate, the following ones are spaced out by the polling strategy.
+        # The errors for which 'tolerate' returns True are missed probes rather than failures
+        polling = polling or FixedPolling(step)
+        _deadline = time.monotonic() + timeout
 
         if self._watcher:
             kwargs['info'] = 'call'
 
-        while _remaining > 0:
-            _remaining = _remaining - step
-            time.sleep(step)
-            _res = self.__call__(**kwargs)
+        for _delay in polling.delays():
+            _remaining = _deadline - time.monotonic()
+            if _remaining <= 0:
+                break
+            if _delay > 0:
+                time.sleep(min(_delay, _remaining))
+            if self._metrics is not None:
+                self._metrics.increment(self, self._metrics.POLLS)
+            try:
+                _res = self.__call__(**kwargs)
+            except Exception as E:
+                # A tolerated failure only misses this probe, the polling goes on until the timeout
+                if tolerate is None or not tolerate(E):
+                    raise
+                continue
             if condition(_res) :
-                return _res
+                return True, _res
             elif kwargs.get('info', None) == 'call':
                 kwargs['info'] = 'retry'
 
         if self._watcher:
             self._watcher(str(self),'timeout')
-        return None
+        if self._metrics is not None:
+            self._metrics.increment(self, self._metrics.TIMEOUTS)
+        return False, None
 
     @property
     def help(self):
@@ -152,6 +447,112 @@ class Route(object):
         return '{: >4}:{}'.format(self.httpMethod, self.path)
 
 
+class AsyncRoute(object):
+    """Mixin giving a Route its asyncio flavour: calls must be awaited and go through an AsyncSession."""
+    _async_classes = {}
+
+    @classmethod
+    def of(cls, route_class):
+        """Return the asyncio flavour of a Route class (created once per class)."""
+        _async_class = cls._async_classes.get(route_class)
+        if _async_class is None:
+            _async_class = type(route_class.__name__, (cls, route_class), {})
+            cls._async_classes[route_class] = _async_class
+        return _async_class
+
+    async def __call__(self,**kwargs):
+        if get_tracer() is not None:
+            with self._span(kwargs) as _span:
+                try:
+                    return await self._call(kwargs)
+                except HTTPError as HE:
+                    _span.set_attribute('http.status_code', HE.response)
+                    raise
+        return await self._call(kwargs)
+
+    async def _call(self, kwargs):
+        _project_id = kwargs.get('project_ID')
+        _path = self._format_path(kwargs)
+
+        if self._cache is not None:
+            return await self._cache.acall(self, _path, _project_id, kwargs, self._coalesced_send)
+        return await self._coalesced_send(_path, kwargs)
+
+    async def _coalesced_send(self, path, kwargs):
+        _key = self._call_key(path, kwargs) if self._single_flight is not None else None
+        if _key is None:
+            return await self._send(path, kwargs)
+        return await self._single_flight.acall(_key, lambda: self._send(path, kwargs))
+
+    async def _send(self, path, kwargs):
+        if self._metrics is not None:
+            return await self._metrics.ameasure(self, lambda: self._watched_request(path, kwargs))
+        return await self._watched_request(path, kwargs)
+
+    async def _watched_request(self, path, kwargs):
+        if self._watcher:
+            self._watcher(str(self),kwargs.pop('info','call'))
+            try:
+                _result = await self._request(path, kwargs)
+                self._watcher(str(self),'200')
+                return _result
+            except HTTPError as HE:
+                self._watcher(str(self), str(HE.response))
+                raise
+
+        return await self._request(path, kwargs)
+
+    async def _request(self, path, kwargs):
+        if self._resilience is None:
+            return await self.session.request(self.httpMethod, path, idempotent=self.idempotent, **kwargs)
+        return await self._resilience.acall(self, lambda: self.session.request(self.httpMethod, path,
+                                                                               idempotent=self.idempotent, **kwargs))
+
+    async def call_when(self, condition=lambda x:True, call=lambda x: None, step=1, timeout=500, polling=None, tolerate=None,
+                  **kwargs):
+        _found, _res = await self.__poll(condition, step, timeout, polling, tolerate, kwargs)
+        if not _found:
+            return None
+        return call(_res)
+
+    async def wait_until(self, condition=lambda x:True, step=1, timeout=60, polling=None, tolerate=None, **kwargs):
+        return (await self.__poll(condition, step, timeout, polling, tolerate, kwargs))[1]
+
+    async def __poll(self, condition, step, timeout, polling, tolerate, kwargs):
+        import asyncio
+        polling = polling or FixedPolling(step)
+        _deadline = time.monotonic() + timeout
+
+        if self._watcher:
+            kwargs['info'] = 'call'
+
+        for _delay in polling.delays():
+            _remaining = _deadline - time.monotonic()
+            if _remaining <= 0:
+                break
+            if _delay > 0:
+                await asyncio.sleep(min(_delay, _remaining))
+            if self._metrics is not None:
+                self._metrics.increment(self, self._metrics.POLLS)
+            try:
+                _res = await self.__call__(**kwargs)
+            except Exception as E:
+                # A tolerated failure only misses this probe, the polling goes on until the timeout
+                if tolerate is None or not tolerate(E):
+                    raise
+                continue
+            if condition(_res) :
+                return True, _res
+            elif kwargs.get('info', None) == 'call':
+                kwargs['info'] = 'retry'
+
+        if self._watcher:
+            self._watcher(str(self),'timeout')
+        if self._metrics is not None:
+            self._metrics.increment(self, self._metrics.TIMEOUTS)
+        return False, None
+
+
 class Resource(object):
     __metaclass__ = ABCMeta
 
@@ -160,15 +561,28 @@ class Resource(object):
         """The resource name as defined in the API schema"""
         return "Resource Name"
 
-    def __init__(self,session, watcher=None):
+    def __init__(self,session, watcher=None, asynchronous=False, resilience=None, cache=None, single_flight=None,
+                 metrics=None):
         self.session = session
         self._routes = {}
-        for _route in (_m[1] for _m in inspect.getmembers(self.__class__) if inspect.isclass(_m[1]) and issubclass(_m[1], Route)) :
-            _routeInstance = _route(session, watcher=watcher)
-            _routeName = _route.__name__.lower().replace('_','')
+        for _routeName, _route in self.route_classes() :
+            if asynchronous:
+                _route = AsyncRoute.of(_route)
+            _routeInstance = _route(session, watcher=watcher, resilience=resilience, cache=cache,
+                                    single_flight=single_flight, metrics=metrics)
+            _routeInstance.key = '{}.{}'.format(self.__class__.__name__, _routeName)
             self.__setattr__(_routeName, _routeInstance)
             self._routes[_routeName] = _routeInstance
 
+    @classmethod
+    def route_classes(cls):
+        """The (route name, Route class) pairs of the resource, discovered once per resource class."""
+        _routes = cls.__dict__.get('_route_classes')
+        if _routes is None:
+            _routes = [(_m[1].__name__.lower().replace('_',''), _m[1]) for _m in inspect.getmembers(cls) if inspect.isclass(_m[1]) and issubclass(_m[1], Route)]
+            cls._route_classes = _routes
+        return _routes
+
     def __iter__(self):
         for _r in self._routes.values():
             yield _r
@@ -63,6 +63,42 @@ class Datasets(Resource):
             'project_ID': Route.VALIDATOR_OBJECTID,
         }
 
+    class _StartUpload(Route):
+        name = "startUpload"
+        httpMethod = Route.POST
+        path = "/projects/{project_ID}/datasets/uploads"
+        _path_keys = {
+            'project_ID': Route.VALIDATOR_OBJECTID,
+        }
+
+    class _GetUpload(Route):
+        name = "getUpload"
+        httpMethod = Route.GET
+        path = "/projects/{project_ID}/datasets/uploads/{upload_ID}"
+        _path_keys = {
+            'project_ID': Route.VALIDATOR_OBJECTID,
+            'upload_ID': Route.VALIDATOR_OBJECTID,
+        }
+
+    class _UploadPart(Route):
+        name = "uploadPart"
+        httpMethod = Route.POST
+        path = "/projects/{project_ID}/datasets/uploads/{upload_ID}/parts/{part_number}"
+        _path_keys = {
+            'project_ID': Route.VALIDATOR_OBJECTID,
+            'upload_ID': Route.VALIDATOR_OBJECTID,
+            'part_number': Route.VALIDATOR_INT,
+        }
+
+    class _CompleteUpload(Route):
+        name = "completeUpload"
+        httpMethod = Route.POST
+        path = "/projects/{project_ID}/datasets/uploads/{upload_ID}/complete"
+        _path_keys = {
+            'project_ID': Route.VALIDATOR_OBJECTID,
+            'upload_ID': Route.VALIDATOR_OBJECTID,
+        }
+
     class _Getadataset(Route):
         name = "Get a dataset"
         httpMethod = Route.GET
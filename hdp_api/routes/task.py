@@ -8,6 +8,8 @@ class Task(Resource):
         name = "task"
         httpMethod = Route.POST
         path = "/projects/{project_ID}/tasks"
+        # Tasks query, safe to retry
+        _idempotent = True
         _path_keys = {
             'project_ID': Route.VALIDATOR_OBJECTID,
         }
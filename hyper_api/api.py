@@ -1,19 +1,99 @@
 from hypercube_api.hdp_api._router import Router
 from hypercube_api.util import Helper
+from hypercube_api.utils.exceptions import ApiException
 from hypercube_api.hyper_api.project import ProjectFactory
+from hypercube_api.hyper_api.identity import IDENTITY_TTL
 
 
 class Api:
     @Helper.try_catch
-    def __init__(self, token=None, url='', username=None, password=None, watcher=None):
-        self.__api = Router(token=token, url=url, watcher=watcher, username=username, password=password)
-        system_details = self.__api.System.about()
+    def __init__(self, token=None, url='', username=None, password=None, watcher=None, pool_size=10, compression=None,
+                 resilience=None, cache=None, disk_cache=None, metrics=True, transport=None, identity_ttl=IDENTITY_TTL,
+                 pool_block=False, thread_local=False, coalesce=True):
+        self.__api = Router(token=token, url=url, watcher=watcher, username=username, password=password, pool_size=pool_size,
+                            pool_block=pool_block, thread_local=thread_local, compression=compression,
+                            resilience=resilience, cache=cache, coalesce=coalesce, disk_cache=disk_cache,
+                            metrics=metrics, transport=transport)
+        self.__system_details = None
+        self.identity_ttl = identity_ttl
+        self.Project = ProjectFactory(self.__api)
+
+        self.timeout_settings = self.__api._default_timeout_settings
+
+    def close(self):
+        """
+        Release the connections to the HyperCube server, the Api can also be used as a context manager:
+
+            with Api(url=url, token=token) as api:
+                ...
+        """
+        self.__api.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @property
+    def metrics(self):
+        """
+        The metrics of the HyperCube API calls (None if disabled), see Metrics.snapshot and Metrics.prometheus
+        """
+        return self.__api.metrics
+
+    def call_budget(self):
+        """
+        Account the HyperCube API calls made within a 'with' block, to enforce the call budgets of an operation:
+
+            with api.call_budget() as budget:
+                project.Ruleset.filter()
+            budget.assert_within(calls=2, routes={'Datasets.getadataset': 0})
+
+        Returns:
+            A CallBudget, with the calls, bytes and seconds of each route
+        """
+        if self.metrics is None:
+            raise ApiException('Call budgets are computed from the metrics, which are disabled (metrics=False)')
+        return self.__api.call_budget()
+
+    @property
+    def identity_ttl(self):
+        """
+        The seconds during which the collections listed by the factories are trusted, before their lookups list them
+        again (see clear_identity_maps)
+        """
+        return self.__api.identity_ttl
+
+    @identity_ttl.setter
+    def identity_ttl(self, value):
+        self.__api.identity_ttl = value
+        for identity_map in list(self.__api.identity_maps.values()):
+            identity_map.ttl = value
+
+    def clear_identity_maps(self):
+        """
+        Forget the objects known by the factories (datasets, X-rays, rulesets, models, targets and variables):
+        their next lookups list the collections again from the server
+        """
+        for identity_map in list(self.__api.identity_maps.values()):
+            identity_map.clear()
+
+    @Helper.try_catch
+    def about(self):
+        """
+        Print the url, name and version of the HyperCube server (fetched on the first call only)
+
+        Returns:
+            The server details (dict)
+        """
+        if self.__system_details is None:
+            self.__system_details = self.__api.System.about()
+        system_details = self.__system_details
         print('{}\n{} - {}\nVersion: {}\nBuild date: {}'.format(self.__api.session.url,
                                                                 system_details.get('name'),
                                                                 system_details.get('product'),
                                                                 system_details.get('version'),
                                                                 system_details.get('buildDate')
                                                                 ))
-        self.Project = ProjectFactory(self.__api)
-
-        self.timeout_settings = self.__api._default_timeout_settings
+        return system_details
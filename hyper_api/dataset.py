@@ -1,15 +1,40 @@
 from os.path import getsize, split
-import sys
+import tempfile
 import uuid
-import io
 from hypercube_api.util import Helper
 from hypercube_api.utils.exceptions import ApiException
 from hypercube_api.hyper_api.base import Base
+from hypercube_api.hyper_api.identity import IdentityMap
 from hypercube_api.hyper_api.variable import VariableFactory
 from hypercube_api.hyper_api.xray import XrayFactory
 from hypercube_api.hyper_api.ruleset import RulesetFactory
 
 
+class _DataFrameCsv(object):
+    """
+    Read-only file object over the csv of a DataFrame, serialized once by chunks of rows into a temporary file
+    (held in memory below 'spool_size' bytes). Its length, expected by the multipart encoder, is thus known
+    beforehand without rendering the csv twice nor holding it entirely in memory.
+    """
+
+    def __init__(self, dataframe, sep, encoding, chunk_rows=10000, spool_size=16 * 1024 * 1024):
+        self.__file = tempfile.SpooledTemporaryFile(max_size=spool_size)
+        for start in range(0, max(len(dataframe), 1), chunk_rows):
+            _rows = dataframe.iloc[start:start + chunk_rows]
+            self.__file.write(_rows.to_csv(sep=sep, index=False, header=start == 0).encode(encoding))
+        self.size = self.__file.tell()
+        self.__file.seek(0)
+
+    def __len__(self):
+        return self.size - self.__file.tell()
+
+    def read(self, size=-1):
+        return self.__file.read(size)
+
+    def close(self):
+        self.__file.close()
+
+
 class DatasetFactory:
     """
     """
@@ -20,7 +45,8 @@ class DatasetFactory:
     @Helper.try_catch
     def create(self, name, file_path, decimal='.',
                delimiter='', encoding='UTF-8', selectedSheet=1,
-               description='', modalities=2, continuous_threshold=0.95, missing_threshold=0.95):
+               description='', modalities=2, continuous_threshold=0.95, missing_threshold=0.95,
+               part_size=None, parallel_uploads=4):
         """
         Create a Dataset from a file (csv, Excel)
 
@@ -35,10 +61,42 @@ class DatasetFactory:
             modalities (int): Modality threshold for discrete variables (default : 2)
             continuous_threshold (float): % of continuous values threshold for continuous variables (default : 0.95)
             missing_threshold (float): % of missing values threshold for ignored variables (default : 0.95)
+            part_size (int): Upload the file by parts of this size in bytes, resuming an interrupted upload (default : None, in one request)
+            parallel_uploads (int): The number of parts uploaded concurrently (default : 4)
 
         Returns:
             Dataset
         """
+        return Helper.wait(self.submit_create(name, file_path, decimal=decimal, delimiter=delimiter, encoding=encoding,
+                                              selectedSheet=selectedSheet, description=description, modalities=modalities,
+                                              continuous_threshold=continuous_threshold, missing_threshold=missing_threshold,
+                                              part_size=part_size, parallel_uploads=parallel_uploads))
+
+    @Helper.try_catch
+    def submit_create(self, name, file_path, decimal='.',
+                      delimiter='', encoding='UTF-8', selectedSheet=1,
+                      description='', modalities=2, continuous_threshold=0.95, missing_threshold=0.95,
+                      part_size=None, parallel_uploads=4):
+        """
+        Upload a file (csv, Excel) and return without waiting for the Dataset to be validated
+
+        Args:
+            name (str): The name of the dataset
+            file_path (str): The origin path of the file
+            decimal (str): Decimal separator - csv files only (default : '.')
+            delimiter (str): The csv field delimiter - csv files only (default : ';')
+            encoding (str): The file encoding - csv files only (default : 'UTF-8')
+            selectedSheet (int): The worksheet to use (starts at 1 like in Hypercube User Interface) - Excel files only (default : 1),
+            description (str): The dataset description (default : '')
+            modalities (int): Modality threshold for discrete variables (default : 2)
+            continuous_threshold (float): % of continuous values threshold for continuous variables (default : 0.95)
+            missing_threshold (float): % of missing values threshold for ignored variables (default : 0.95)
+            part_size (int): Upload the file by parts of this size in bytes, resuming an interrupted upload (default : None, in one request)
+            parallel_uploads (int): The number of parts uploaded concurrently (default : 4)
+
+        Returns:
+            WorkFuture resolved with the Dataset
+        """
 
         project_id = self.__project_id
         dataset_path, file_name = split(file_path)
@@ -62,6 +120,11 @@ class DatasetFactory:
             'percentageMissingThreshold': str(missing_threshold)
         }
 
+        if part_size is not None:
+            creation_json = self.__api.upload_by_parts(project_id, file_path, data, part_size=part_size,
+                                                       parallel=parallel_uploads)
+            return self.__submit_dataset(creation_json)
+
         with open(file_path, 'rb') as FILE:
             data['file[0]'] = (
                 file_name,
@@ -72,15 +135,7 @@ class DatasetFactory:
 
             creation_json = self.__api.Datasets.uploaddatasets(**json)
 
-            try:
-                self.__api.handle_work_states(project_id, work_type='datasetValidation', query={"datasetId": creation_json.get('_id')})
-                self.__api.handle_work_states(project_id, work_type='datasetDescription', query={"datasetId": creation_json.get('_id')})
-            except Exception as E:
-                raise ApiException('Unable to get the dataset status', str(E))
-
-            returned_json = self.__api.Datasets.getadataset(project_ID=project_id, dataset_ID=creation_json.get('_id'))
-
-        return Dataset(self.__api, json, returned_json)
+        return self.__submit_dataset(creation_json)
 
     @Helper.try_catch
     def create_from_dataframe(self, name, dataframe, description='', modalities=2,
@@ -105,7 +160,7 @@ class DatasetFactory:
         SEPARATOR = ";"
         ENCODING = "utf-8"
 
-        stream_df = io.StringIO(dataframe.to_csv(sep=SEPARATOR, index=False))
+        stream_df = _DataFrameCsv(dataframe, SEPARATOR, ENCODING)
 
         data = {
             'name': name,
@@ -118,7 +173,7 @@ class DatasetFactory:
             'useSpark': 'False',
             'sourceFileName': file_name,
             'description': description,
-            'size': '{}'.format(sys.getsizeof(dataframe)),
+            'size': '{}'.format(stream_df.size),
             'nbModalitiesThreshold': str(modalities),
             'percentageContinuousThreshold': str(continuous_threshold),
             'percentageMissingThreshold': str(missing_threshold)
@@ -131,17 +186,12 @@ class DatasetFactory:
         )
         json = {'project_ID': project_id, 'data': data, 'streaming': True}
 
-        creation_json = self.__api.Datasets.uploaddatasets(**json)
-
         try:
-            self.__api.handle_work_states(project_id, work_type='datasetValidation', query={"datasetId": creation_json.get('_id')})
-            self.__api.handle_work_states(project_id, work_type='datasetDescription', query={"datasetId": creation_json.get('_id')})
-        except Exception as E:
-            raise ApiException('Unable to get the dataset status', str(E))
-
-        returned_json = self.__api.Datasets.getadataset(project_ID=project_id, dataset_ID=creation_json.get('_id'))
+            creation_json = self.__api.Datasets.uploaddatasets(**json)
+        finally:
+            stream_df.close()
 
-        return Dataset(self.__api, json, returned_json)
+        return Helper.wait(self.__submit_dataset(creation_json))
 
     @Helper.try_catch
     def create_from_sql(self, name, connection_string, query, description='', modalities=2,
@@ -180,15 +230,31 @@ class DatasetFactory:
         json = {'project_ID': project_id, 'json': dataset_data}
         creation_json = self.__api.Datasets.createdataset(**json)
 
-        try:
-            self.__api.handle_work_states(project_id, work_type='datasetValidation', query={"datasetId": creation_json.get('_id')})
-            self.__api.handle_work_states(project_id, work_type='datasetDescription', query={"datasetId": creation_json.get('_id')})
-        except Exception as E:
+        return Helper.wait(self.__submit_dataset(creation_json))
+
+    def __submit_dataset(self, creation_json):
+        project_id = self.__project_id
+        query = {"datasetId": creation_json.get('_id')}
+
+        def _on_error(E):
             raise ApiException('Unable to get the dataset status', str(E))
 
-        returned_json = self.__api.Datasets.getadataset(project_ID=project_id, dataset_ID=creation_json.get('_id'))
+        def _get_dataset(_):
+            returned_json = self.__api.Datasets.getadataset(project_ID=project_id, dataset_ID=creation_json.get('_id'))
+            return self._datasets().put(returned_json)
+
+        return self.__api.submit_work(project_id, work_type='datasetValidation', query=query) \
+            .then(lambda _: self.__api.submit_work(project_id, work_type='datasetDescription', query=query)) \
+            .then(_get_dataset, _on_error)
 
-        return Dataset(self.__api, json, returned_json)
+    def _datasets(self):
+        """The identity map of the datasets of the project"""
+        json = {'project_ID': self.__project_id}
+        api = self.__api
+        return IdentityMap.of(api, 'datasets', (self.__project_id,),
+                              load=lambda: api.Datasets.datasets(**json),
+                              wrap=lambda jsons: [Dataset(api, json, x) for x in jsons],
+                              name_of=lambda x: x.get('datasetName'))
 
     @Helper.try_catch
     def filter(self):
@@ -198,26 +264,22 @@ class DatasetFactory:
         Returns:
             list of datasets in the selected project (List[Dataset])
         """
-        json = {'project_ID': self.__project_id}
-        return list(map(lambda x: Dataset(self.__api, json, x), self.__api.Datasets.datasets(**json)))
+        return self._datasets().refresh()
 
     @Helper.try_catch
     def get(self, name):
         """
         Returns a dataset found by name or None if no match
         """
-        datasets = list(filter(lambda x: x.name == name, self.filter()))
-        if datasets:
-            return datasets[0]
-        return None
+        return self._datasets().get_by_name(name)
 
     @Helper.try_catch
     def get_by_id(self, id):
         """
-        Returns a dataset found by ID or None if no match
+        Returns a dataset found by ID or None if no match, always fetched from the server (unlike 'get')
         """
         json = {'project_ID': self.__project_id, 'dataset_ID': id}
-        return Dataset(self.__api, json, self.__api.Datasets.getadataset(**json))
+        return self._datasets().put(self.__api.Datasets.getadataset(**json))
 
     @Helper.try_catch
     def get_default(self):
@@ -348,7 +410,7 @@ class Dataset(Base):
 
     @property
     def rulesets(self):
-        return list(filter(lambda x: x.dataset_id == self.dataset_id, self.__Ruleset.filter()))
+        return self.__Ruleset.filter(dataset=self)
 
     @property
     def variables(self):
@@ -368,7 +430,15 @@ class Dataset(Base):
         if not self._is_deleted:
             self.__json_sent = {'project_ID': self.project_id, 'dataset_ID': self.dataset_id}
             self.__api.Datasets.defaultdataset(**self.__json_sent)
-            self.__json_returned = DatasetFactory(self.__api, self.project_id).get_by_id(self.dataset_id).__json_returned
+            # The default flag of every dataset of the project changes
+            _datasets = DatasetFactory(self.__api, self.project_id)._datasets()
+            _datasets.refresh()
+            _dataset = _datasets.get(self.dataset_id)
+            if _dataset is None:
+                # No longer listed (deleted meanwhile), its json is kept with the flag set
+                self.__json_returned['selected'] = True
+            else:
+                self.__json_returned = _dataset.__json_returned
         return self
 
     @Helper.try_catch
@@ -390,6 +460,30 @@ class Dataset(Base):
         Returns:
             The new training and test datasets
         """
+        return Helper.wait(self.submit_split(train_ratio=train_ratio, random_state=random_state,
+                                             keep_proportion_variable=keep_proportion_variable,
+                                             train_dataset_name=train_dataset_name, train_dataset_desc=train_dataset_desc,
+                                             test_dataset_name=test_dataset_name, test_dataset_desc=test_dataset_desc))
+
+    @Helper.try_catch
+    def submit_split(self, train_ratio=0.7, random_state=42, keep_proportion_variable=None, train_dataset_name=None,
+                     train_dataset_desc=None, test_dataset_name=None, test_dataset_desc=None):
+        """
+        Launch the split of the dataset into two subsets for training and testing models, without waiting for its end.
+
+        Args:
+            train_ratio (float): ratio between training set size and original data set size
+            random_state (int): seed used by the random number generator
+            keep_proportion_variable (Variable): discrete variable which modalities
+                keep similar proportions in training and test sets
+            train_dataset_name (str): name of the training set
+            train_dataset_desc (str): description of the training set
+            test_dataset_name (str): name of the test set
+            test_dataset_desc (str): description of the test set
+
+        Returns:
+            WorkFuture resolved with the new training and test datasets
+        """
         if not self._is_deleted:
             if not 0 < train_ratio < 1:
                 raise ApiException('train_ratio must be greater than 0 and lower than 1')
@@ -421,13 +515,15 @@ class Dataset(Base):
             json = {'project_ID': self.project_id, 'dataset_ID': self.dataset_id, 'json': data}
             split_json = self.__api.Datasets.split(**json)
 
-            try:
-                self.__api.handle_work_states(self.project_id, work_type='datasetSplit', work_id=split_json.get('id'))
-            except Exception as E:
+            def _on_error(E):
                 raise ApiException('Unable to get the split status', str(E))
 
-            factory = DatasetFactory(self.__api, self.project_id)
-            return factory.get(train_name), factory.get(test_name)
+            def _get_datasets(_):
+                factory = DatasetFactory(self.__api, self.project_id)
+                return factory.get(train_name), factory.get(test_name)
+
+            return self.__api.submit_work(self.project_id, work_type='datasetSplit', work_id=split_json.get('id')) \
+                .then(_get_datasets, _on_error)
 
     def __get_unique_names(self, train_name, test_name):
         set_names = [set.name for set in DatasetFactory(self.__api, self.project_id).filter()]
@@ -445,7 +541,17 @@ class Dataset(Base):
         return "{}_{}".format(train_name, suffix), "{}_{}".format(test_name, suffix)
 
     @Helper.try_catch
-    def _export(self):
+    def _export(self, stream=False, output=None):
+        """
+        Export the dataset as csv
+
+        Args:
+            stream (bool): Return an iterator of bytes chunks instead of loading the whole csv in memory
+            output (str or file): Write the csv to this file path (or binary file object) instead
+
+        Returns:
+            bytes, or an iterator of bytes when streamed, or the output when given
+        """
         json = {
             "format": "csv",
             "useFileStream": True,
@@ -465,11 +571,10 @@ class Dataset(Base):
         _task_id = _filter_task.get('_id')
         self.__api.handle_work_states(self.project_id, work_type='dataGrid', work_id=_task_id)
 
-        _exported = io.StringIO()
-        _exported = self.__api.Datasets.exportcsv(project_ID=self.project_id,
-                                                  dataset_ID=self.dataset_id,
-                                                  params={"task_id": _task_id})
-        return _exported
+        return self.__api.Datasets.exportcsv(project_ID=self.project_id,
+                                             dataset_ID=self.dataset_id,
+                                             params={"task_id": _task_id},
+                                             stream=stream, output=output)
 
     @Helper.try_catch
     def export_csv(self, path):
@@ -480,8 +585,7 @@ class Dataset(Base):
             path (str): The destination path for the resulting csv
         """
         if not self._is_deleted:
-            with open(path, 'wb') as FILE_OUT:
-                FILE_OUT.write(self._export())
+            self._export(output=path)
 
     @Helper.try_catch
     def export_dataframe(self):
@@ -496,5 +600,35 @@ class Dataset(Base):
                 import pandas
             except ImportError as E:
                 raise ApiException('Pandas is required for this operation, please execute "!pip install pandas" and restart the kernel', str(E))
-            _data = io.StringIO(self._export().decode('utf-8'))
-            return pandas.read_csv(_data, sep=";")
+            _chunks = self._export(stream=True)
+            if _chunks is None:
+                raise ApiException('Unable to export the dataset {}'.format(self.name))
+            with Helper.open_stream(_chunks) as _data:
+                return pandas.read_csv(_data, sep=";")
+
+    def iter_batches(self, batch_rows=100000, as_array=False):
+        """
+        Export the dataset by batches of rows, the csv being parsed as it is downloaded
+
+        Args:
+            batch_rows (int): The maximum number of rows in a batch. Default is 100000
+            as_array (bool): Yield NumPy arrays instead of pandas DataFrames. Default is False
+
+        Yields:
+            DataFrame (or NumPy array) of at most batch_rows rows
+        """
+        if self._is_deleted:
+            return
+        if not isinstance(batch_rows, int) or batch_rows < 1:
+            raise ApiException('batch_rows must be a positive integer')
+        try:
+            import pandas
+        except ImportError as E:
+            raise ApiException('Pandas is required for this operation, please execute "!pip install pandas" and restart the kernel', str(E))
+
+        _chunks = self._export(stream=True)
+        if _chunks is None:
+            raise ApiException('Unable to export the dataset {}'.format(self.name))
+        with Helper.open_stream(_chunks) as _data:
+            for _batch in pandas.read_csv(_data, sep=";", chunksize=batch_rows):
+                yield _batch.values if as_array else _batch
@@ -0,0 +1,192 @@
+import threading
+import time
+
+# Seconds during which a collection listed is trusted, before the lookups list it again
+IDENTITY_TTL = 60.
+
+
+class IdentityMap(object):
+    """
+    The objects of a server collection (the datasets of a project, the variables of a dataset...), kept with a
+    single wrapper per server ID and indexed by ID and by name, so that repeated lookups cost no server call.
+
+    The collection is listed again by 'refresh', when a lookup misses (the object may have been created since)
+    and when the listing is older than 'ttl' seconds. A refresh is incremental: the known wrappers get the new
+    json in place, only the new objects are wrapped and the objects gone from the server are dropped.
+    Deleted wrappers are never returned. Maps are shared by the factories of a same Api, see 'of'.
+    """
+
+    def __init__(self, load, wrap, id_of=None, name_of=None, aliases_of=None, ttl=IDENTITY_TTL):
+        """
+        Args:
+            load (callable): Returns the jsons of the whole collection
+            wrap (callable): Returns the wrappers of a list of jsons (wrapped by batches)
+            id_of (callable): Returns the ID of a json, default is its '_id'
+            name_of (callable): Returns the name of a json, default is its 'name'
+            aliases_of (callable): Returns the other IDs a json is also found by, default is None
+            ttl (float): Seconds during which a listing is trusted, default is IDENTITY_TTL
+        """
+        self.__load = load
+        self.__wrap = wrap
+        self.__id_of = id_of or (lambda json: json.get('_id'))
+        self.__name_of = name_of or (lambda json: json.get('name'))
+        self.__aliases_of = aliases_of
+        self.ttl = ttl
+        self.__lock = threading.RLock()
+        self.__by_id = {}
+        self.__by_alias = {}
+        self.__by_name = {}
+        self.__listed_at = None
+
+    def __repr__(self):
+        return "<{}>({}) - {} objects".format(self.__class__.__name__, id(self), len(self.__by_id))
+
+    @classmethod
+    def of(cls, api, collection, scope, load, wrap, **kwargs):
+        """
+        Get the identity map of a collection of an Api, created on first use
+
+        Args:
+            api (Router): The router of the Api, holding its identity maps
+            collection (str): The name of the collection ('datasets')
+            scope (tuple): The IDs scoping the collection (the project ID, the dataset ID...)
+            load (callable), wrap (callable), kwargs: See IdentityMap, used when the map is created, its 'ttl'
+                being the 'identity_ttl' of the router unless given
+
+        Returns:
+            IdentityMap
+        """
+        _key = (collection, scope)
+        _map = api.identity_maps.get(_key)
+        if _map is None:
+            if 'ttl' not in kwargs and api.identity_ttl is not None:
+                kwargs['ttl'] = api.identity_ttl
+            _map = api.identity_maps.setdefault(_key, cls(load, wrap, **kwargs))
+        return _map
+
+    @staticmethod
+    def __alive(wrapper):
+        return wrapper is not None and not getattr(wrapper, '_is_deleted', False)
+
+    def __expired(self):
+        return self.__listed_at is None or time.monotonic() - self.__listed_at >= self.ttl
+
+    def __index(self, wrapper):
+        _json = wrapper._json
+        if self.__aliases_of is not None:
+            for _alias in self.__aliases_of(_json):
+                self.__by_alias[_alias] = wrapper
+        self.__by_name.setdefault(self.__name_of(_json), wrapper)
+
+    def refresh(self):
+        """
+        List the collection again
+
+        Returns:
+            The wrappers of the collection, in the server order
+        """
+        with self.__lock:
+            _jsons = self.__load()
+            _new = [_json for _json in _jsons if self.__id_of(_json) not in self.__by_id]
+            _wrapped = dict((self.__id_of(_json), _wrapper) for _json, _wrapper in zip(_new, self.__wrap(_new)))
+            _by_id = {}
+            for _json in _jsons:
+                _id = self.__id_of(_json)
+                _wrapper = _wrapped.get(_id)
+                if _wrapper is None:
+                    _wrapper = self.__by_id[_id]
+                    # Shared by the wrapper classes, the json is updated rather than replaced
+                    _wrapper._json.clear()
+                    _wrapper._json.update(_json)
+                _by_id[_id] = _wrapper
+            self.__by_id = _by_id
+            self.__by_alias = {}
+            self.__by_name = {}
+            for _wrapper in _by_id.values():
+                self.__index(_wrapper)
+            self.__listed_at = time.monotonic()
+            return list(_by_id.values())
+
+    def all(self):
+        """
+        Returns:
+            The wrappers of the collection, listed again only if expired
+        """
+        with self.__lock:
+            if self.__expired():
+                return self.refresh()
+            return [_wrapper for _wrapper in self.__by_id.values() if self.__alive(_wrapper)]
+
+    def __lookup(self, find):
+        with self.__lock:
+            _refreshed = self.__expired()
+            if _refreshed:
+                self.refresh()
+            _wrapper = find()
+            if not self.__alive(_wrapper) and not _refreshed:
+                self.refresh()
+                _wrapper = find()
+            return _wrapper if self.__alive(_wrapper) else None
+
+    def get(self, id):
+        """
+        Returns:
+            The wrapper of the object with this ID (or alias) or None
+        """
+        return self.__lookup(lambda: self.__by_id.get(id) or self.__by_alias.get(id))
+
+    def get_by_name(self, name):
+        """
+        Returns:
+            The wrapper of the first object listed with this name or None
+        """
+        def _find():
+            _wrapper = self.__by_name.get(name)
+            # Renamed locally since the last listing
+            if _wrapper is not None and self.__name_of(_wrapper._json) != name:
+                return None
+            return _wrapper
+        return self.__lookup(_find)
+
+    def get_many(self, ids):
+        """
+        Get several objects, listing the collection once at most
+
+        Returns:
+            The wrappers by ID (dict), the IDs not found being missing
+        """
+        with self.__lock:
+            if self.__expired() or any(not self.__alive(self.__by_id.get(_id)) for _id in ids):
+                self.refresh()
+            return dict((_id, self.__by_id[_id]) for _id in ids if self.__alive(self.__by_id.get(_id)))
+
+    def put(self, json, wrapper=None):
+        """
+        Register an object fetched or created apart from the listings
+
+        Args:
+            json (dict): The json of the object
+            wrapper: The wrapper of the object if it is not known yet, made with 'wrap' if None
+
+        Returns:
+            The wrapper of the object
+        """
+        with self.__lock:
+            _id = self.__id_of(json)
+            _wrapper = self.__by_id.get(_id)
+            if _wrapper is None:
+                _wrapper = wrapper if wrapper is not None else self.__wrap([json])[0]
+                self.__by_id[_id] = _wrapper
+            else:
+                _wrapper._json.clear()
+                _wrapper._json.update(json)
+            self.__index(_wrapper)
+            return _wrapper
+
+    def clear(self):
+        """Forget the known objects, the next lookup lists the collection again."""
+        with self.__lock:
+            self.__by_id = {}
+            self.__by_alias = {}
+            self.__by_name = {}
+            self.__listed_at = None
@@ -1,11 +1,8 @@
 from hypercube_api.util import Helper
 from hypercube_api.hyper_api.base import Base
+from hypercube_api.hyper_api.identity import IdentityMap
 from hypercube_api.utils.exceptions import ApiException
 from datetime import datetime
-from pandas import read_csv
-from numpy import reshape
-from io import StringIO
-from json import dump
 
 
 class ModelFactory:
@@ -21,15 +18,10 @@ class ModelFactory:
         self.__algo_list = ['HyperCube', 'LogisticRegression', 'DecisionTree', 'RandomForest', 'GradientBoosting']
         self.__dataset = project
 
-    @Helper.try_catch
-    def filter(self):
-        """
-        Get all models
-
-        Returns:
-            The list of models
-        """
+    def _models(self):
+        """The identity map of the models of the project"""
         project_id = self.__dataset.project_id
+        api = self.__api
 
         data = {
             'projectId': project_id,
@@ -38,9 +30,22 @@ class ModelFactory:
                      }
         }
         json = {'project_ID': project_id, 'json': data}
-        json_returned = self.__api.Task.task(**json)
-        return [HyperCube(self.__api, model_json) if model_json.get('algoType') == self._HYPERCUBE_ALGO_TYPE
-                else Model(self.__api, model_json) for model_json in json_returned]
+        return IdentityMap.of(api, 'models', (project_id,),
+                              load=lambda: api.Task.task(**json),
+                              wrap=lambda jsons: [HyperCube(api, model_json)
+                                                  if model_json.get('algoType') == self._HYPERCUBE_ALGO_TYPE
+                                                  else Model(api, model_json) for model_json in jsons],
+                              name_of=lambda x: x.get('modelName'))
+
+    @Helper.try_catch
+    def filter(self):
+        """
+        Get all models
+
+        Returns:
+            The list of models
+        """
+        return self._models().refresh()
 
     @Helper.try_catch
     def get(self, name):
@@ -50,10 +55,7 @@ class ModelFactory:
         Returns:
             The Model or None
         """
-        models = list(filter(lambda x: x.name == name, self.filter()))
-        if models:
-            return models[0]
-        return None
+        return self._models().get_by_name(name)
 
     @Helper.try_catch
     def get_by_id(self, id):
@@ -63,10 +65,7 @@ class ModelFactory:
         Returns:
             The Model or None
         """
-        models = [model for model in self.filter() if model.id == id]
-        if models:
-            return models[0]
-        return None
+        return self._models().get(id)
 
     @Helper.try_catch
     def predict_from_ruleset(self, dataset_source, dataset_predict, rulesetname, name, target, nb_minimizations=1, coverage_increment=0.01):
@@ -151,6 +150,44 @@ class ModelFactory:
         Returns:
             the created model
         """
+        return Helper.wait(self.submit_create_hypercube(dataset, name, target, purity_min, coverage_min, rule_complexity, quantiles,
+                                                        min_marginal_contribution, max_complexity, nb_minimizations, coverage_increment,
+                                                        split_ratio, nb_iterations, purity_tolerance, enable_custom_discretizations,
+                                                        save_all_rules))
+
+    @Helper.try_catch
+    def submit_create_hypercube(self, dataset, name, target, purity_min=None, coverage_min=None, rule_complexity=2, quantiles=10, min_marginal_contribution=None,
+                                max_complexity=3, nb_minimizations=1, coverage_increment=0.01, split_ratio=0.7, nb_iterations=1,
+                                purity_tolerance=0.1, enable_custom_discretizations=True, save_all_rules=False):
+        """
+        Launch the creation of a HyperCube classifier model, without waiting for its end
+
+        Args:
+            dataset (Dataset): Dataset the model is fitted on
+            name (str): Name of the new model
+            target (Target): Target used to generate the model
+            purity_min (float): Minimum purity of rules, default is the entire dataset purity
+            coverage_min (int): Minimum coverage of the target population for each rule, default is 10
+            rule_complexity (int): Maximum number of variables in rules, default is 2
+            quantiles (int): Number of bins for all continuous numeric variables during quantization, default is 10
+            min_marginal_contribution (float): a new rule R', created by adding a new constraint to an existing rule R (and thus increasing its complexity),
+                is added to the ruleset if and only if it increases the original purity of R by the minimum marginal contribution or more. Default is 0.1
+            max_complexity (int): maximum number of variables contained in the rules created during the local complexity increase phase. Default is 3
+            nb_minimizations (int): Number of minimizations to perform on the ruleset, default is 1
+            coverage_increment (float): Percentage increment of target samples that a new rule must bring to be added to the minimized ruleset,
+                default is 0.01
+            split_ratio (float): the first step in the model generation is the random split of the original dataset into a learning (or train) dataset
+                representing by default 70% of the original dataset, and a validation (or test) dataset containing the remaining 30%. Default is 0.7
+            nb_iterations (int): The final model is the result of several models based on different splits of the original dataset, using a bootstrap method.
+                The parameter "Number of iterations" corresponds to the number of these splits that are made. Default is 1
+            purity_tolerance (float): maximum spread between the purities of the rules applied to the learning and validation datasets
+            enable_custom_discretizations (boolean): when ticked use the custom discretization(s) link to the selected dataset,
+                eventually use "Quantiles" parameter for remaining variables. Default is True
+            save_all_rules (boolean): save all generated rules in a new ruleset. Default is False
+
+        Returns:
+            WorkFuture resolved with the created model
+        """
         variable = next(variable for variable in dataset.variables if variable.name == target.variable_name)
         index = variable.modalities.index(target.modality)
         datasetPurity = variable.purities[index]
@@ -277,12 +314,11 @@ class ModelFactory:
         json = {'project_ID': dataset.project_id, 'json': data}
         json_returned = self.__api.Task.createtask(**json)
 
-        try:
-            self.__api.handle_work_states(dataset.project_id, work_type=json_returned.get('type'), work_id=json_returned.get('_id'))
-        except Exception as E:
+        def _on_error(E):
             raise ApiException('Unable to create the HyperCube model ' + name, str(E))
 
-        return HyperCube(self.__api, json_returned)
+        return self.__api.submit_work(dataset.project_id, work_type=json_returned.get('type'), work_id=json_returned.get('_id')) \
+            .then(lambda _: self._models().put(json_returned, HyperCube(self.__api, json_returned)), _on_error)
 
     @Helper.try_catch
     def get_or_create_hypercube(self, dataset, name, target=None, purity_min=None, coverage_min=None, rule_complexity=2, quantiles=10,
@@ -533,6 +569,23 @@ class HyperCube(Model):
         Returns:
             the applied Model
         """
+        return Helper.wait(self.submit_apply(dataset, applied_model_name, add_score_to_dataset=add_score_to_dataset,
+                                             score_column_name=score_column_name))
+
+    @Helper.try_catch
+    def submit_apply(self, dataset, applied_model_name, add_score_to_dataset=False, score_column_name=None):
+        """
+        Launch the application of the HyperCube classifier model on a selected data set, without waiting for its end
+
+        Args:
+            dataset (Dataset): Dataset the model is applied on
+            applied_model_name (str): Name of the new applied model
+            add_score_to_dataset (boolean): if set to True a new column containing the scores is added to the dataset.
+                Default is False.
+            score_column_name (str): name of the score column, used only if add_score_to_dataset is set to True
+        Returns:
+            WorkFuture resolved with the applied Model
+        """
 
         params = dict(self.__json_returned)
         params['modelName'] = applied_model_name
@@ -553,12 +606,17 @@ class HyperCube(Model):
 
         json = {'project_ID': dataset.project_id, 'json': data}
         json_returned = self.__api.Task.createtask(**json)
-        try:
-            self.__api.handle_work_states(dataset.project_id, work_type=json_returned.get('type'), work_id=json_returned.get('_id'))
-        except Exception as E:
+
+        def _on_error(E):
             raise ApiException('Unable to create the applied HyperCube model ' + applied_model_name, str(E))
 
-        return HyperCube(self.__api, json_returned)
+        def _get_model(_):
+            # Registered with the models of the project of the dataset
+            _models = ModelFactory(self.__api, dataset)._models()
+            return _models.put(json_returned, HyperCube(self.__api, json_returned))
+
+        return self.__api.submit_work(dataset.project_id, work_type=json_returned.get('type'), work_id=json_returned.get('_id')) \
+            .then(_get_model, _on_error)
 
     @Helper.try_catch
     def export_scores(self, path, variables=None):
@@ -586,10 +644,7 @@ class HyperCube(Model):
             'outputFile': outputFile
         }
         json = {'project_ID': self.project_id, 'model_ID': self.id, 'params': data}
-        to_export = self.__api.Prediction.getexportscores(**json)
-
-        with open(path, 'wb') as FILE_OUT:
-            FILE_OUT.write(to_export)
+        self.__api.Prediction.getexportscores(output=path, **json)
 
     @Helper.try_catch
     def predict_scores(self, dataset, keep_applied_model=False):
@@ -604,7 +659,63 @@ class HyperCube(Model):
         Returns:
             a NumPy array of shape [n_samples,] where n_samples is the number of samples in the input dataset
         """
+        pandas = self.__import_pandas()
+        applied_model = self.__apply_for_scores(dataset)
+        scores = self.__stream_scores(applied_model, dataset)
+
+        try:
+            with Helper.open_stream(scores) as scoreIO:
+                df = pandas.read_csv(scoreIO, sep=';', skiprows=1, usecols=[1])
+        except Exception as E:
+            raise ApiException('Unable to read the model scores for {}'.format(self.name), str(E))
+
+        if not keep_applied_model:
+            applied_model.delete()
+
+        return df.values.reshape(df.values.shape[0])
+
+    def iter_scores(self, dataset, batch_rows=100000, keep_applied_model=False):
+        """
+        Predict target scores for input dataset by batches of samples, the scores being parsed as they are downloaded
+
+        Args:
+            dataset (Dataset): the dataset containing the input samples.
+            batch_rows (int): the maximum number of samples in a batch. Default is 100000
+            keep_applied_model (boolean): A HyperCube applied model is temporarily created to compute these scores,
+                set this parameter to True if you want this model to be persisted. Default is False.
+
+        Yields:
+            NumPy arrays of shape [n_samples,] where n_samples is at most batch_rows
+        """
+        if not isinstance(batch_rows, int) or batch_rows < 1:
+            raise ApiException('batch_rows must be a positive integer')
+        pandas = self.__import_pandas()
+        applied_model = self.__apply_for_scores(dataset)
+        try:
+            scores = self.__stream_scores(applied_model, dataset)
+            with Helper.open_stream(scores) as scoreIO:
+                for df in pandas.read_csv(scoreIO, sep=';', skiprows=1, usecols=[1], chunksize=batch_rows):
+                    yield df.values.reshape(df.values.shape[0])
+        finally:
+            if not keep_applied_model:
+                applied_model.delete()
+
+    @staticmethod
+    def __import_pandas():
+        # Loaded on demand, pandas takes most of the import time of the package
+        try:
+            import pandas
+        except ImportError as E:
+            raise ApiException('Pandas is required for this operation, please execute "!pip install pandas" and restart the kernel', str(E))
+        return pandas
+
+    def __apply_for_scores(self, dataset):
         applied_model = self.apply(dataset, '{}_applied_{}'.format(self.name, datetime.now().strftime("%Y-%m-%d_%H-%M-%S")))
+        if applied_model is None:
+            raise ApiException('Unable to apply the model {} on {}'.format(self.name, dataset.name))
+        return applied_model
+
+    def __stream_scores(self, applied_model, dataset):
         data = {
             'datasetId': dataset.dataset_id,
             'columns': []
@@ -622,18 +733,7 @@ class HyperCube(Model):
             'outputFile': outputFile
         }
         json = {'project_ID': applied_model.project_id, 'model_ID': applied_model.id, 'params': data}
-        scores = self.__api.Prediction.getexportscores(**json)
-        scoreIO = StringIO(scores.decode('utf-8'))
-
-        try:
-            df = read_csv(scoreIO, sep=';', skiprows=1, usecols=[1])
-        except Exception as E:
-            raise ApiException('Unable to read the model scores for {}'.format(self.name), str(E))
-
-        if not keep_applied_model:
-            applied_model.delete()
-
-        return reshape(df.values, (df.values.shape[0]))
+        return self.__api.Prediction.getexportscores(stream=True, **json)
 
     @Helper.try_catch
     def export_model(self, path, format='Python'):
@@ -651,13 +751,8 @@ class HyperCube(Model):
         json = {'project_ID': self.project_id, 'model_ID': self.id, 'params': data}
         url = self.__api.Prediction.exportrules(**json)
         url = url.decode("utf-8").replace(URL_PREFIX, '')
-        to_export = self.__api.session.request(url=url, method='get')
-        if isinstance(to_export, bytes):
-            with open(path, 'wb') as FILE_OUT:
-                FILE_OUT.write(to_export)
-        else:
-            with open(path, 'w') as FILE_OUT:
-                dump(to_export, FILE_OUT)
+        # Written as received: json exports are not parsed and dumped back
+        self.__api.session.request(url=url, method='get', output=path)
 
 
 class ConfusionMatrix:
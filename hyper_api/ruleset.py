@@ -1,6 +1,7 @@
 from hypercube_api.util import Helper
 from hypercube_api.hyper_api.target import Description
 from hypercube_api.hyper_api.base import Base
+from hypercube_api.hyper_api.identity import IdentityMap
 from hypercube_api.hyper_api.model import ModelFactory
 from hypercube_api.hyper_api.rule import Rules, decode_kpiname_to_id
 from hypercube_api.utils.exceptions import ApiException
@@ -135,6 +136,50 @@ class RulesetFactory:
         Returns:
             Ruleset
         """
+        return Helper.wait(self.submit_create(dataset, name, target, purity_min, coverage_min, lift_min, zscore_min, average_value_min,
+                                              standard_deviation_max, shift_min, rule_complexity, quantiles,
+                                              enable_custom_discretizations, min_marginal_contribution, compute_other_key_indicators,
+                                              locally_increase_complexity, max_complexity, nb_minimizations, coverage_increment,
+                                              validate_stability, split_ratio, nb_iterations, purity_tolerance))
+
+    @Helper.try_catch
+    def submit_create(self, dataset, name, target, purity_min=None, coverage_min=None, lift_min=None, zscore_min=None, average_value_min=None,
+                      standard_deviation_max=None, shift_min=None, rule_complexity=2, quantiles=10,
+                      enable_custom_discretizations=True, min_marginal_contribution=None, compute_other_key_indicators=None,
+                      locally_increase_complexity=False, max_complexity=3, nb_minimizations=1, coverage_increment=0.01,
+                      validate_stability=False, split_ratio=0.7, nb_iterations=1, purity_tolerance=0.1):
+        """
+        Launch the creation of a new ruleset, without waiting for its end
+
+        Args:
+            dataset (Dataset): Dataset used to generate the ruleset
+            name (str): Name of the new ruleset
+            target (Target): Target to generate the ruleset
+            purity_min (float): Minimum purity of rules, default is the entire dataset purity (discrete target only)
+            coverage_min (int): Minimum coverage of the target population for each rule, default is 10 (discrete target only)
+            lift_min (float): Minimum lift, default is 1 (discrete target only)
+            zscore_min (float): Minimum Z-score, default is None (discrete target only)
+            average_value_min (float): Minimum average value, default is average value of the target on the whole dataset (continuous target only)
+            standard_deviation_max (float) : Maximum standard deviation, default is None (continuous target only)
+            shift_min (float): Minimum shift, default is None (continuous target only)
+            rule_complexity (int): Maximum number of variables in rules, default is 2
+            quantiles (int): Number of intervals the continuous variables are quantized in, default is 10
+            enable_custom_discretizations (boolean): use custom discretizations, eventually use "quantiles" parameter for remaining variables, default is True
+            min_marginal_contribution (float): a new rule R', created by adding a new constraint to an existing rule R (and thus increasing its complexity),
+                is added to the ruleset if and only if it increases the original purity of R by the minimum marginal contribution or more. Default is 0.1
+            compute_other_key_indicators (list of KeyIndicatorOption): Compute other Key Indicators.
+            locally_increase_complexity (bool): Enable the locally increase complexity when set as true.
+            max_complexity (int): Maximum numbers of features per rule.
+            nb_minimizations (int):Interate the minimization process.
+            coverage_increment (float): Percentage increment of target samples that a new rule must bring to be added to the minimization ruleset.
+            validate_stability (bool): Enable to split your dataset, add iteration and set a purity tolerance when set as true.
+            split_ratio (float): The percentage for the split (Between 0 and 1).
+            nb_iterations (int): Number of iterations wanted.
+            purity_tolerance (float): Purity tolerence allowed (Between 0 and 1).
+
+        Returns:
+            WorkFuture resolved with the Ruleset
+        """
         variable = next(variable for variable in dataset.variables if variable.name == target.variable_name)
         score_purity_min = None
         if (variable.is_discrete):
@@ -295,21 +340,38 @@ class RulesetFactory:
 
         print(msg)
         _ruleset = self.__api.Task.createtask(project_ID=self.__project_id, json=data)
-        self.__api.handle_work_states(self.__project_id, work_type='learning', work_id=_ruleset.get('_id'))
-        return self.get(name)
+        return self.__api.submit_work(self.__project_id, work_type='learning', work_id=_ruleset.get('_id')) \
+            .then(lambda _: self.get(name))
 
     @Helper.try_catch
-    def filter(self):
+    def filter(self, dataset=None):
         """
         Get all the rulesets of the project
 
+        Args:
+            dataset (Dataset): Only get the rulesets of this dataset, default is None
+
         Returns:
             List of ruleset
         """
+        rulesets = self.__rulesets().refresh()
+        if dataset is not None:
+            return [ruleset for ruleset in rulesets if ruleset.dataset_id == dataset.dataset_id]
+        return rulesets
+
+    def __rulesets(self):
+        api = self.__api
+        return IdentityMap.of(api, 'rulesets', (self.__project_id,),
+                              load=lambda: api.Rules.getlearnings(project_ID=self.__project_id),
+                              wrap=self.__wrap_rulesets,
+                              name_of=lambda x: x.get('tag', {}).get('tagName'))
+
+    def __wrap_rulesets(self, rulesets):
+        # The datasets of the new rulesets in a single lookup, rather than one per ruleset
         from hypercube_api.hyper_api.dataset import DatasetFactory
-        factory = DatasetFactory(self.__api, self.__project_id)
-        ruleset_project = self.__api.Rules.getlearnings(project_ID=self.__project_id)
-        return [Ruleset(self, self.__api, factory.get_by_id(ruleset.get('datasetId')), ruleset) for ruleset in ruleset_project]
+        dataset_ids = set(ruleset.get('datasetId') for ruleset in rulesets) - {None}
+        datasets = DatasetFactory(self.__api, self.__project_id)._datasets().get_many(dataset_ids) if dataset_ids else {}
+        return [Ruleset(self, self.__api, datasets.get(ruleset.get('datasetId')), ruleset) for ruleset in rulesets]
 
     @Helper.try_catch
     def minimize(self, ruleset, minimization_name, score_to_minimize='Purity', increment_threshold=0.01):
@@ -352,10 +414,7 @@ class RulesetFactory:
         Returns:
             Ruleset
         """
-        try:
-            return [ruleset for ruleset in self.filter() if ruleset.name == name][0]
-        except IndexError:
-            return []
+        return self.__rulesets().get_by_name(name) or []
 
     @Helper.try_catch
     def get_by_id(self, id):
@@ -365,10 +424,7 @@ class RulesetFactory:
         Returns:
             The Ruleset or None
         """
-        rulesets = [ruleset for ruleset in self.filter() if ruleset.id == id]
-        if rulesets:
-            return rulesets[0]
-        return None
+        return self.__rulesets().get(id)
 
     def get_or_create(self, dataset, name, target=None, purity_min=None, coverage_min=None, lift_min=None, zscore_min=None, average_value_min=None,
                       standard_deviation_max=None, shift_min=None, rule_complexity=2, quantiles=10,
@@ -1,6 +1,7 @@
 from hypercube_api.util import Helper
 from hypercube_api.util import get_random_color
 from hypercube_api.hyper_api.base import Base
+from hypercube_api.hyper_api.identity import IdentityMap
 from hypercube_api.utils.exceptions import ApiException
 
 
@@ -179,6 +180,23 @@ class TargetFactory:
 
         return Description(self.__api, json, target_json)
 
+    def __key_indicators(self):
+        project_id = self.__project.project_id
+        api = self.__api
+
+        json = {'project_ID': project_id}
+
+        # A key indicator has no ID of its own, it is found by the IDs of its scores (by its name without scores)
+        def _id_of(x):
+            return x['scores'][0].get('kpiId') if x.get('scores') else ('name', x.get('name'))
+
+        return IdentityMap.of(api, 'key_indicators', (project_id,),
+                              load=lambda: api.Kpi.getkpisforrulebuilder(**json),
+                              wrap=lambda jsons: [Target(api, json, x) if x['kpiFamily'] == self.KPI_FAMILY_TARGET
+                                                  else Description(api, json, x) for x in jsons],
+                              id_of=_id_of,
+                              aliases_of=lambda x: [score.get('kpiId') for score in x.get('scores') or []])
+
     @Helper.try_catch
     def get(self, name):
         """
@@ -187,10 +205,7 @@ class TargetFactory:
         Returns:
             (KeyIndicator): The target, description or None
         """
-        kis = list(filter(lambda x: x.name == name, self.filter()))
-        if kis:
-            return kis[0]
-        return None
+        return self.__key_indicators().get_by_name(name)
 
     @Helper.try_catch
     def get_by_id(self, id):
@@ -200,12 +215,7 @@ class TargetFactory:
         Returns:
             (KeyIndicator): The target, description or None
         """
-        kis = [ki for ki in self.filter()
-               if (ki.indicator_family == self.KPI_FAMILY_TARGET and id in ki.score_ids) or
-                  (ki.indicator_family == self.KPI_FAMILY_DESCRIPTION and id == ki.score_id)]
-        if kis:
-            return kis[0]
-        return None
+        return self.__key_indicators().get(id)
 
     @Helper.try_catch
     def filter(self):
@@ -215,13 +225,7 @@ class TargetFactory:
         Returns:
             (list of KeyIndicator): The targets and descriptions
         """
-        project_id = self.__project.project_id
-
-        json = {'project_ID': project_id}
-        return list(map(lambda x: Target(self.__api, json, x)
-                        if x['kpiFamily'] == self.KPI_FAMILY_TARGET
-                        else Description(self.__api, json, x),
-                        self.__api.Kpi.getkpisforrulebuilder(**json)))
+        return self.__key_indicators().refresh()
 
 
 class KeyIndicator(Base):
@@ -319,6 +323,7 @@ class Target(KeyIndicator):
         data = {'kpis': self.score_ids, 'newName': name}
         json = {'project_ID': self.__json_returned.get('projectId'), 'json': data}
         self.__api.Kpi.updateKpi(**json)
+        self.__json_returned['name'] = name
         return self
 
 
@@ -357,4 +362,5 @@ class Description(KeyIndicator):
         data = {'kpis': [self.score_id], 'newName': name}
         json = {'project_ID': self.__json_returned.get('projectId'), 'json': data}
         self.__api.Kpi.updateKpi(**json)
+        self.__json_returned['name'] = name
         return self
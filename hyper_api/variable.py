@@ -1,5 +1,6 @@
 from hypercube_api.util import Helper
 from hypercube_api.hyper_api.base import Base
+from hypercube_api.hyper_api.identity import IdentityMap
 from hypercube_api.utils.exceptions import ApiException
 
 
@@ -12,17 +13,25 @@ class VariableFactory:
         self.__project_id = project_id
         self.__dataset_id = dataset_id
 
+    def __variables(self):
+        json = {'project_ID': self.__project_id, 'dataset_ID': self.__dataset_id}
+        api = self.__api
+        # Variables are identified by their name within their dataset
+        return IdentityMap.of(api, 'variables', (self.__project_id, self.__dataset_id),
+                              load=lambda: api.Variable.getvariable(**json)['variables'],
+                              wrap=lambda jsons: [DiscreteVariable(api, json, variable_info)
+                                                  if variable_info.get('type') == 'D'
+                                                  else ContinuousVariable(api, json, variable_info)
+                                                  for variable_info in jsons],
+                              id_of=lambda x: x.get('name'))
+
     @Helper.try_catch
     def filter(self):
         """
         Returns:
             Variable[]: list of variables on the dataset
         """
-        json = {'project_ID': self.__project_id, 'dataset_ID': self.__dataset_id}
-        variable_res = self.__api.Variable.getvariable(**json)
-
-        return [DiscreteVariable(self.__api, json, variable_info) if variable_info.get('type') == 'D'
-                else ContinuousVariable(self.__api, json, variable_info) for variable_info in variable_res['variables']]
+        return self.__variables().refresh()
 
     @Helper.try_catch
     def get(self, name):
@@ -30,10 +39,7 @@ class VariableFactory:
         Returns:
             Variable: variable found by name
         """
-        variables = list(filter(lambda x: x.name == name, self.filter()))
-        if variables:
-            return variables[0]
-        return None
+        return self.__variables().get_by_name(name)
 
     @Helper.try_catch
     def ignore(self, *args):
@@ -288,4 +294,7 @@ class ContinuousVariable(Variable):
     def _update(self):
         json = {'project_ID': self.project_id, 'dataset_ID': self.dataset_id}
         variable_res = self.__api.Variable.getvariable(**json)
-        self.__json_returned = list(filter(lambda x: x.get('name') == self.name, variable_res['variables']))[0]
+        # Updated in place, the json being shared with the Variable part of this object
+        _json = list(filter(lambda x: x.get('name') == self.name, variable_res['variables']))[0]
+        self.__json_returned.clear()
+        self.__json_returned.update(_json)
@@ -1,5 +1,6 @@
 from hypercube_api.util import Helper
 from hypercube_api.hyper_api.base import Base
+from hypercube_api.hyper_api.identity import IdentityMap
 from hypercube_api.utils.exceptions import ApiException
 from hypercube_api.hyper_api.xrayvariable import XRayVariableFactory
 from hypercube_api.hyper_api.target import TargetFactory, Target, Description
@@ -55,6 +56,26 @@ class XrayFactory:
         Returns:
             Xray
         """
+        return Helper.wait(self.submit_create(dataset, name, target=target, targets=targets, quantiles=quantiles,
+                                              enable_custom_discretizations=enable_custom_discretizations))
+
+    @Helper.try_catch
+    def submit_create(self, dataset, name, target=None, targets=None,
+                      quantiles=10, enable_custom_discretizations=True):
+        """
+        Launch the creation of a Xray, without waiting for its end
+
+        Args:
+            dataset (Dataset) : dataset on which Xray will be created
+            name (str): name of the Xray to create
+            target (Target or Description): one target to generate the Xray
+            targets (Target or Description): array of targets to generate the Xray (ignored if 'target' parameter is defined)
+            quantiles (int): Number of intervals the continuous variables are quantized in, default is 10
+            enable_custom_discretizations (boolean): use custom discretizations, eventually use "quantiles" parameter for remaining variables, default is True
+
+        Returns:
+            WorkFuture resolved with the Xray
+        """
         if enable_custom_discretizations is True:
             discretizations = dataset._discretizations
         else:
@@ -86,12 +107,19 @@ class XrayFactory:
         }
         creation_json = self.__api.SimpleLift.newsimplelift(project_ID=self.__project_id, json=data)
 
-        try:
-            self.__api.handle_work_states(self.__project_id, work_type='simplelift', work_id=creation_json.get('_id'))
-        except Exception as E:
+        def _on_error(E):
             raise ApiException('Unable to get the X-ray status', str(E))
 
-        return Xray(self.__api, creation_json)
+        return self.__api.submit_work(self.__project_id, work_type='simplelift', work_id=creation_json.get('_id')) \
+            .then(lambda _: self.__xrays().put(creation_json), _on_error)
+
+    def __xrays(self):
+        """The identity map of the xrays of the project"""
+        json = {'project_ID': self.__project_id}
+        api = self.__api
+        return IdentityMap.of(api, 'xrays', (self.__project_id,),
+                              load=lambda: api.SimpleLift.getsimplelifts(**json),
+                              wrap=lambda jsons: [Xray(api, x) for x in jsons])
 
     @Helper.try_catch
     def filter(self):
@@ -99,8 +127,7 @@ class XrayFactory:
         Returns:
             list of Xrays on the current dataset
         """
-        json = {'project_ID': self.__project_id}
-        return [Xray(self.__api, x) for x in self.__api.SimpleLift.getsimplelifts(**json)]
+        return self.__xrays().refresh()
 
     @Helper.try_catch
     def get(self, name):
@@ -108,10 +135,7 @@ class XrayFactory:
         Returns:
             Xray found by name
         """
-        xrays = list(filter(lambda x: x.name == name, self.filter()))
-        if xrays:
-            return xrays[0]
-        return None
+        return self.__xrays().get_by_name(name)
 
     @Helper.try_catch
     def get_by_id(self, id):
@@ -119,10 +143,7 @@ class XrayFactory:
         Rreturns:
             Xray found by id
         """
-        xrays = list(filter(lambda x: x.id == id, self.filter()))
-        if xrays:
-            return xrays[0]
-        return None
+        return self.__xrays().get(id)
 
     @Helper.try_catch
     def get_or_create(self, dataset, name, target=None, targets=None, quantiles=10, enable_custom_discretizations=True):
@@ -1,18 +1,57 @@
+import contextvars
 import sys
 import os
+import threading
+import time
+import zlib
 import requests
-import jwt
+import urllib3
 
+from json import loads, dumps
 from os.path import join
-from requests_toolbelt.multipart.encoder import MultipartEncoder, MultipartEncoderMonitor
 from hypercube_api.util import get_hypercube_path
 from hypercube_api.config import get_config
+from hypercube_api.diskCache import DiskCache
+
+# Size of the chunks of the streamed requests and responses
+CHUNK_SIZE = 1024 * 1024
+# Encodings whose responses can be decoded (gzip and deflate, zstd and br when their packages are installed)
+ACCEPT_ENCODING = urllib3.util.make_headers(accept_encoding=True)['accept-encoding']
+# json request bodies smaller than this are never compressed
+COMPRESSION_MIN_SIZE = 1024
+# The jwt token is refreshed this number of seconds before its expiry
+TOKEN_REFRESH_MARGIN = 60
+# Set by the metrics of a route call to a {'sent': bytes, 'received': bytes} dict, that the requests add to
+TRANSFER = contextvars.ContextVar('hypercube_transfer', default=None)
 
 
 class Session:
-    """Session to HyperCube Server."""
+    """Session to HyperCube Server.
+
+    A Session can be shared by many threads: its connection pool holds 'pool_size' connections per host
+    (when 'pool_block' is set, threads wait for a free connection instead of opening extra ones that are
+    discarded afterwards). With 'thread_local', each thread gets its own requests session and connection pool,
+    all of them sharing the same headers (and thus the same jwt token, even after a refresh).
+
+    The jwt token is refreshed by the first request made shortly before its expiry (and a request rejected with
+    a 401 is replayed once after a refresh), all the threads sharing a single refresh. An idle session does not
+    log in again.
+
+    Release the connections with 'close', or use the session as a context manager.
+
+    Compressed responses are always accepted and transparently decoded. Request bodies (multipart uploads and large
+    json payloads) are compressed with 'compression' ('gzip', or 'zstd' with the zstandard package), which requires
+    a server accepting compressed requests.
+
+    With 'disk_cache' (True or a DiskCache), the responses of some GET routes are kept on disk and shared with the
+    other processes using the same cache file (see DiskCache).
 
-    def __init__(self, username, password, url=None, token=None):
+    'transport' replaces the http adapter of the requests sessions, for instance with a Cassette recording or
+    replaying the requests.
+    """
+
+    def __init__(self, username, password, url=None, token=None, pool_size=10, pool_block=False, thread_local=False,
+                 compression=None, disk_cache=None, transport=None):
         """
         Initiate a session with hypercube rest api (using username, password, url).
 
@@ -40,13 +79,35 @@ class Session:
         self.url = url or 'https://localhost:3000/app'
 
         # Initiate session parameters
-        self.session = requests.Session()
-        self.session.verify = False
+        self.pool_size = pool_size
+        self.pool_block = pool_block
+        self.transport = transport
+        self.thread_local = thread_local
+        self.__local = threading.local()
+        self.__refresh_lock = threading.Lock()
+        # The requests sessions of all the threads, closed along with the session
+        self.__sessions = []
+        self.__sessions_lock = threading.Lock()
+        self.__credentials = (username, password, token)
+        self.token_expiry = None
+        self.__renew_at = None
+        self.compression = compression
+        if compression == 'zstd':
+            try:
+                import zstandard
+            except ImportError:
+                raise ImportError('zstandard is required for zstd compression, please execute "pip install zstandard"')
+            self.__zstd = zstandard
+        elif compression not in (None, 'gzip'):
+            raise ValueError("compression should be in [None, 'gzip', 'zstd']")
+        self.disk_cache = DiskCache() if disk_cache is True else (None if disk_cache is False else disk_cache)
+        self.session = self.__new_session()
         self.session.headers = {
             "Content-Type": 'application/json;charset=UTF-8',
             "Accept": "application/json, text/plain, */*",
             "User-Agent": "Mozilla/5.0 (Windows NT 6.1; WOW64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/43.0.2357.65 Safari/537.36",
             "Accept-Language": "fr-FR,fr;q=0.8,en-US;q=0.6,en;q=0.4",
+            "Accept-Encoding": ACCEPT_ENCODING,
             "Connection": "keep-alive",
         }
 
@@ -55,6 +116,32 @@ class Session:
 
         self.__login(username, password, token)
 
+    def __new_session(self, headers=None):
+        session = requests.Session()
+        session.verify = False
+        adapter = self.transport or requests.adapters.HTTPAdapter(pool_connections=self.pool_size,
+                                                                  pool_maxsize=self.pool_size,
+                                                                  pool_block=self.pool_block)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        if headers is not None:
+            session.headers = headers
+        with self.__sessions_lock:
+            self.__sessions.append(session)
+        return session
+
+    @property
+    def http(self):
+        """The requests session to use in the current thread."""
+        if not self.thread_local:
+            return self.session
+        session = getattr(self.__local, 'session', None)
+        if session is None:
+            # Headers are shared (not copied) so that a refreshed token is seen by all the threads
+            session = self.__new_session(headers=self.session.headers)
+            self.__local.session = session
+        return session
+
     def __login(self, username=None, password=None, token=None):
         api_token = token or os.environ.get("API_TOKEN")
         if (not username or not password) and api_token is not None:
@@ -71,6 +158,8 @@ class Session:
                 'Impossible to authenticate to: {}. Reason is {}'.format('{}/{}'.format(self.url, 'auth/login'),
                                                                          resp.reason))
 
+        import jwt
+
         # Retrieve jwt token
         jwt_token = resp.json()
         if not jwt_token:
@@ -87,12 +176,92 @@ class Session:
 
         # Set jwt token in session headers
         self.session.headers['Authorization'] = 'Bearer {}'.format(jwt_token)
+        self.__credentials = (username, password, token)
+        self.token_expiry = decoded_jwt.get('exp', None)
+        self.__schedule_renewal()
+
+    def __schedule_renewal(self):
+        if self.token_expiry is None:
+            self.__renew_at = None
+            return
+        # Short-lived tokens are renewed halfway
+        _lifetime = self.token_expiry - time.time()
+        if _lifetime <= 0:
+            # Expired on arrival (clock skew, replayed session), the token is renewed on a 401 only
+            self.__renew_at = None
+            return
+        self.__renew_at = self.token_expiry - max(0, min(TOKEN_REFRESH_MARGIN, _lifetime / 2))
+
+    @property
+    def token_expires_soon(self):
+        """Whether the jwt token is expired or about to be."""
+        return self.__renew_at is not None and time.time() >= self.__renew_at
+
+    def renew_token(self, authorization=None):
+        """
+        Log in again with the session credentials, once for all the concurrent callers:
+        nothing is done if the token has been renewed since 'authorization' (an Authorization header) was read.
+        """
+        with self.__refresh_lock:
+            if authorization is not None and self.session.headers.get('Authorization') != authorization:
+                return
+            self.__login(*self.__credentials)
 
     def refresh(self, username=None, password=None, token=None):
-        self.__login(username, password, token)
+        """Log in again, with the credentials of the session unless new ones are given."""
+        with self.__refresh_lock:
+            if username is None and password is None and token is None:
+                self.__login(*self.__credentials)
+            else:
+                self.__login(username, password, token)
+
+    def close(self):
+        """Release the connections of all the threads."""
+        with self.__sessions_lock:
+            _sessions, self.__sessions = self.__sessions, []
+        for _session in _sessions:
+            _session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __send(self, send, replayable):
+        # Send a request with a valid token, replayed once with a new token if rejected with a 401
+        authorization = self.session.headers.get('Authorization')
+        if self.token_expires_soon:
+            try:
+                self.renew_token(authorization)
+                authorization = self.session.headers.get('Authorization')
+            except (ValueError, requests.exceptions.HTTPError):
+                # Still worth a try with the current token
+                pass
+        resp = send()
+        if resp.status_code == 401 and replayable:
+            try:
+                self.renew_token(authorization)
+            except (ValueError, requests.exceptions.HTTPError):
+                # Credentials missing or refused, the 401 stands
+                return resp
+            resp.close()
+            resp = send()
+        return resp
+
+    def request(self, method, url, params=None, json=None, data=None, streaming=False, stream=False, output=None,
+                chunk_size=CHUNK_SIZE, progress=True, idempotent=None):
+        """
+        Make a request to rest API and return response as json.
 
-    def request(self, method, url, params=None, json=None, data=None, streaming=False):
-        """Make a request to rest API and return response as json."""
+        With 'stream', the response content is not loaded in memory but returned as an iterator of bytes chunks
+        (the connection is released once the iterator is exhausted or closed).
+        With 'output', the response content is written by chunks to this file path (or binary file object),
+        which is then returned.
+        The progress of the 'streaming' uploads is printed unless 'progress' is False.
+        A call writing on the server ('idempotent' False, the POST calls by default) invalidates the disk cache
+        entries of its project.
+        """
         params = params or {}
         json = json or {}
         data = data or {}
@@ -101,34 +270,143 @@ class Session:
         if method not in ['GET', 'POST']:
             raise ValueError("method should be in ['GET', 'POST']")
 
-        if method == 'POST' and streaming:
-            # Create new data with encoder
-            encoder = MultipartEncoder(fields=data)
+        cache_key, cached = self.__disk_cache_lookup(method, url, params, json, stream or output is not None)
+        if cached is not None and cached['fresh']:
+            return self.disk_cache.decode(cached['content'])
 
-            def callback(monitor):
-                msg = '{} bytes uploaded '.format(monitor.bytes_read)
-                print(msg, flush=True, end='\r')
+        def send():
+            if method == 'POST' and streaming:
+                # Loaded with the first upload
+                from requests_toolbelt.multipart.encoder import MultipartEncoder, MultipartEncoderMonitor
 
-            multi_data = MultipartEncoderMonitor(encoder, callback)
+                # Create new data with encoder
+                encoder = MultipartEncoder(fields=data)
 
-            headers = self.session.headers.copy()
-            headers['Content-Type'] = multi_data.content_type
-            resp = self.session.request(method, url, params=params, json=json, data=multi_data, headers=headers)
-        else:
-            resp = self.session.request(method, url, params=params, json=json, data=data)
+                def callback(monitor):
+                    msg = '{} bytes uploaded '.format(monitor.bytes_read)
+                    print(msg, flush=True, end='\r')
+
+                multi_data = MultipartEncoderMonitor(encoder, callback if progress else None)
+
+                headers = self.session.headers.copy()
+                headers['Content-Type'] = multi_data.content_type
+                if self.compression is not None:
+                    # Compressed on the fly, thus sent with a chunked transfer encoding
+                    headers['Content-Encoding'] = self.compression
+                    multi_data = self.__compress_stream(multi_data)
+                return self.http.request(method, url, params=params, json=json, data=multi_data, headers=headers,
+                                         stream=stream or output is not None)
+            headers, _json, _data = self.__compress_json(method, json, data)
+            if cached is not None:
+                # Conditional request, answered with a 304 when the cached entry is still valid
+                headers = dict(headers or self.session.headers, **cached['headers'])
+            return self.http.request(method, url, params=params, json=_json, data=_data, headers=headers,
+                                     stream=stream or output is not None)
+
+        # Uploaded files have been consumed, they cannot be replayed
+        try:
+            resp = self.__send(send, replayable=not streaming)
+        finally:
+            if self.disk_cache is not None and not (method == 'GET' if idempotent is None else idempotent):
+                self.disk_cache.invalidate(url)
+        transfer = TRANSFER.get()
+        if transfer is not None:
+            transfer['sent'] += self.__body_size(resp.request.body)
+
+        if cached is not None and resp.status_code == 304:
+            self.disk_cache.touch(cache_key)
+            return self.disk_cache.decode(cached['content'])
 
         if not resp.ok:
-            raise requests.exceptions.HTTPError(
+            error = requests.exceptions.HTTPError(
                 'Error while trying to do a {} at {}. Reason is {}\nResponse content: {}'.format(method, url,
                                                                                                  resp.reason,
                                                                                                  resp.text),
                 response=resp.status_code,
                 request=url)
+            # Kept for the retry policies (Retry-After)
+            error.headers = resp.headers
+            raise error
+        if output is not None:
+            return self.__write_content(resp, output, chunk_size, transfer)
+        if stream:
+            return self.__iter_content(resp, chunk_size, transfer)
+        if transfer is not None:
+            transfer['received'] += len(resp.content)
+        if cache_key is not None:
+            self.disk_cache.set(cache_key, url, resp.content, resp.headers)
         try:
             return resp.json()
         except Exception:
             return resp.content
 
+    def __disk_cache_lookup(self, method, url, params, json, streamed):
+        """Return the disk cache key of a request (None when not cached) and its cached entry (None if missing)."""
+        if self.disk_cache is None or method != 'GET' or streamed or not self.disk_cache.rule_of(url)[0]:
+            return None, None
+        cache_key = self.disk_cache.key(self.user__id, url, params, json)
+        return cache_key, self.disk_cache.get(cache_key)
+
+    @staticmethod
+    def __iter_content(resp, chunk_size, transfer=None):
+        try:
+            for chunk in resp.iter_content(chunk_size=chunk_size):
+                if chunk:
+                    if transfer is not None:
+                        transfer['received'] += len(chunk)
+                    yield chunk
+        finally:
+            resp.close()
+
+    @classmethod
+    def __write_content(cls, resp, output, chunk_size, transfer=None):
+        if isinstance(output, (str, bytes, os.PathLike)):
+            with open(output, 'wb') as FILE_OUT:
+                for chunk in cls.__iter_content(resp, chunk_size, transfer):
+                    FILE_OUT.write(chunk)
+        else:
+            for chunk in cls.__iter_content(resp, chunk_size, transfer):
+                output.write(chunk)
+        return output
+
+    @staticmethod
+    def __body_size(body):
+        # Multipart encoders know their length, compressed streams are not counted
+        if body is None:
+            return 0
+        if isinstance(body, (bytes, str)):
+            return len(body)
+        return getattr(body, 'len', 0)
+
+    def __compressor(self):
+        if self.compression == 'zstd':
+            return self.__zstd.ZstdCompressor().compressobj()
+        # gzip container
+        return zlib.compressobj(wbits=31)
+
+    def __compress_stream(self, stream):
+        compressor = self.__compressor()
+        while True:
+            chunk = stream.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            chunk = compressor.compress(chunk)
+            if chunk:
+                yield chunk
+        yield compressor.flush()
+
+    def __compress_json(self, method, json, data):
+        """Compress a large json body, returns the headers, json and data to send."""
+        if self.compression is None or method != 'POST' or data or not json:
+            return None, json, data
+        body = dumps(json).encode('utf-8')
+        if len(body) < COMPRESSION_MIN_SIZE:
+            return None, json, data
+        compressor = self.__compressor()
+        headers = self.session.headers.copy()
+        headers['Content-Encoding'] = self.compression
+        return headers, None, compressor.compress(body) + compressor.flush()
+
     def request_v2(self, method, url, params=None, json=None, data=None, streaming=False):
         """Make a request to rest API and return response."""
         params = params or {}
@@ -139,24 +417,34 @@ class Session:
         if method not in ['GET', 'POST']:
             raise ValueError("method should be in ['GET', 'POST']")
 
-        if method == 'POST' and streaming:
-            # Create new data with encoder
-            encoder = MultipartEncoder(fields=data)
+        def send():
+            if method == 'POST' and streaming:
+                # Loaded with the first upload
+                from requests_toolbelt.multipart.encoder import MultipartEncoder, MultipartEncoderMonitor
 
-            def callback(monitor):
-                if 'size' in data:
-                    msg = '{0:.0f}% uploaded '.format(100 * monitor.bytes_read / int(data['size']))
-                else:
-                    msg = '{} bytes uploaded '.format(monitor.bytes_read)
-                print(msg, flush=True, end='\r')
+                # Create new data with encoder
+                encoder = MultipartEncoder(fields=data)
 
-            multi_data = MultipartEncoderMonitor(encoder, callback)
+                def callback(monitor):
+                    if 'size' in data:
+                        msg = '{0:.0f}% uploaded '.format(100 * monitor.bytes_read / int(data['size']))
+                    else:
+                        msg = '{} bytes uploaded '.format(monitor.bytes_read)
+                    print(msg, flush=True, end='\r')
 
-            headers = self.session.headers.copy()
-            headers['Content-Type'] = multi_data.content_type
-            resp = self.session.request(method, url, params=params, json=json, data=multi_data, headers=headers)
-        else:
-            resp = self.session.request(method, url, params=params, json=json, data=data)
+                multi_data = MultipartEncoderMonitor(encoder, callback)
+
+                headers = self.session.headers.copy()
+                headers['Content-Type'] = multi_data.content_type
+                if self.compression is not None:
+                    # Compressed on the fly, thus sent with a chunked transfer encoding
+                    headers['Content-Encoding'] = self.compression
+                    multi_data = self.__compress_stream(multi_data)
+                return self.http.request(method, url, params=params, json=json, data=multi_data, headers=headers)
+            headers, _json, _data = self.__compress_json(method, json, data)
+            return self.http.request(method, url, params=params, json=_json, data=_data, headers=headers)
+
+        resp = self.__send(send, replayable=not streaming)
 
         try:
             return resp
@@ -169,3 +457,194 @@ class Session:
 
     def post(self, url, params=None, json=None, data=None, streaming=False):
         return self.request('POST', url, params, json, data, streaming)
+
+
+class AsyncSession:
+    """Asyncio session to HyperCube Server, requires the aiohttp package."""
+
+    def __init__(self, username=None, password=None, url=None, token=None, session=None, disk_cache=None):
+        """
+        Initiate an asyncio session with hypercube rest api.
+
+        Authentication is done once with a synchronous Session (or reuses the given 'session'),
+        whose url, headers and jwt token are then shared by all the asynchronous requests.
+        """
+        try:
+            import aiohttp
+        except ImportError:
+            raise ImportError('aiohttp is required for asynchronous sessions, please execute "pip install aiohttp"')
+        self._aiohttp = aiohttp
+        # A session given is left open on close, its owner closes it
+        self.__owns_session = session is None
+        self.sync_session = session or Session(username=username, password=password, url=url, token=token,
+                                               disk_cache=disk_cache)
+        self.url = self.sync_session.url
+        self.api_entry_point = self.sync_session.api_entry_point
+        self.__client = None
+
+    def refresh(self, username=None, password=None, token=None):
+        self.sync_session.refresh(username, password, token)
+
+    def __get_client(self):
+        # aiohttp sessions have to be created within a running event loop
+        if self.__client is None or self.__client.closed:
+            self.__client = self._aiohttp.ClientSession(connector=self._aiohttp.TCPConnector(ssl=False))
+        return self.__client
+
+    async def close(self):
+        if self.__client is not None and not self.__client.closed:
+            await self.__client.close()
+        self.__client = None
+        if self.__owns_session:
+            self.sync_session.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def request(self, method, url, params=None, json=None, data=None, streaming=False, stream=False,
+                      output=None, chunk_size=CHUNK_SIZE, idempotent=None):
+        """
+        Make an asynchronous request to rest API and return response as json.
+
+        With 'stream', returns an asynchronous iterator of bytes chunks, with 'output' the response content is
+        written by chunks to this file path (or binary file object), as for Session.request. The calls that are
+        not 'idempotent' (the POST calls by default) invalidate the disk cache entries of their project.
+        """
+        params = params or {}
+        url = '{}{}'.format(self.api_entry_point, url)
+        method = method.upper()
+        if method not in ['GET', 'POST']:
+            raise ValueError("method should be in ['GET', 'POST']")
+
+        disk_cache = self.sync_session.disk_cache
+        cache_key, cached = None, None
+        if disk_cache is not None and method == 'GET' and not stream and output is None and disk_cache.rule_of(url)[0]:
+            cache_key = disk_cache.key(self.sync_session.user__id, url, params, json)
+            cached = disk_cache.get(cache_key)
+            if cached is not None and cached['fresh']:
+                return disk_cache.decode(cached['content'])
+
+        headers = dict(self.sync_session.session.headers)
+        # aiohttp advertises the encodings it is able to decode
+        headers.pop('Accept-Encoding', None)
+        if cached is not None:
+            headers.update(cached['headers'])
+        kwargs = {'params': params, 'headers': headers}
+        if method == 'POST' and streaming:
+            # Multipart upload, files are given as (file name, file object, content type) tuples
+            form = self._aiohttp.FormData()
+            for _key, _value in (data or {}).items():
+                if isinstance(_value, tuple):
+                    form.add_field(_key, _value[1], filename=_value[0], content_type=_value[2])
+                else:
+                    form.add_field(_key, _value)
+            headers.pop('Content-Type', None)
+            kwargs['data'] = form
+        elif data:
+            headers.pop('Content-Type', None)
+            kwargs['data'] = data
+        else:
+            kwargs['json'] = json or {}
+
+        authorization = self.sync_session.session.headers.get('Authorization')
+        if self.sync_session.token_expires_soon:
+            try:
+                await self.__renew_token(authorization)
+                headers['Authorization'] = authorization = self.sync_session.session.headers.get('Authorization')
+            except (ValueError, requests.exceptions.HTTPError):
+                # Still worth a try with the current token
+                pass
+        try:
+            resp = await self.__get_client().request(method, url, **kwargs)
+        finally:
+            if disk_cache is not None and not (method == 'GET' if idempotent is None else idempotent):
+                disk_cache.invalidate(url)
+        if resp.status == 401 and not streaming:
+            # Replayed once with a new token (forms cannot be replayed)
+            try:
+                await self.__renew_token(authorization)
+            except (ValueError, requests.exceptions.HTTPError):
+                # Credentials missing or refused, the 401 stands
+                pass
+            else:
+                resp.release()
+                headers['Authorization'] = self.sync_session.session.headers.get('Authorization')
+                resp = await self.__get_client().request(method, url, **kwargs)
+        transfer = TRANSFER.get()
+        if transfer is not None:
+            if 'json' in kwargs:
+                transfer['sent'] += len(dumps(kwargs['json']).encode('utf-8'))
+            elif isinstance(kwargs.get('data'), (bytes, str)):
+                transfer['sent'] += len(kwargs['data'])
+        if stream or output is not None:
+            if resp.status >= 400:
+                try:
+                    await self.__raise_for_status(resp, method, url)
+                finally:
+                    resp.release()
+            if output is not None:
+                return await self.__write_content(resp, output, chunk_size, transfer)
+            return self.__iter_content(resp, chunk_size, transfer)
+
+        async with resp:
+            if cached is not None and resp.status == 304:
+                disk_cache.touch(cache_key)
+                return disk_cache.decode(cached['content'])
+            await self.__raise_for_status(resp, method, url)
+            content = await resp.read()
+            if transfer is not None:
+                transfer['received'] += len(content)
+            if cache_key is not None:
+                disk_cache.set(cache_key, url, content, resp.headers)
+            try:
+                return loads(content.decode(resp.charset or 'utf-8'))
+            except Exception:
+                return content
+
+    async def __renew_token(self, authorization):
+        import asyncio
+        # The login is blocking, it is done aside the event loop
+        await asyncio.get_running_loop().run_in_executor(None, self.sync_session.renew_token, authorization)
+
+    @staticmethod
+    async def __raise_for_status(resp, method, url):
+        if resp.status >= 400:
+            content = await resp.read()
+            error = requests.exceptions.HTTPError(
+                'Error while trying to do a {} at {}. Reason is {}\nResponse content: {}'.format(method, url,
+                                                                                                 resp.reason,
+                                                                                                 content.decode('utf-8', 'replace')),
+                response=resp.status,
+                request=url)
+            error.headers = resp.headers
+            raise error
+
+    @staticmethod
+    async def __iter_content(resp, chunk_size, transfer=None):
+        try:
+            async for chunk in resp.content.iter_chunked(chunk_size):
+                if transfer is not None:
+                    transfer['received'] += len(chunk)
+                yield chunk
+        finally:
+            resp.release()
+
+    @classmethod
+    async def __write_content(cls, resp, output, chunk_size, transfer=None):
+        if isinstance(output, (str, bytes, os.PathLike)):
+            with open(output, 'wb') as FILE_OUT:
+                async for chunk in cls.__iter_content(resp, chunk_size, transfer):
+                    FILE_OUT.write(chunk)
+        else:
+            async for chunk in cls.__iter_content(resp, chunk_size, transfer):
+                output.write(chunk)
+        return output
+
+    async def get(self, url, params=None, json=None, data=None):
+        return await self.request('GET', url, params, json, data)
+
+    async def post(self, url, params=None, json=None, data=None, streaming=False):
+        return await self.request('POST', url, params, json, data, streaming)
@@ -0,0 +1,192 @@
+import contextlib
+import contextvars
+import json
+import os
+import random
+import sys
+import threading
+import time
+
+# The span in progress in the current thread (or asyncio task), parent of the spans started from there
+CURRENT_SPAN = contextvars.ContextVar('hypercube_span', default=None)
+# The installed tracer, None when tracing is disabled
+_TRACER = None
+
+
+class Span(object):
+    """
+    A timed operation, following the OpenTelemetry data model: spans of a same trace share its 'trace_id',
+    each span but the root one has a 'parent_id', and carries 'attributes', 'events' and a 'status'.
+    """
+    INTERNAL = 'SPAN_KIND_INTERNAL'
+    CLIENT = 'SPAN_KIND_CLIENT'
+
+    UNSET = 'STATUS_CODE_UNSET'
+    OK = 'STATUS_CODE_OK'
+    ERROR = 'STATUS_CODE_ERROR'
+
+    def __init__(self, name, parent=None, kind=INTERNAL, attributes=None):
+        self.name = name
+        self.kind = kind
+        self.trace_id = parent.trace_id if parent is not None else '{:032x}'.format(random.getrandbits(128))
+        self.span_id = '{:016x}'.format(random.getrandbits(64))
+        self.parent_id = parent.span_id if parent is not None else None
+        self.attributes = dict((_k, _v) for _k, _v in (attributes or {}).items() if _v is not None)
+        self.events = []
+        self.status = self.UNSET
+        self.status_message = None
+        self.start_time = time.time_ns()
+        self.end_time = None
+
+    def __repr__(self):
+        return "<{}>({}) - {} <{}> {}".format(self.__class__.__name__, id(self), self.name, self.span_id, self.status)
+
+    @property
+    def duration(self):
+        """The span duration in seconds (None while in progress)"""
+        if self.end_time is None:
+            return None
+        return (self.end_time - self.start_time) / 1e9
+
+    def set_attribute(self, key, value):
+        if value is not None:
+            self.attributes[key] = value
+
+    def add_event(self, name, attributes=None):
+        self.events.append({'name': name, 'timeUnixNano': time.time_ns(), 'attributes': dict(attributes or {})})
+
+    def record_exception(self, error):
+        self.add_event('exception', {'exception.type': error.__class__.__name__, 'exception.message': str(error)})
+        self.status = self.ERROR
+        self.status_message = str(error)
+
+    def end(self):
+        if self.end_time is None:
+            self.end_time = time.time_ns()
+            if self.status == self.UNSET:
+                self.status = self.OK
+
+    def to_dict(self):
+        _status = {'code': self.status}
+        if self.status_message:
+            _status['message'] = self.status_message
+        return {
+            'traceId': self.trace_id,
+            'spanId': self.span_id,
+            'parentSpanId': self.parent_id,
+            'name': self.name,
+            'kind': self.kind,
+            'startTimeUnixNano': self.start_time,
+            'endTimeUnixNano': self.end_time,
+            'attributes': self.attributes,
+            'events': self.events,
+            'status': _status,
+        }
+
+
+class JsonExporter(object):
+    """Writes the ended spans as json lines to 'output' (a file path or a text file object, stdout by default)."""
+
+    def __init__(self, output=None):
+        self.output = output
+        self.__lock = threading.Lock()
+
+    def export(self, span):
+        _line = json.dumps(span.to_dict(), default=str) + '\n'
+        with self.__lock:
+            if isinstance(self.output, (str, bytes, os.PathLike)):
+                with open(self.output, 'a') as FILE_OUT:
+                    FILE_OUT.write(_line)
+            else:
+                (self.output or sys.stdout).write(_line)
+
+
+class MemoryExporter(object):
+    """Keeps the ended spans in 'spans', to be inspected in process."""
+
+    def __init__(self):
+        self.spans = []
+        self.__lock = threading.Lock()
+
+    def export(self, span):
+        with self.__lock:
+            self.spans.append(span)
+
+    def summary(self):
+        """Return {span name: (count, total seconds)}, the most time consuming names first."""
+        _summary = {}
+        with self.__lock:
+            for _span in self.spans:
+                _count, _seconds = _summary.get(_span.name, (0, 0.))
+                _summary[_span.name] = (_count + 1, _seconds + _span.duration)
+        return dict(sorted(_summary.items(), key=lambda _item: -_item[1][1]))
+
+    def clear(self):
+        with self.__lock:
+            del self.spans[:]
+
+
+class Tracer(object):
+    """
+    Records spans of the hyper_api operations and of the route calls they make, once installed
+    (with 'install', or for a block with 'with tracer:'). Ended spans are given to 'exporter',
+    a JsonExporter to stdout by default.
+    """
+
+    def __init__(self, exporter=None):
+        self.exporter = exporter or JsonExporter()
+        self.__previous = []
+
+    def __repr__(self):
+        return "<{}>({}) - {}".format(self.__class__.__name__, id(self), self.exporter.__class__.__name__)
+
+    def install(self):
+        """Make this tracer the one recording the spans, returns the tracer replaced (None if any)."""
+        global _TRACER
+        _previous, _TRACER = _TRACER, self
+        return _previous
+
+    def __enter__(self):
+        self.__previous.append(self.install())
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        global _TRACER
+        _TRACER = self.__previous.pop()
+
+    @contextlib.contextmanager
+    def start_span(self, name, kind=Span.INTERNAL, attributes=None):
+        """Context manager running its block in a new span, child of the current one."""
+        _span = Span(name, parent=CURRENT_SPAN.get(), kind=kind, attributes=attributes)
+        _token = CURRENT_SPAN.set(_span)
+        try:
+            yield _span
+        except BaseException as E:
+            _span.record_exception(E)
+            raise
+        finally:
+            CURRENT_SPAN.reset(_token)
+            _span.end()
+            self.exporter.export(_span)
+
+    def open_span(self, name, kind=Span.INTERNAL, attributes=None):
+        """Start a span child of the current one, outliving the current block: end it with 'close_span'."""
+        return Span(name, parent=CURRENT_SPAN.get(), kind=kind, attributes=attributes)
+
+    def close_span(self, span, error=None):
+        if error is not None:
+            span.record_exception(error)
+        span.end()
+        self.exporter.export(span)
+
+
+def get_tracer():
+    """The installed Tracer, None when tracing is disabled."""
+    return _TRACER
+
+
+def start_span(name, kind=Span.INTERNAL, attributes=None):
+    """Context manager running its block in a span of the installed tracer, if any (yields the span or None)."""
+    if _TRACER is None:
+        return contextlib.nullcontext()
+    return _TRACER.start_span(name, kind=kind, attributes=attributes)
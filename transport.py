@@ -0,0 +1,174 @@
+import base64
+import hashlib
+import io
+import json
+import os
+import re
+import threading
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from urllib3.response import HTTPResponse
+
+# Response headers describing the wire encoding, dropped since cassettes hold decoded bodies
+_WIRE_HEADERS = ('content-encoding', 'transfer-encoding', 'content-length', 'connection')
+# Response headers carrying credentials, never written to a cassette
+_SECRET_HEADERS = ('authorization', 'proxy-authorization', 'set-cookie')
+# A jwt token: its json header (thus starting with 'eyJ'), payload and signature, base64url encoded
+_JWT = re.compile(rb'(eyJ[\w-]*\.[\w-]*)\.[\w-]+')
+_REDACTED = 'REDACTED'
+
+
+class CassetteMissException(Exception):
+    def __init__(self, method, url):
+        self.method = method
+        self.url = url
+
+    def __str__(self):
+        return 'No recorded interaction for {} {}'.format(self.method, self.url)
+
+
+class Cassette(BaseAdapter):
+    """
+    Record/replay transport of a Session (see its 'transport' argument), mounted in place of the http adapter.
+
+    In 'record' mode, the requests are sent to the server and the request/response pairs are saved to the
+    cassette file 'path' (a json file). In 'replay' mode, no request leaves the process: responses are served
+    from the cassette, in their recorded order for identical requests (the last one being repeated once they
+    are exhausted), which replays the pollings deterministically. The 'auto' mode replays an existing cassette
+    and records a missing one. Requests are matched on method, url and body (on method and url for multipart
+    uploads, whose boundaries are random, and for the logins, whose bodies hold the credentials). 'meta' is saved
+    along with the interactions, to describe the recorded scenario.
+
+    The recorded interactions are written to the cassette by 'flush' and on 'close' (see Session.close). The jwt
+    tokens keep their payload but lose their signature, and the credential headers are redacted: a cassette
+    holds no usable credential.
+    """
+
+    # Requests matched on method and url only
+    _UNMATCHED_BODY_PATHS = ('/auth/login',)
+
+    RECORD = 'record'
+    REPLAY = 'replay'
+    AUTO = 'auto'
+
+    def __init__(self, path, mode=AUTO, meta=None, adapter=None):
+        super().__init__()
+        if mode not in (self.RECORD, self.REPLAY, self.AUTO):
+            raise ValueError("mode should be in ['record', 'replay', 'auto']")
+        if mode == self.AUTO:
+            mode = self.REPLAY if os.path.exists(path) else self.RECORD
+        self.path = path
+        self.mode = mode
+        self.__lock = threading.Lock()
+        self.__adapter = adapter
+        self.__played = {}
+        self.__unsaved = False
+        self.interactions = []
+        self.meta = dict(meta or {})
+        if mode == self.REPLAY:
+            with open(path, 'r') as FILE_IN:
+                _cassette = json.load(FILE_IN)
+            self.interactions = _cassette['interactions']
+            self.meta = _cassette.get('meta', {})
+        elif self.__adapter is None:
+            self.__adapter = HTTPAdapter()
+        self.__index = {}
+        for _interaction in self.interactions:
+            self.__index.setdefault(_interaction['key'], []).append(_interaction)
+
+    def __repr__(self):
+        return "<{}>({}) - {} [{}] {} interactions".format(self.__class__.__name__, id(self), self.path, self.mode,
+                                                          len(self.interactions))
+
+    @staticmethod
+    def request_key(request):
+        """The key matching a prepared request with its recorded interactions."""
+        _body = request.body
+        if request.path_url.split('?', 1)[0].endswith(Cassette._UNMATCHED_BODY_PATHS):
+            _body = None
+        if isinstance(_body, str):
+            _body = _body.encode('utf-8')
+        _digest = hashlib.sha256(_body).hexdigest() if isinstance(_body, bytes) else None
+        return '{} {} {}'.format(request.method, request.url, _digest)
+
+    @staticmethod
+    def redact(content):
+        """The body of a response, without the signature of its jwt tokens (bytes)."""
+        return _JWT.sub(lambda match: match.group(1) + b'.' + _REDACTED.encode('ascii'), content)
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        if self.mode == self.REPLAY:
+            return self.__replay(request)
+        response = self.__adapter.send(request, stream=stream, timeout=timeout, verify=verify, cert=cert,
+                                       proxies=proxies)
+        # Loaded at once, still readable by chunks by the streaming callers
+        _content = response.content
+        _headers = dict((_k, _REDACTED if _k.lower() in _SECRET_HEADERS else _v)
+                        for _k, _v in response.headers.items() if _k.lower() not in _WIRE_HEADERS)
+        _interaction = {
+            'key': self.request_key(request),
+            'request': {'method': request.method, 'url': request.url},
+            'response': {'status': response.status_code, 'reason': response.reason, 'headers': _headers,
+                         'body': base64.b64encode(self.redact(_content)).decode('ascii')},
+        }
+        with self.__lock:
+            self.interactions.append(_interaction)
+            self.__index.setdefault(_interaction['key'], []).append(_interaction)
+            self.__unsaved = True
+        return response
+
+    def __replay(self, request):
+        _key = self.request_key(request)
+        with self.__lock:
+            _interactions = self.__index.get(_key)
+            if not _interactions and request.headers.get('Content-Type', '').startswith('multipart/'):
+                # Multipart bodies change from one upload to another
+                _prefix = '{} {} '.format(request.method, request.url)
+                _interactions = next((_v for _k, _v in self.__index.items() if _k.startswith(_prefix)), None)
+            if not _interactions:
+                raise CassetteMissException(request.method, request.url)
+            _played = self.__played.get(id(_interactions), 0)
+            self.__played[id(_interactions)] = _played + 1
+            _interaction = _interactions[min(_played, len(_interactions) - 1)]
+
+        _recorded = _interaction['response']
+        _content = base64.b64decode(_recorded['body'])
+        response = requests.Response()
+        response.status_code = _recorded['status']
+        response.reason = _recorded.get('reason')
+        response.headers = CaseInsensitiveDict(_recorded['headers'])
+        response.headers['Content-Length'] = str(len(_content))
+        response.raw = HTTPResponse(body=io.BytesIO(_content), headers=response.headers, status=response.status_code,
+                                    preload_content=False, decode_content=False)
+        response.url = request.url
+        response.request = request
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        response.connection = self
+        return response
+
+    def rewind(self):
+        """Replay the interactions from the start."""
+        with self.__lock:
+            self.__played.clear()
+
+    def save(self):
+        """Write the cassette file."""
+        with self.__lock:
+            # Written aside then renamed, an interruption never leaves a truncated cassette
+            _path = '{}.tmp'.format(self.path)
+            with open(_path, 'w') as FILE_OUT:
+                json.dump({'meta': self.meta, 'interactions': self.interactions}, FILE_OUT)
+            os.replace(_path, self.path)
+            self.__unsaved = False
+
+    def flush(self):
+        """Write the cassette file if interactions were recorded since it was last written."""
+        if self.__unsaved:
+            self.save()
+
+    def close(self):
+        if self.mode == self.RECORD:
+            self.flush()
+        if self.__adapter is not None:
+            self.__adapter.close()
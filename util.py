@@ -1,8 +1,11 @@
+import contextlib
+import io
 import random
 import sys
 import csv
 import posixpath
 from hypercube_api.utils.exceptions import ApiException
+from hypercube_api.tracing import get_tracer, start_span
 
 
 class Helper:
@@ -10,7 +13,8 @@ class Helper:
     def try_catch(func):
         def try_catched(*args, **kwargs):
             try:
-                return func(*args, **kwargs)
+                with Helper.operation_span(func, args[0]):
+                    return func(*args, **kwargs)
             except ApiException:
                 raise
             except Exception as e:
@@ -18,6 +22,56 @@ class Helper:
         try_catched.__doc__ = func.__doc__
         return try_catched
 
+    @staticmethod
+    def operation_span(func, instance):
+        """The span of a hyper_api operation (parent of the route calls it makes), a no-op unless a tracer is installed."""
+        if get_tracer() is None:
+            return contextlib.nullcontext()
+        return start_span(func.__qualname__, attributes={'hypercube.project_id': getattr(instance, 'project_id', None)})
+
+    @staticmethod
+    def wait(future):
+        """Block until a submitted work is resolved (None if the work could not be submitted)."""
+        if future is None:
+            return None
+        return future.result()
+
+    @staticmethod
+    def open_stream(chunks):
+        """Wrap an iterator of bytes chunks (as returned by a streamed request) in a readable binary file object."""
+        return io.BufferedReader(ChunkStream(chunks))
+
+
+class ChunkStream(io.RawIOBase):
+    """Raw read-only file object over an iterator of bytes chunks, read without concatenating them."""
+
+    def __init__(self, chunks):
+        self.__chunks = iter(chunks)
+        self.__chunk = memoryview(b'')
+        self.__position = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while self.__position >= len(self.__chunk):
+            try:
+                self.__chunk = memoryview(next(self.__chunks))
+            except StopIteration:
+                return 0
+            self.__position = 0
+        size = min(len(buffer), len(self.__chunk) - self.__position)
+        buffer[:size] = self.__chunk[self.__position:self.__position + size]
+        self.__position += size
+        return size
+
+    def close(self):
+        # Release the underlying connection when the stream is not read until its end
+        _close = getattr(self.__chunks, 'close', None)
+        if _close is not None:
+            _close()
+        super().close()
+
 
 """
 Utils functions
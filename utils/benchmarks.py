@@ -0,0 +1,301 @@
+"""
+Benchmarks of the package, guarding its performance budgets:
+
+    python -m hypercube_api.utils.benchmarks [benchmark ...]
+
+exits with a non-zero status when a budget is exceeded.
+The 'calls' benchmark counts the route calls of the critical operations against a MockServer.
+The 'sdk' benchmark replays the cassette H3_BENCH_CASSETTE (compared to the timings of H3_BENCH_BASELINE if set),
+recorded against a live server (H3_API_URI and API_TOKEN) with:
+
+    python -m hypercube_api.utils.benchmarks record <cassette> <project> <dataset> <ruleset> <model>
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# Heavy modules loaded by the operations needing them only, never by the import of the package
+LAZY_MODULES = ('pandas', 'numpy', 'plotly', 'requests_toolbelt', 'jwt', 'asyncio', 'aiohttp')
+# Seconds allowed to 'import hypercube_api' (median of fresh interpreters)
+IMPORT_TIME_BUDGET = 0.3
+# Client side operations timed by the sdk benchmark (names of their spans)
+SDK_OPERATIONS = ('DatasetFactory.filter', 'RulesetFactory.filter', 'Ruleset.get_rules', 'Model.predict_scores',
+                  'Router.handle_work_states')
+# A replayed operation slower than its baseline by this factor is a regression
+SDK_TOLERANCE = 1.5
+# Maximum route calls of the critical operations, against a MockServer holding SDK_CALLS_DATASETS datasets
+SDK_CALLS_DATASETS = 5
+SDK_CALL_BUDGETS = {
+    'DatasetFactory.filter': 1,
+    # Known objects are found in the identity maps, without any call
+    'DatasetFactory.get': 0,
+    # A lookup by ID always fetches the dataset, the identity map only keeping its wrapper
+    'DatasetFactory.get_by_id': 1,
+    # The rulesets, their known datasets being reused
+    'RulesetFactory.filter': 1,
+    'RulesetFactory.get': 0,
+    'Dataset.rulesets': 1,
+    'Ruleset.get_rules': 1,
+}
+# Minimum route calls per second, through the default retry, coalescing and metrics policies, with a null transport
+ROUTE_CALLS_BUDGET = 20000
+
+
+class NullSession(object):
+    """Session answering every request at once with an empty json, leaving the client overhead only."""
+    url = 'http://null'
+
+    @staticmethod
+    def request(method, url, **kwargs):
+        return {}
+
+
+def import_time(module='hypercube_api', repeat=5):
+    """
+    Time the import of a module in fresh interpreters
+    :param module (str): The module to import
+    :param repeat (int): The number of interpreters
+    :return: the median import time in seconds (float) and the LAZY_MODULES loaded by the import (list)
+    """
+    _script = ('import sys, time\n'
+               '_start = time.perf_counter()\n'
+               'import {}\n'
+               'print(time.perf_counter() - _start)\n'
+               'print(",".join(_m for _m in {!r} if _m in sys.modules))').format(module, LAZY_MODULES)
+    # The children find the package where this interpreter does
+    _env = dict(os.environ, PYTHONPATH=os.pathsep.join(_p for _p in sys.path if _p))
+    _times, _loaded = [], set()
+    for _ in range(repeat):
+        _output = subprocess.run([sys.executable, '-c', _script], env=_env, check=True, stdout=subprocess.PIPE,
+                                 universal_newlines=True).stdout.splitlines()
+        _times.append(float(_output[0]))
+        _loaded.update(_m for _m in (_output[1] if len(_output) > 1 else '').split(',') if _m)
+    return statistics.median(_times), sorted(_loaded)
+
+
+def check_import_time(budget=IMPORT_TIME_BUDGET, repeat=5):
+    """
+    Raise a ValueError when importing the package exceeds 'budget' seconds or loads a heavy module
+    :return: the median import time in seconds (float)
+    """
+    _time, _loaded = import_time(repeat=repeat)
+    if _loaded:
+        raise ValueError('import hypercube_api loads {}, which should be imported lazily'.format(', '.join(_loaded)))
+    if _time > budget:
+        raise ValueError('import hypercube_api takes {:.3f}s, over the budget of {:.3f}s'.format(_time, budget))
+    return _time
+
+
+def route_calls(duration=1., resilience=True, coalesce=True, metrics=True):
+    """
+    Count the calls per second of a GET route with two path keys, against a NullSession
+    :param duration (float): The seconds spent calling the route
+    :param resilience (bool): Whether the calls go through the default Resilience policy
+    :param coalesce (bool): Whether the calls go through a SingleFlight
+    :param metrics (bool): Whether the calls are recorded by a Metrics registry
+    :return: the number of calls per second (float)
+    """
+    from hypercube_api.hdp_api import Resilience, SingleFlight, Metrics
+    from hypercube_api.hdp_api.routes.datasets import Datasets
+
+    _route = Datasets(NullSession(), resilience=Resilience() if resilience else None,
+                      single_flight=SingleFlight() if coalesce else None,
+                      metrics=Metrics() if metrics else None).getadataset
+    _project_id, _dataset_id = 'a' * 24, 'b' * 24
+    _calls = 0
+    _start = time.perf_counter()
+    while time.perf_counter() - _start < duration:
+        for _ in range(1000):
+            _route(project_ID=_project_id, dataset_ID=_dataset_id)
+        _calls += 1000
+    return _calls / (time.perf_counter() - _start)
+
+
+def check_route_calls(budget=ROUTE_CALLS_BUDGET, duration=1.):
+    """
+    Raise a ValueError when a route call through the default policies costs more than 1/'budget' seconds
+    :return: the number of calls per second (float)
+    """
+    _rate = route_calls(duration)
+    if _rate < budget:
+        raise ValueError('{:.0f} route calls per second, under the budget of {}'.format(_rate, budget))
+    return _rate
+
+
+def sdk_scenario(api, meta):
+    """
+    Run the SDK_OPERATIONS, each one in a span of its name
+    :param api (Api): The api to the server (or to a replayed cassette)
+    :param meta (dict): The names of the 'project', 'dataset', 'ruleset' and 'model' of the scenario
+    """
+    from hypercube_api.tracing import start_span
+
+    project = api.Project.get(meta['project'])
+    with start_span('DatasetFactory.filter'):
+        project.Dataset.filter()
+    dataset = project.Dataset.get(meta['dataset'])
+    with start_span('RulesetFactory.filter'):
+        project.Ruleset.filter()
+    ruleset = project.Ruleset.get(meta['ruleset'])
+    with start_span('Ruleset.get_rules'):
+        ruleset.get_rules()
+    model = project.Model.get(meta['model'])
+    # Waits for the applied model work, timed as Router.handle_work_states
+    with start_span('Model.predict_scores'):
+        model.predict_scores(dataset)
+
+
+def record_sdk(cassette, project, dataset, ruleset, model, **api_kwargs):
+    """
+    Record the sdk scenario against a live server (credentials from 'api_kwargs' or the environment)
+    :param cassette (str): The cassette file to write
+    :return: the recorded Cassette
+    """
+    from hypercube_api import Api
+    from hypercube_api.transport import Cassette
+
+    _meta = {'project': project, 'dataset': dataset, 'ruleset': ruleset, 'model': model}
+    _cassette = Cassette(cassette, mode=Cassette.RECORD, meta=_meta)
+    sdk_scenario(Api(transport=_cassette, **api_kwargs), _meta)
+    # The server url, as logged in to
+    _cassette.meta['url'] = _cassette.interactions[0]['request']['url'].rsplit('/auth/login', 1)[0]
+    _cassette.save()
+    return _cassette
+
+
+def sdk_operations(cassette, repeat=5):
+    """
+    Replay the sdk scenario of a cassette, no request leaving the process
+    :param cassette (str): The cassette file recorded with record_sdk
+    :param repeat (int): The number of replays
+    :return: the median client side seconds of each one of the SDK_OPERATIONS (dict)
+    """
+    from hypercube_api import Api
+    from hypercube_api.tracing import Tracer, MemoryExporter
+    from hypercube_api.transport import Cassette
+
+    _timings = dict((_operation, []) for _operation in SDK_OPERATIONS)
+    for _ in range(repeat):
+        _cassette = Cassette(cassette, mode=Cassette.REPLAY)
+        _exporter = MemoryExporter()
+        _api = Api(url=_cassette.meta['url'], token='replay', transport=_cassette)
+        with Tracer(_exporter):
+            sdk_scenario(_api, _cassette.meta)
+        _summary = _exporter.summary()
+        for _operation in SDK_OPERATIONS:
+            _timings[_operation].append(_summary.get(_operation, (0, 0.))[1])
+    return dict((_operation, statistics.median(_seconds)) for _operation, _seconds in _timings.items())
+
+
+def check_sdk_operations(cassette, baseline=None, tolerance=SDK_TOLERANCE, repeat=5):
+    """
+    Raise a ValueError when a replayed operation is slower than 'tolerance' times its baseline
+    :param baseline (str): The json file of the baseline timings, written with these timings if missing
+    :return: the median seconds of the operations (dict)
+    """
+    _timings = sdk_operations(cassette, repeat=repeat)
+    if baseline is None:
+        return _timings
+    if not os.path.exists(baseline):
+        with open(baseline, 'w') as FILE_OUT:
+            json.dump(_timings, FILE_OUT, indent=2)
+        return _timings
+
+    with open(baseline, 'r') as FILE_IN:
+        _baseline = json.load(FILE_IN)
+    _regressions = ['{} {:.3f}s (baseline {:.3f}s)'.format(_operation, _seconds, _baseline[_operation])
+                    for _operation, _seconds in _timings.items()
+                    if _baseline.get(_operation) and _seconds > tolerance * _baseline[_operation]]
+    if _regressions:
+        raise ValueError('regressions: {}'.format(', '.join(_regressions)))
+    return _timings
+
+
+def sdk_calls(datasets=SDK_CALLS_DATASETS):
+    """
+    Account the route calls of the critical operations, against a MockServer
+    :param datasets (int): The number of datasets (each one with a ruleset) of the project
+    :return: the CallBudget of each operation of SDK_CALL_BUDGETS (dict)
+    """
+    from hypercube_api import Api
+    from hypercube_api.utils.mockServer import MockServer
+
+    with MockServer(datasets=datasets) as server:
+        api = Api(url=server.url, token='mock')
+        project = api.Project.get('project 0')
+        dataset = project.Dataset.get('dataset 0')
+        ruleset = project.Ruleset.get('ruleset 0')
+        _operations = {
+            'DatasetFactory.filter': project.Dataset.filter,
+            'DatasetFactory.get': lambda: project.Dataset.get('dataset 0'),
+            'DatasetFactory.get_by_id': lambda: project.Dataset.get_by_id(dataset.dataset_id),
+            'RulesetFactory.filter': project.Ruleset.filter,
+            'RulesetFactory.get': lambda: project.Ruleset.get('ruleset 0'),
+            'Dataset.rulesets': lambda: dataset.rulesets,
+            'Ruleset.get_rules': ruleset.get_rules,
+        }
+        _budgets = {}
+        for _operation, _call in _operations.items():
+            with api.call_budget() as _budgets[_operation]:
+                _call()
+    return _budgets
+
+
+def check_sdk_calls(budgets=None):
+    """
+    Raise a ValueError when an operation makes more route calls than its budget
+    :param budgets (dict): The maximum calls by operation, SDK_CALL_BUDGETS by default
+    :return: the number of route calls of each operation (dict)
+    """
+    from hypercube_api.hdp_api import CallBudgetException
+
+    budgets = budgets or SDK_CALL_BUDGETS
+    _overruns = []
+    _budgets = sdk_calls()
+    for _operation, _budget in _budgets.items():
+        try:
+            _budget.assert_within(calls=budgets.get(_operation))
+        except CallBudgetException as E:
+            _overruns.append('{}: {}'.format(_operation, E))
+    if _overruns:
+        raise ValueError('; '.join(_overruns))
+    return dict((_operation, _budget.calls) for _operation, _budget in _budgets.items())
+
+
+def _sdk():
+    _cassette = os.environ.get('H3_BENCH_CASSETTE')
+    if not _cassette:
+        return 'sdk: skipped, no H3_BENCH_CASSETTE'
+    _timings = check_sdk_operations(_cassette, baseline=os.environ.get('H3_BENCH_BASELINE'))
+    return '\n'.join('{}: {:.3f}s'.format(_operation, _seconds) for _operation, _seconds in _timings.items())
+
+
+BENCHMARKS = {
+    'import': lambda: 'import hypercube_api: {:.3f}s'.format(check_import_time()),
+    'routes': lambda: 'route calls: {:.0f}/s (bare route: {:.0f}/s)'.format(
+        check_route_calls(), route_calls(resilience=False, coalesce=False, metrics=False)),
+    'sdk': _sdk,
+    'calls': lambda: '\n'.join('{}: {} calls'.format(_operation, _calls)
+                               for _operation, _calls in check_sdk_calls().items()),
+}
+
+
+def main(names=None):
+    if names and names[0] == 'record':
+        print(record_sdk(*names[1:6]))
+        return 0
+    _failed = False
+    for _name in names or list(BENCHMARKS):
+        try:
+            print(BENCHMARKS[_name]())
+        except ValueError as E:
+            print('{}: {}'.format(_name, E))
+            _failed = True
+    return 1 if _failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,711 @@
+"""
+In-process stand-in of the HyperCube Data Platform, to load test the client (concurrency, caching, polling)
+without a cluster:
+
+    with MockServer(latency=0.05, work_duration=2) as server:
+        api = Api(url=server.url, token='mock')
+        project = api.Project.get('project 0')
+
+or, for clients in other processes:
+
+    python -m hypercube_api.utils.mockServer [port]
+"""
+import base64
+import email.parser
+import gzip
+import hashlib
+import hmac
+import itertools
+import json
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+from hypercube_api.hdp_api._router import Router
+
+# Prefix of the route urls (Session.api_entry_point), the login being out of it
+API_PREFIX = '/api/v1'
+LOGIN = 'Authentication.login'
+# Works whose json describes a model (see ModelFactory.filter)
+MODEL_TYPES = ('prediction', 'applyOtherModel', 'applyHypercubeModel', 'predictionRuleset', 'otherPrediction',
+               'hypercubePrediction', 'applyPrediction')
+_HYPERCUBE_TYPES = ('hypercubePrediction', 'applyPrediction', 'applyHypercubeModel', 'predictionRuleset')
+# Rows of the streamed csv payloads by chunk
+_CSV_CHUNK_ROWS = 10000
+
+
+def route_table(resources=None):
+    """
+    Match the urls with the routes of 'resources' (the Router resources by default)
+    :return: the (http method, path regex, route key) of the routes, the most specific paths first (list)
+    """
+    _table = []
+    for _resource in resources or Router._resources:
+        for _name, _route in _resource.route_classes():
+            _path = '/' + _route.compiled_path()[0]
+            _pattern = re.sub(r'\\\{(\w+)\\\}', r'(?P<\1>[^/]+)', re.escape(_path))
+            _table.append((_path.count('{'), _route.httpMethod, re.compile(_pattern + '$'),
+                           '{}.{}'.format(_resource.__name__, _name)))
+    # Stable sort: '/datasets/uploads' is matched before '/datasets/{dataset_ID}'
+    _table.sort(key=lambda _r: _r[0])
+    return [_r[1:] for _r in _table]
+
+
+def _now():
+    return datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.server.mock.dispatch(self)
+
+    def do_POST(self):
+        self.server.mock.dispatch(self)
+
+    def log_message(self, format, *args):
+        if self.server.mock.verbose:
+            super().log_message(format, *args)
+
+
+class MockServer(object):
+    """
+    Lightweight HTTP server answering the routes of the Router resources, its urls being generated from the
+    Route classes: the core routes (login, projects, datasets upload/export/filteredGrid, tasks, rules, kpis,
+    simplelifts and prediction scores) are served from an in-memory state, the others with an empty json.
+    Unknown urls get a 404, calls without a token issued by the login a 401.
+
+    Works (tasks) go through the states of the server ('creating', 'pending', 'starting', 'inprogress', see
+    WORK_STATES) to 'done' in 'work_duration' seconds. Each answer is delayed by 'latency' seconds (plus up to
+    'jitter'), and 'error_rate' of the calls fail with a 503. The payload sizes are set by 'rows' (rows of the
+    exported csv and scores), 'variables' (per dataset) and 'rules' (per ruleset).
+    The server is seeded with 'projects' projects named 'project <i>', each one with a target and holding
+    'datasets' datasets ('dataset <j>') with a ruleset ('ruleset <j>'), a HyperCube model ('model <j>') and
+    an xray ('xray <j>').
+
+    'calls' counts the requests received by route key ('Datasets.getadataset'), 'handlers' maps the route keys
+    to the functions answering them (called with the path keys, the query and the body, see 'handle').
+    GET answers carry an ETag and conditional requests are answered with a 304. The parts of the uploads by parts
+    are checked against their size and checksum, and 'files' holds the files reassembled from them by dataset ID.
+    """
+
+    # States of the works before 'done', with the fraction of 'work_duration' at which each one ends
+    WORK_STATES = (('creating', 0.1), ('pending', 0.2), ('starting', 0.3), ('inprogress', 1.))
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0., jitter=0., error_rate=0., work_duration=1.,
+                 rows=1000, variables=10, rules=100, projects=1, datasets=1, token_lifetime=3600, seed=0,
+                 verbose=False):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.work_duration = work_duration
+        self.rows = rows
+        self.variables = variables
+        self.rules = rules
+        self.token_lifetime = token_lifetime
+        self.verbose = verbose
+        self.calls = Counter()
+        self.routes = route_table()
+        self.__random = random.Random(seed)
+        self.__ids = itertools.count(1)
+        self.__lock = threading.RLock()
+        self.__secret = hashlib.sha256(str(seed).encode('utf-8')).digest()
+        self.__tokens = {}
+        self.__started = {}
+        self.__server = None
+        self.__thread = None
+
+        self.projects = {}
+        self.default_project = None
+        self.datasets = {}
+        self.works = {}
+        self.learnings = {}
+        self.kpis = {}
+        self.xrays = {}
+        self.uploads = {}
+        # The bytes of the uploaded parts by (upload ID, part number), then the reassembled files by dataset ID
+        self.__parts = {}
+        self.files = {}
+
+        self.handlers = {
+            LOGIN: self.__login,
+            'Projects.projects': self.__projects,
+            'Projects.getaproject': lambda params, query, body: self.projects[params['project_ID']],
+            'Projects.addproject': self.__add_project,
+            'Projects.defaultproject': self.__default_project,
+            'Projects.deleteproject': self.__delete_project,
+            'Datasets.datasets': lambda params, query, body: self.__of_project(self.datasets, params),
+            'Datasets.getadataset': lambda params, query, body: self.__dataset(params),
+            'Datasets.uploaddatasets': self.__upload_dataset,
+            'Datasets.createdataset': self.__create_dataset,
+            'Datasets.startupload': self.__start_upload,
+            'Datasets.getupload': lambda params, query, body: self.uploads[params['upload_ID']],
+            'Datasets.uploadpart': self.__upload_part,
+            'Datasets.completeupload': self.__complete_upload,
+            'Datasets.filteredgrid': self.__filtered_grid,
+            'Datasets.exportcsv': self.__export_csv,
+            'Datasets.split': self.__split,
+            'Datasets.deletedataset': self.__delete_dataset,
+            'Variable.getvariable': lambda params, query, body: {
+                'variables': self.__variables(self.__dataset(params))},
+            'Task.task': self.__task,
+            'Task.createtask': self.__create_task,
+            'SimpleLift.newsimplelift': self.__create_task,
+            'Task.deletetask': self.__delete_task,
+            'Rules.getlearnings': lambda params, query, body: self.__of_project(self.learnings, params),
+            'Rules.getrules': self.__get_rules,
+            'Kpi.getkpicorrelation': lambda params, query, body: self.__of_project(self.kpis, params),
+            'Kpi.getkpisforrulebuilder': lambda params, query, body: self.__of_project(self.kpis, params),
+            'Kpi.addkpi': self.__add_kpis,
+            'SimpleLift.getsimplelifts': lambda params, query, body: self.__of_project(self.xrays, params),
+            'SimpleLift.getsimplelift': self.__get_xray,
+            'SimpleLift.getvariablejsonfile': self.__get_xray_variable,
+            'Prediction.getmodels': lambda params, query, body: [
+                self.__work(_w) for _w in self.__of_project(self.works, params) if _w['type'] in MODEL_TYPES],
+            'Prediction.getmodel': lambda params, query, body: self.__work(self.works[params['model_ID']]),
+            'Prediction.postexportscores': self.__export_scores,
+            'Prediction.getexportscores': self.__get_scores,
+            'System.about': lambda params, query, body: {'name': 'HyperCube', 'product': 'Mock server',
+                                                         'version': 'mock', 'buildDate': _now()},
+        }
+        for _project in range(projects):
+            self.seed('project {}'.format(_project), datasets)
+
+    def __repr__(self):
+        return "<{}>({}) - {} | {} calls".format(self.__class__.__name__, id(self), self.url,
+                                                 sum(self.calls.values()))
+
+    @property
+    def url(self):
+        """The url to give to the Api (or Router), None until started."""
+        if self.__server is None:
+            return None
+        return 'http://{}:{}'.format(*self.__server.server_address[:2])
+
+    def start(self):
+        """Serve in a background thread."""
+        if self.__server is None:
+            self.__server = ThreadingHTTPServer((self.host, self.port), _Handler)
+            self.__server.daemon_threads = True
+            self.__server.mock = self
+            self.__thread = threading.Thread(target=self.__server.serve_forever, name='MockServer', daemon=True)
+            self.__thread.start()
+        return self
+
+    def stop(self):
+        if self.__server is not None:
+            self.__server.shutdown()
+            self.__server.server_close()
+            self.__thread.join()
+            self.__server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def handle(self, key, handler):
+        """
+        Answer the route 'key' with 'handler'
+        :param handler (callable): Called with the path keys, the query (dicts) and the body (json, or dict of
+            the form fields for the multipart uploads), returns the json answered, or bytes chunks for a csv.
+            A KeyError is answered with a 404, a ValueError with a 400
+        """
+        self.handlers[key] = handler
+
+    def reset_calls(self):
+        with self.__lock:
+            self.calls.clear()
+
+    def new_id(self):
+        """A new MongoDB ObjectID, ordered with the creations."""
+        with self.__lock:
+            return '{:024x}'.format(next(self.__ids))
+
+    # Http ----------------------------------------------------------------------------------------------------
+
+    def match(self, method, path):
+        """
+        Return the route key and path keys of a request path (without API_PREFIX), None if unknown.
+        Of the routes sharing a path, the first one with a handler is chosen.
+        """
+        _found = None
+        for _method, _pattern, _key in self.routes:
+            if _method == method:
+                _match = _pattern.match(path)
+                if _match is not None:
+                    if _key in self.handlers:
+                        return _key, _match.groupdict()
+                    _found = _found or (_key, _match.groupdict())
+        return _found
+
+    def dispatch(self, request):
+        _url = urlsplit(request.path)
+        _path = _url.path[len(API_PREFIX):] if _url.path.startswith(API_PREFIX + '/') else _url.path
+        _body = self.__read_body(request)
+        _match = self.match(request.command, _path)
+        if _match is None:
+            return self.__respond(request, 404, {'message': 'Not found: {}'.format(_path)})
+        _key, _params = _match
+        with self.__lock:
+            self.calls[_key] += 1
+            _failed = self.error_rate and self.__random.random() < self.error_rate
+        if self.latency or self.jitter:
+            time.sleep(self.latency + self.jitter * self.__random.random())
+        if _key != LOGIN:
+            if not self.__authorized(request.headers.get('Authorization')):
+                return self.__respond(request, 401, {'message': 'Unauthorized'})
+            if _failed:
+                return self.__respond(request, 503, {'message': 'Service unavailable'})
+
+        _query = dict((_k, _v[-1]) for _k, _v in parse_qs(_url.query).items())
+        _handler = self.handlers.get(_key)
+        try:
+            _payload = {} if _handler is None else _handler(_params, _query, self.__decode_body(request, _body))
+        except KeyError as E:
+            return self.__respond(request, 404, {'message': 'Not found: {}'.format(E)})
+        except ValueError as E:
+            return self.__respond(request, 400, {'message': str(E)})
+        except Exception as E:
+            return self.__respond(request, 500, {'message': '{}: {}'.format(E.__class__.__name__, E)})
+        if isinstance(_payload, (dict, list, str)) or _payload is None:
+            return self.__respond(request, 200, _payload)
+        return self.__respond_chunks(request, _payload)
+
+    @staticmethod
+    def __read_body(request):
+        if request.headers.get('Transfer-Encoding', '').lower() == 'chunked':
+            _chunks = []
+            while True:
+                _size = int(request.rfile.readline().split(b';')[0], 16)
+                if _size == 0:
+                    request.rfile.readline()
+                    return b''.join(_chunks)
+                _chunks.append(request.rfile.read(_size))
+                request.rfile.readline()
+        _length = int(request.headers.get('Content-Length') or 0)
+        return request.rfile.read(_length) if _length else b''
+
+    @staticmethod
+    def __decode_body(request, body):
+        _encoding = request.headers.get('Content-Encoding')
+        if body and _encoding == 'gzip':
+            body = gzip.decompress(body)
+        elif body and _encoding == 'zstd':
+            import zstandard
+            body = zstandard.ZstdDecompressor().decompressobj().decompress(body)
+        _type = request.headers.get('Content-Type', '')
+        if _type.startswith('multipart/form-data'):
+            _message = email.parser.BytesParser().parsebytes(
+                'Content-Type: {}\r\n\r\n'.format(_type).encode('utf-8') + body)
+            _fields = {}
+            for _part in _message.get_payload():
+                _name = _part.get_param('name', header='content-disposition')
+                _content = _part.get_payload(decode=True) or b''
+                _fields[_name] = _content if _part.get_filename() else _content.decode('utf-8')
+            return _fields
+        if not body:
+            return {}
+        try:
+            return json.loads(body.decode('utf-8'))
+        except ValueError:
+            return body
+
+    @staticmethod
+    def __respond(request, status, payload):
+        _content = json.dumps(payload).encode('utf-8')
+        _etag = '"{}"'.format(hashlib.sha1(_content).hexdigest()) if request.command == 'GET' else None
+        if status == 200 and _etag is not None and request.headers.get('If-None-Match') == _etag:
+            status, _content = 304, b''
+        request.send_response(status)
+        if _etag is not None:
+            request.send_header('ETag', _etag)
+        request.send_header('Content-Type', 'application/json; charset=utf-8')
+        request.send_header('Content-Length', str(len(_content)))
+        request.end_headers()
+        request.wfile.write(_content)
+
+    @staticmethod
+    def __respond_chunks(request, chunks):
+        request.send_response(200)
+        request.send_header('Content-Type', 'text/csv')
+        request.send_header('Transfer-Encoding', 'chunked')
+        request.end_headers()
+        for _chunk in chunks:
+            if _chunk:
+                request.wfile.write(b'%x\r\n%s\r\n' % (len(_chunk), _chunk))
+        request.wfile.write(b'0\r\n\r\n')
+
+    # Authentication ------------------------------------------------------------------------------------------
+
+    def __login(self, params, query, body):
+        if not (body.get('apiToken') or (body.get('username') and body.get('password'))):
+            raise ValueError('Missing credentials')
+        _claims = {'_id': 'f' * 24, 'username': body.get('username') or 'api',
+                   'exp': int(time.time() + self.token_lifetime)}
+        _segments = [base64.urlsafe_b64encode(json.dumps(_part).encode('utf-8')).rstrip(b'=')
+                     for _part in ({'alg': 'HS256', 'typ': 'JWT'}, _claims)]
+        _signature = hmac.new(self.__secret, b'.'.join(_segments), hashlib.sha256).digest()
+        _token = b'.'.join(_segments + [base64.urlsafe_b64encode(_signature).rstrip(b'=')]).decode('ascii')
+        with self.__lock:
+            self.__tokens[_token] = _claims['exp']
+        return _token
+
+    def __authorized(self, authorization):
+        if not authorization or not authorization.startswith('Bearer '):
+            return False
+        with self.__lock:
+            _expiry = self.__tokens.get(authorization[len('Bearer '):])
+        return _expiry is not None and time.time() < _expiry
+
+    # State ---------------------------------------------------------------------------------------------------
+
+    def seed(self, name, datasets=1):
+        """
+        Create a project with a target, holding 'datasets' datasets, each one with a ruleset, a model and an xray
+        :return: the project json (dict)
+        """
+        _project = self.__new_project(name)
+        _project_id = _project['_id']
+        _target = self.__add_kpis({'project_ID': _project_id}, {}, {'kpis': [
+            {'kpiName': 'var0 (a)', 'kpiType': 'discreteModality', 'kpiFamily': 'target', 'output': 'var0',
+             'omodality': 'a', 'scoreType': _score} for _score in ('Purity', 'Coverage', 'Lift')]})['kpis'][-1]
+        _params = {'kpis': [{'kpiId': _score['kpiId'], 'scoreType': _score['type'], 'kpiName': _target['name']}
+                            for _score in _target['scores']]}
+        for _index in range(datasets):
+            _dataset = self.__new_dataset(_project_id, 'dataset {}'.format(_index))
+            for _type, _name in (('learning', 'ruleset'), ('hypercubePrediction', 'model'), ('simplelift', 'xray')):
+                _work = self.__new_work(_project_id, dict(_params, name='{} {}'.format(_name, _index)),
+                                        {'type': _type, 'datasetId': _dataset['_id']})
+                # Seeded works are over
+                self.__started[_work['_id']] = float('-inf')
+        return _project
+
+    def __new_project(self, name, description=''):
+        _project = {'_id': self.new_id(), 'name': name, 'description': description, 'userId': 'f' * 24,
+                    'userName': 'mock', 'createdOn': _now(), 'shareUsers': []}
+        with self.__lock:
+            self.projects[_project['_id']] = _project
+            if self.default_project is None:
+                self.default_project = _project['_id']
+        return _project
+
+    def __new_dataset(self, project_id, name, description='', size=None, source_file_name=None):
+        if project_id not in self.projects:
+            raise KeyError(project_id)
+        _dataset = {'_id': self.new_id(), 'datasetName': name, 'description': description, 'projectId': project_id,
+                    'size': size if size is not None else self.rows * self.variables * 4, 'createdOn': _now(),
+                    'modified': _now(), 'selected': False, 'sourceFileName': source_file_name or name + '.csv',
+                    'separator': ';', 'delimiter': '.'}
+        with self.__lock:
+            self.datasets[_dataset['_id']] = _dataset
+        return _dataset
+
+    def __new_work(self, project_id, params, fields):
+        """Create a work, along with the ruleset (learning, minimization) or xray (simplelift) it computes."""
+        if project_id not in self.projects:
+            raise KeyError(project_id)
+        _work = dict(fields, _id=self.new_id(), projectId=project_id, params=params, createdAt=_now())
+        _dataset = self.datasets.get(_work.get('datasetId'))
+        if _dataset is not None:
+            _work.setdefault('datasetName', _dataset['datasetName'])
+        if _work['type'] in MODEL_TYPES:
+            _work['modelName'] = _work.get('modelName') or params.get('modelName') or params.get('name')
+            if _work['type'] in _HYPERCUBE_TYPES:
+                _work['algoType'] = 'HyperCube'
+        with self.__lock:
+            self.works[_work['_id']] = _work
+            self.__started[_work['_id']] = time.monotonic()
+            if _work['type'] in ('learning', 'minimization'):
+                self.learnings[_work['_id']] = {
+                    '_id': _work['_id'], 'projectId': project_id, 'datasetId': _work.get('datasetId'),
+                    'datasetName': _work.get('datasetName'), 'rulesCount': self.rules, 'lastChangeAt': _now(),
+                    'tag': {'tagName': params.get('tag') or params.get('name'),
+                            'kpis': params.get('kpisList') or params.get('kpis') or []}}
+            elif _work['type'] == 'simplelift':
+                self.xrays[_work['_id']] = {
+                    '_id': _work['_id'], 'name': params.get('name'), 'projectId': project_id,
+                    'datasetId': _work.get('datasetId'), 'datasetName': _work.get('datasetName'),
+                    'quantiles': params.get('quantileOrder', 10), 'discretizations': params.get('discretizations', {}),
+                    'createdAt': _now()}
+        return self.__work(_work)
+
+    def __work(self, work):
+        """The json of a work, with its status at this time."""
+        _elapsed = time.monotonic() - self.__started.get(work['_id'], float('-inf'))
+        if _elapsed >= self.work_duration:
+            _status = {'kind': 'done', 'progress': 100}
+        else:
+            _kind = next(_kind for _kind, _end in self.WORK_STATES if _elapsed < _end * self.work_duration)
+            _progress = int(100 * _elapsed / self.work_duration) if _kind == 'inprogress' else 0
+            _status = {'kind': _kind, 'progress': _progress}
+        return dict(work, _status=_status)
+
+    @staticmethod
+    def __matches(document, query):
+        # The subset of the MongoDB queries sent to the tasks route: equalities and '$in'
+        for _key, _value in query.items():
+            if isinstance(_value, dict) and '$in' in _value:
+                if document.get(_key) not in _value['$in']:
+                    return False
+            elif document.get(_key) != _value:
+                return False
+        return True
+
+    def __of_project(self, collection, params):
+        _project_id = params['project_ID']
+        if _project_id not in self.projects:
+            raise KeyError(_project_id)
+        with self.__lock:
+            return [_v for _v in collection.values() if _v.get('projectId') == _project_id]
+
+    def __dataset(self, params):
+        _dataset = self.datasets[params['dataset_ID']]
+        if _dataset['projectId'] != params['project_ID']:
+            raise KeyError(params['dataset_ID'])
+        return _dataset
+
+    def __variables(self, dataset):
+        # var0 is discrete (the seeded target), the others continuous
+        _variables = [{'name': 'var0', 'type': 'D', 'ignored': False, 'stats': {
+            'count': self.rows, 'missing': 0, 'modalitiesCount': 2, 'topModality': 'a',
+            'freqTopModality': self.rows // 2 + self.rows % 2,
+            'distribution': {'X': ['a', 'b'], 'Y': [self.rows // 2 + self.rows % 2, self.rows // 2],
+                             'Purities': [0.5, 0.5]}}}]
+        for _index in range(1, self.variables):
+            _variables.append({'name': 'var{}'.format(_index), 'type': 'C', 'ignored': False, 'stats': {
+                'count': self.rows, 'missing': 0, 'min': 0, 'max': 96, 'mean': 48., 'std': 28., '25%': 24.,
+                '50%': 48., '75%': 72., 'distribution': {'X': [0, 48, 96], 'Y': [0, self.rows // 2, self.rows // 2]}}})
+        return _variables
+
+    # Handlers ------------------------------------------------------------------------------------------------
+
+    def __projects(self, params, query, body):
+        with self.__lock:
+            return {'projects': list(self.projects.values()), 'defaultProject': self.default_project}
+
+    def __add_project(self, params, query, body):
+        _project = self.__new_project(body['name'], body.get('description', ''))
+        if body.get('projectTypeId'):
+            # Demo projects are filled by a workflow
+            _project['workflowId'] = self.__new_work(_project['_id'], {}, {'type': 'workflow'})['_id']
+        return _project
+
+    def __default_project(self, params, query, body):
+        _project = self.projects[params['project_ID']]
+        self.default_project = _project['_id']
+        return _project
+
+    def __delete_project(self, params, query, body):
+        _project_id = params['project_ID']
+        with self.__lock:
+            del self.projects[_project_id]
+            for _collection in (self.datasets, self.works, self.learnings, self.kpis, self.xrays, self.uploads):
+                for _id in [_k for _k, _v in _collection.items() if _v.get('projectId') == _project_id]:
+                    del _collection[_id]
+            if self.default_project == _project_id:
+                self.default_project = next(iter(self.projects), None)
+        return {}
+
+    def __submit_dataset(self, dataset):
+        for _type in ('datasetValidation', 'datasetDescription'):
+            self.__new_work(dataset['projectId'], {}, {'type': _type, 'datasetId': dataset['_id']})
+        return dataset
+
+    def __upload_dataset(self, params, query, body):
+        if not isinstance(body, dict) or 'name' not in body:
+            raise ValueError('Missing dataset name')
+        _size = sum(len(_v) for _k, _v in body.items() if _k.startswith('file[') and isinstance(_v, bytes))
+        return self.__submit_dataset(self.__new_dataset(params['project_ID'], body['name'],
+                                                        body.get('description', ''), _size,
+                                                        body.get('sourceFileName')))
+
+    def __create_dataset(self, params, query, body):
+        return self.__submit_dataset(self.__new_dataset(params['project_ID'], body.get('datasetName') or
+                                                        body.get('name'), body.get('description', '')))
+
+    def __start_upload(self, params, query, body):
+        if params['project_ID'] not in self.projects:
+            raise KeyError(params['project_ID'])
+        _upload = {'_id': self.new_id(), 'projectId': params['project_ID'], 'name': body.get('name'),
+                   'fileName': body.get('fileName'), 'size': body.get('size', 0), 'parts': [],
+                   'expectedParts': body.get('parts', 0)}
+        with self.__lock:
+            self.uploads[_upload['_id']] = _upload
+        return _upload
+
+    def __upload_part(self, params, query, body):
+        _upload = self.uploads[params['upload_ID']]
+        _part = int(params['part_number'])
+        _content = body.get('part')
+        if not isinstance(_content, bytes):
+            raise ValueError('Missing part content')
+        if len(_content) != int(body.get('size', -1)) or hashlib.md5(_content).hexdigest() != body.get('checksum'):
+            raise ValueError('Corrupted part {}'.format(_part))
+        with self.__lock:
+            self.__parts[(_upload['_id'], _part)] = _content
+            _upload['parts'] = sorted(set(_upload['parts']) | {_part})
+        return {}
+
+    def __complete_upload(self, params, query, body):
+        _upload = self.uploads[params['upload_ID']]
+        _missing = sorted(set(range(_upload['expectedParts'])) - set(_upload['parts']))
+        if _missing:
+            raise ValueError('Missing parts {}'.format(_missing))
+        with self.__lock:
+            # Reassembled in the order of the part numbers, whatever the order they were received in
+            _file = b''.join(self.__parts[(_upload['_id'], _part)] for _part in range(_upload['expectedParts']))
+            if len(_file) != int(_upload['size']):
+                raise ValueError('Reassembled file of {} bytes, {} expected'.format(len(_file), _upload['size']))
+            for _part in range(_upload['expectedParts']):
+                del self.__parts[(_upload['_id'], _part)]
+            del self.uploads[params['upload_ID']]
+        _dataset = self.__new_dataset(params['project_ID'], body.get('name') or _upload['name'],
+                                      body.get('description', ''), _upload['size'], _upload['fileName'])
+        self.files[_dataset['_id']] = _file
+        return self.__submit_dataset(_dataset)
+
+    def __filtered_grid(self, params, query, body):
+        _dataset = self.__dataset(params)
+        return self.__new_work(_dataset['projectId'], body, {'type': 'dataGrid', 'datasetId': _dataset['_id']})
+
+    def __export_csv(self, params, query, body):
+        self.__dataset(params)
+        _columns = [_v['name'] for _v in self.__variables(None)]
+        # Rows cycle through a few distinct lines, generated once
+        _lines = [';'.join(['ab'[_row % 2]] + [str((_row * _col) % 97) for _col in range(1, len(_columns))])
+                  for _row in range(97)]
+
+        def _chunks():
+            yield (';'.join(_columns) + '\n').encode('utf-8')
+            for _start in range(0, self.rows, _CSV_CHUNK_ROWS):
+                _end = min(_start + _CSV_CHUNK_ROWS, self.rows)
+                yield ('\n'.join(_lines[_row % 97] for _row in range(_start, _end)) + '\n').encode('utf-8')
+        return _chunks()
+
+    def __split(self, params, query, body):
+        _dataset = self.__dataset(params)
+        for _name in (body.get('trainName'), body.get('testName')):
+            self.__new_dataset(_dataset['projectId'], _name, size=_dataset['size'] // 2)
+        _work = self.__new_work(_dataset['projectId'], body, {'type': 'datasetSplit', 'datasetId': _dataset['_id']})
+        return {'id': _work['_id']}
+
+    def __delete_dataset(self, params, query, body):
+        _dataset = self.__dataset(params)
+        with self.__lock:
+            del self.datasets[_dataset['_id']]
+        return {}
+
+    def __task(self, params, query, body):
+        _query = dict(body or {}, projectId=params['project_ID'])
+        with self.__lock:
+            return [self.__work(_w) for _w in self.works.values() if self.__matches(_w, _query)]
+
+    def __create_task(self, params, query, body):
+        # The task is either the body or nested in it
+        _task = dict(body.get('task', body))
+        if 'type' not in _task:
+            raise ValueError('Missing task type')
+        return self.__new_work(params['project_ID'], _task.pop('params', {}) or {}, _task)
+
+    def __delete_task(self, params, query, body):
+        with self.__lock:
+            del self.works[params['task_ID']]
+            self.learnings.pop(params['task_ID'], None)
+            self.xrays.pop(params['task_ID'], None)
+        return {}
+
+    def __get_rules(self, params, query, body):
+        self.__dataset(params)
+        _learning = next((_l for _l in self.__of_project(self.learnings, params)
+                          if _l['datasetId'] == params['dataset_ID'] and
+                          _l['tag']['tagName'] == query.get('tagsfilter')), None)
+        if _learning is None:
+            return {'rules': []}
+        _kpis = [_k['kpiId'] for _k in _learning['tag']['kpis']]
+        _rules = []
+        for _index in range(min(int(query.get('limit', 100)), self.rules)):
+            _rules.append({'_id': '{}{:06x}'.format(_learning['_id'][:18], _index),
+                           'tags': [_learning['tag']['tagName']],
+                           'constraints': [{'varName': 'var{}'.format(1 + _index % max(1, self.variables - 1)),
+                                            'min': _index % 50, 'max': 50 + _index % 47, 'includeLeft': True,
+                                            'includeRight': False}],
+                           'scores': dict((_kpi, round(1. / (1 + _index + _rank), 6))
+                                          for _rank, _kpi in enumerate(_kpis))})
+        return {'rules': _rules}
+
+    def __add_kpis(self, params, query, body):
+        _project_id = params['project_ID']
+        if _project_id not in self.projects:
+            raise KeyError(_project_id)
+        with self.__lock:
+            for _kpi in body.get('kpis', []):
+                _modality = _kpi.get('omodality', _kpi.get('modality'))
+                _target = next((_t for _t in self.kpis.values() if _t['projectId'] == _project_id and
+                                _t['kpiFamily'] == _kpi.get('kpiFamily') and _t['variable'] == _kpi.get('output')
+                                and _t['modality'] == _modality), None)
+                if _target is None:
+                    _target = {'_id': self.new_id(), 'name': _kpi.get('kpiName'), 'projectId': _project_id,
+                               'kpiFamily': _kpi.get('kpiFamily'), 'variable': _kpi.get('output'),
+                               'modality': _modality, 'type': _kpi.get('kpiType'), 'color': _kpi.get('color'),
+                               'scores': []}
+                    self.kpis[_target['_id']] = _target
+                _target['scores'].append({'kpiId': self.new_id(), 'type': _kpi.get('scoreType')})
+            return {'kpis': self.__of_project(self.kpis, params)}
+
+    def __get_xray(self, params, query, body):
+        _xray = self.xrays[params['simpleLift_ID']]
+        return dict(_xray, variables=[{'name': _v['name'], 'type': _v['type'], 'ignored': False, 'column': _index,
+                                       'contrastRates': {'a': round(1. / (1 + _index), 6)}}
+                                      for _index, _v in enumerate(self.__variables(None))])
+
+    def __get_xray_variable(self, params, query, body):
+        if params['task_ID'] not in self.xrays:
+            raise KeyError(params['task_ID'])
+        return {'coverage': [self.rows // 2, self.rows // 2], 'xValues': [0, 48, 96], 'yValues': [0.4, 0.6],
+                'size': self.rows, 'value_range': [0, 96], 'outputs': ['a']}
+
+    def __export_scores(self, params, query, body):
+        _model = self.works[params['model_ID']]
+        return self.__new_work(_model['projectId'], body, {
+            'type': 'exportScores', 'datasetId': body.get('datasetId'),
+            'workParams': {'outputFile': 'scores_{}.csv'.format(self.new_id())}})
+
+    def __get_scores(self, params, query, body):
+        if params['model_ID'] not in self.works:
+            raise KeyError(params['model_ID'])
+        _scores = ['{:.3f}'.format(_score / 997) for _score in range(997)]
+
+        def _chunks():
+            yield b'sep=;\nid;score\n'
+            for _start in range(0, self.rows, _CSV_CHUNK_ROWS):
+                _end = min(_start + _CSV_CHUNK_ROWS, self.rows)
+                yield ''.join('{};{}\n'.format(_row, _scores[(_row * 31) % 997])
+                              for _row in range(_start, _end)).encode('utf-8')
+        return _chunks()
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    server = MockServer(port=int(argv[0]) if argv else 8000).start()
+    print('Mock HyperCube server on {} (Ctrl-C to stop)'.format(server.url), flush=True)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())